@@ -0,0 +1,94 @@
+"""
+Batch Processing for StegoCrypt
+Per-image jobs and streaming archive output for the batch endpoints
+"""
+import io
+import os
+import zipfile
+from typing import Optional, Tuple
+
+from stego import LSBEncoder, PayloadCompressor, PayloadContainer, prepare_payload
+
+
+def encode_item(
+    image_bytes: bytes,
+    message: str,
+    compress: bool = True,
+    salted_key: Optional[Tuple[bytes, bytes]] = None,
+    output_format: str = "png"
+) -> Tuple[bytes, dict]:
+    """
+    Encode one batch item (runs on the worker pool)
+    
+    Args:
+        image_bytes: Cover image upload
+        message: Message to hide
+        compress: Try compressing the message first
+        salted_key: Batch-wide (salt, key) from AESCrypto.new_gcm_key
+        output_format: Name of the stego image format (see OUTPUT_FORMATS)
+        
+    Returns:
+        Tuple of (stego image bytes, item info)
+    """
+    payload, flags = prepare_payload(message, compress=compress, salted_key=salted_key)
+    stego_bytes = LSBEncoder.encode(image_bytes, payload, flags, output_format)
+    return stego_bytes, {
+        "message_size": len(payload),
+        "encryption_used": bool(flags & PayloadContainer.FLAG_ENCRYPTED),
+        "compression": PayloadCompressor.CODEC_NAMES[PayloadContainer.get_codec(flags)]
+    }
+
+
+def output_name(filename: Optional[str], index: int, used: set, suffix: str = ".png") -> str:
+    """Build a unique archive member name for a batch item"""
+    stem = os.path.splitext(os.path.basename(filename or ""))[0] or f"image_{index}"
+    name = f"stego_{stem}{suffix}"
+    counter = index
+    while name in used:
+        name = f"stego_{stem}_{counter}{suffix}"
+        counter += 1
+    used.add(name)
+    return name
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only, non-seekable buffer that hands out what was written"""
+    
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+    
+    def writable(self) -> bool:
+        return True
+    
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+    
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class ZipStream:
+    """
+    Build a ZIP archive incrementally
+    
+    The sink is not seekable, so zipfile writes data descriptors after each
+    member and every add() returns bytes that can be sent right away.
+    """
+    
+    def __init__(self):
+        self._sink = _ChunkSink()
+        self._zip = zipfile.ZipFile(self._sink, mode="w", compression=zipfile.ZIP_STORED)
+    
+    def add(self, name: str, data: bytes) -> bytes:
+        """Append a member and return the archive bytes produced"""
+        self._zip.writestr(name, data)
+        return self._sink.drain()
+    
+    def close(self) -> bytes:
+        """Finish the archive and return the central directory bytes"""
+        self._zip.close()
+        return self._sink.drain()
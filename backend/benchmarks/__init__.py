@@ -0,0 +1 @@
+"""StegoCrypt - Performance benchmarks"""
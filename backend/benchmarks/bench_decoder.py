@@ -0,0 +1,101 @@
+"""
+Decoder Benchmark for StegoCrypt
+Compares row-streaming extraction with whole-image decoding on a large PNG
+
+Run from the backend directory:
+    python -m benchmarks.bench_decoder [--megapixels 13] [--message-bytes 1024 65536]
+    
+Each extraction runs in a fresh process so its peak RSS is measured on its own.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+from stego import LSBDecoder, StripEncoder
+from stego.png_stream import PNGStripWriter
+from benchmarks.bench_strip_encoder import peak_rss_mb
+
+
+def make_cover(path: str, megapixels: float) -> None:
+    """Write a noise PNG (noise keeps it large, like a photo) strip by strip"""
+    side = int((megapixels * 1_000_000) ** 0.5)
+    rng = np.random.default_rng(0)
+    with open(path, 'wb') as out:
+        writer = PNGStripWriter(out, side, side, compress_level=1)
+        for y in range(0, side, 256):
+            rows = min(256, side - y)
+            writer.write_rows(rng.integers(0, 256, size=(rows, side * 3), dtype=np.uint8))
+        writer.close()
+
+
+def run_child(mode: str, stego: str, expected: int) -> dict:
+    """Extract once in this process and report time and peak memory"""
+    start = time.perf_counter()
+    if mode == 'stream':
+        _, data = LSBDecoder.extract(stego)
+    else:
+        # A PIL image always takes the whole-image path
+        _, data = LSBDecoder.extract(Image.open(stego))
+    if len(data) != expected:
+        raise SystemExit(f"extracted {len(data)} bytes, expected {expected}")
+    return {
+        "mode": mode,
+        "seconds": round(time.perf_counter() - start, 3),
+        "peak_rss_mb": round(peak_rss_mb(), 1)
+    }
+
+
+def measure(mode: str, stego: str, expected: int) -> dict:
+    """Run one extraction in a fresh interpreter and parse its report"""
+    result = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.bench_decoder', '--child', mode,
+         '--stego', stego, '--expected', str(expected)],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        return {"mode": mode, "error": result.stderr.strip().splitlines()[-1]}
+    return json.loads(result.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--megapixels', type=float, default=13,
+                        help='Cover size; 13 MP of noise is about a 40 MB PNG')
+    parser.add_argument('--message-bytes', type=int, nargs='+', default=[1024, 65536, 1 << 20])
+    parser.add_argument('--child', choices=['stream', 'whole'], help=argparse.SUPPRESS)
+    parser.add_argument('--stego', help=argparse.SUPPRESS)
+    parser.add_argument('--expected', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.child:
+        print(json.dumps(run_child(args.child, args.stego, args.expected)))
+        return
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        cover = os.path.join(tmp, 'cover.png')
+        make_cover(cover, args.megapixels)
+        print(f"{args.megapixels:g} MP cover, {os.path.getsize(cover) / 2 ** 20:.1f} MB PNG")
+        print(f"{'message':>9} | {'decoder':>7} | {'seconds':>8} | {'peak RSS MB':>11}")
+        
+        for size in args.message_bytes:
+            stego = os.path.join(tmp, 'stego.png')
+            with open(stego, 'wb') as out:
+                StripEncoder.encode(cover, os.urandom(size), out=out, output_format='png-fast')
+            for mode in ('whole', 'stream'):
+                report = measure(mode, stego, size)
+                if "error" in report:
+                    print(f"{size:>9} | {mode:>7} | failed: {report['error']}")
+                    continue
+                print(f"{size:>9} | {mode:>7} | {report['seconds']:>8.3f} | "
+                      f"{report['peak_rss_mb']:>11.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Detection Benchmark for StegoCrypt
+Header-only detect() against full extraction, on clean covers and carriers
+
+Run from the backend directory:
+    python -m benchmarks.bench_detect [--sizes 1 12 48] [--formats png bmp]
+    
+Extraction of a clean cover searches the whole image for the legacy
+delimiter; detect() stops after the first pixels either way.
+"""
+import argparse
+import io
+
+from PIL import Image
+
+from stego import LSBDecoder, LSBEncoder, detect
+from benchmarks.bench_encoder import timed
+from benchmarks.bench_output_formats import make_cover
+
+
+def to_format(png: bytes, name: str) -> bytes:
+    """Re-save a PNG cover in another (lossless) format"""
+    if name == 'png':
+        return png
+    buf = io.BytesIO()
+    params = {'lossless': True} if name == 'webp' else {}
+    Image.open(io.BytesIO(png)).save(buf, format=name.upper(), **params)
+    return buf.getvalue()
+
+
+def extract_or_none(image: bytes):
+    """Full extraction, returning None for images without a message"""
+    try:
+        return LSBDecoder.extract(image)
+    except ValueError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=float, nargs='+', default=[1, 12, 48],
+                        help='Cover sizes in megapixels')
+    parser.add_argument('--formats', nargs='+', default=['png', 'bmp'],
+                        choices=['png', 'bmp', 'webp', 'tiff'])
+    args = parser.parse_args()
+    
+    print(f"{'MP':>5} | {'format':>6} | {'image':>7} | {'detect ms':>9} | "
+          f"{'extract ms':>10} | {'speedup':>8} | {'found':>5}")
+    for mp in args.sizes:
+        cover = make_cover(mp)
+        stego = LSBEncoder.encode(cover, b"x" * 1024)
+        for name in args.formats:
+            for kind, image in (("clean", to_format(cover, name)), ("carrier", to_format(stego, name))):
+                detect(image)
+                result, detect_s = timed(detect, image)
+                _, extract_s = timed(extract_or_none, image)
+                print(f"{mp:>5g} | {name:>6} | {kind:>7} | {detect_s * 1000:>9.3f} | "
+                      f"{extract_s * 1000:>10.1f} | {extract_s / detect_s:>7.0f}x | "
+                      f"{str(result['found']):>5}")
+
+
+if __name__ == '__main__':
+    main()
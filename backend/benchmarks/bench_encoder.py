@@ -0,0 +1,127 @@
+"""
+Encoder Benchmark for StegoCrypt
+Compares the NumPy embedding engine against the original per-pixel loop
+
+Run from the backend directory:
+    python -m benchmarks.bench_encoder [--sizes 1 12 48] [--legacy-max 12]
+"""
+import argparse
+import io
+import time
+
+import numpy as np
+from PIL import Image
+
+from stego import LSBEncoder
+
+
+def legacy_embed(img: Image.Image, message: str) -> Image.Image:
+    """Reference copy of the original pixel-by-pixel embedding loop"""
+    width, height = img.size
+    
+    binary_message = LSBEncoder.text_to_binary(message) + LSBEncoder.DELIMITER
+    pixels = list(img.getdata())
+    new_pixels = []
+    binary_index = 0
+    message_length = len(binary_message)
+    
+    for pixel in pixels:
+        r, g, b = pixel
+        if binary_index < message_length:
+            r = (r & 0xFE) | int(binary_message[binary_index])
+            binary_index += 1
+        if binary_index < message_length:
+            g = (g & 0xFE) | int(binary_message[binary_index])
+            binary_index += 1
+        if binary_index < message_length:
+            b = (b & 0xFE) | int(binary_message[binary_index])
+            binary_index += 1
+        new_pixels.append((r, g, b))
+        if binary_index >= message_length:
+            new_pixels.extend(pixels[len(new_pixels):])
+            break
+    
+    stego_img = Image.new('RGB', (width, height))
+    stego_img.putdata(new_pixels)
+    return stego_img
+
+
+def vectorized_embed(img: Image.Image, message: str) -> Image.Image:
+    """
+    The embedding stage of LSBEncoder.encode, without load and save
+    
+    Uses the legacy delimiter framing so the result can be compared
+    pixel for pixel with legacy_embed.
+    """
+    payload = message.encode('utf-8') + LSBEncoder.DELIMITER_BYTES
+    pixels = np.array(img, dtype=np.uint8)
+    LSBEncoder.embed_bits(pixels.reshape(-1), LSBEncoder.payload_to_bits(payload))
+    return Image.fromarray(pixels)
+
+
+def legacy_encode(image_file, message: str) -> bytes:
+    """Reference copy of the original encoder, end to end"""
+    img = Image.open(image_file)
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    out = io.BytesIO()
+    legacy_embed(img, message).save(out, format='PNG')
+    return out.getvalue()
+
+
+def make_cover(megapixels: float) -> io.BytesIO:
+    """Create a noisy RGB PNG cover of roughly the given size"""
+    side = int((megapixels * 1_000_000) ** 0.5)
+    rng = np.random.default_rng(0)
+    pixels = rng.integers(0, 256, size=(side, side, 3), dtype=np.uint8)
+    buf = io.BytesIO()
+    # Fast PNG settings keep cover generation out of the way
+    Image.fromarray(pixels).save(buf, format='PNG', compress_level=1)
+    buf.seek(0)
+    return buf
+
+
+def timed(func, *args):
+    """Run func once and return (result, seconds)"""
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=float, nargs='+', default=[1, 12, 48],
+                        help='Cover sizes in megapixels')
+    parser.add_argument('--legacy-max', type=float, default=12,
+                        help='Skip the legacy encoder above this size (MP)')
+    parser.add_argument('--message-bytes', type=int, default=64 * 1024)
+    args = parser.parse_args()
+    
+    message = ('StegoCrypt benchmark payload. ' * (args.message_bytes // 30 + 1))
+    message = message[:args.message_bytes]
+    
+    print(f"{'MP':>6} | {'embed new':>9} {'embed old':>9} {'speedup':>8} | "
+          f"{'encode new':>10} {'encode old':>10} {'speedup':>8} | {'identical':>9}")
+    for mp in args.sizes:
+        cover = make_cover(mp)
+        img = Image.open(cover).convert('RGB')
+        fast, embed_fast = timed(vectorized_embed, img, message)
+        cover.seek(0)
+        _, encode_fast = timed(LSBEncoder.encode, cover, message)
+        
+        if mp > args.legacy_max:
+            print(f"{mp:>6g} | {embed_fast:>9.3f} {'-':>9} {'-':>8} | "
+                  f"{encode_fast:>10.3f} {'-':>10} {'-':>8} | {'-':>9}")
+            continue
+        
+        slow, embed_slow = timed(legacy_embed, img, message)
+        cover.seek(0)
+        _, encode_slow = timed(legacy_encode, cover, message)
+        print(f"{mp:>6g} | {embed_fast:>9.3f} {embed_slow:>9.3f} "
+              f"{embed_slow / embed_fast:>7.1f}x | {encode_fast:>10.3f} "
+              f"{encode_slow:>10.3f} {encode_slow / encode_fast:>7.1f}x | "
+              f"{str(fast.tobytes() == slow.tobytes()):>9}")
+
+
+if __name__ == '__main__':
+    main()
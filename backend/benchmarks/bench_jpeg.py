@@ -0,0 +1,51 @@
+"""
+JPEG Output Benchmark for StegoCrypt
+Size, capacity and latency of DCT (JPEG) stego images against PNG
+
+Run from the backend directory:
+    python -m benchmarks.bench_jpeg [--sizes 1 12] [--qualities 75 90]
+"""
+import argparse
+
+from stego import CapacityAnalyzer, DCTEncoder, LSBDecoder, LSBEncoder
+from benchmarks.bench_encoder import timed
+from benchmarks.bench_output_formats import make_cover
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=float, nargs='+', default=[1, 12],
+                        help='Cover sizes in megapixels')
+    parser.add_argument('--qualities', type=int, nargs='+', default=[75, 90],
+                        help='JPEG qualities to compare')
+    parser.add_argument('--message-bytes', type=int, default=4 * 1024)
+    args = parser.parse_args()
+    
+    message = bytes(range(256)) * (args.message_bytes // 256 + 1)
+    message = message[:args.message_bytes]
+    
+    print(f"{'MP':>5} | {'output':>7} | {'capacity KB':>11} | {'encode s':>8} | "
+          f"{'decode s':>8} | {'output MB':>9} | {'vs png size':>11} | {'round trip':>10}")
+    for mp in args.sizes:
+        cover = make_cover(mp)
+        runs = [("png", CapacityAnalyzer.calculate_capacity(cover),
+                 lambda: LSBEncoder.encode(cover, message))]
+        for quality in args.qualities:
+            runs.append((f"jpeg{quality}", CapacityAnalyzer.dct_capacity(cover, quality),
+                         lambda quality=quality: DCTEncoder.encode(cover, message, 0, quality)))
+        
+        png_size = None
+        for name, capacity, encode in runs:
+            if capacity["max_bytes"] < len(message):
+                print(f"{mp:>5g} | {name:>7} | {capacity['max_kb']:>11.1f} | message does not fit")
+                continue
+            stego, encode_seconds = timed(encode)
+            (_, data), decode_seconds = timed(LSBDecoder.extract, stego)
+            png_size = png_size or len(stego)
+            print(f"{mp:>5g} | {name:>7} | {capacity['max_kb']:>11.1f} | {encode_seconds:>8.3f} | "
+                  f"{decode_seconds:>8.3f} | {len(stego) / 2 ** 20:>9.2f} | "
+                  f"{len(stego) / png_size:>10.2f}x | {str(data == message):>10}")
+
+
+if __name__ == '__main__':
+    main()
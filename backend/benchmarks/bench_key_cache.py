@@ -0,0 +1,53 @@
+"""
+Key Cache Benchmark for StegoCrypt
+Latency of repeated decode + decrypt with the derived-key cache on and off
+
+Run from the backend directory:
+    python -m benchmarks.bench_key_cache [--repeats 10]
+"""
+import argparse
+import statistics
+import time
+
+from stego import AESCrypto, LSBEncoder, LSBDecoder
+from benchmarks.bench_encoder import make_cover
+
+
+def decode_latencies(stego_bytes: bytes, password: str, repeats: int) -> list:
+    """Time decode + decrypt of the same image `repeats` times (ms)"""
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        AESCrypto.decrypt(LSBDecoder.decode(stego_bytes), password)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeats', type=int, default=10)
+    parser.add_argument('--megapixels', type=float, default=1)
+    args = parser.parse_args()
+    
+    password = "benchmark-password"
+    cover = make_cover(args.megapixels).getvalue()
+    stego_bytes = LSBEncoder.encode(cover, AESCrypto.encrypt("Repeated decode benchmark", password))
+    
+    print(f"{args.repeats} decodes of one {args.megapixels:g} MP image, same password")
+    print(f"{'key cache':<10} {'first ms':>9} {'mean ms':>9} {'median ms':>10} {'hit rate':>9}")
+    
+    AESCrypto.disable_key_cache()
+    off = decode_latencies(stego_bytes, password, args.repeats)
+    print(f"{'off':<10} {off[0]:>9.1f} {statistics.mean(off):>9.1f} "
+          f"{statistics.median(off):>10.1f} {'-':>9}")
+    
+    AESCrypto.enable_key_cache()
+    on = decode_latencies(stego_bytes, password, args.repeats)
+    stats = AESCrypto.key_cache_stats()
+    AESCrypto.disable_key_cache()
+    print(f"{'on':<10} {on[0]:>9.1f} {statistics.mean(on):>9.1f} "
+          f"{statistics.median(on):>10.1f} {stats['hit_rate']:>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
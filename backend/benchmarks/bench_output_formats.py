@@ -0,0 +1,55 @@
+"""
+Output Format Benchmark for StegoCrypt
+Encode latency against output size for each lossless stego image format
+(JPEG output, which also changes capacity, is compared in bench_jpeg)
+
+Run from the backend directory:
+    python -m benchmarks.bench_output_formats [--sizes 1 12] [--formats png webp]
+"""
+import argparse
+import io
+
+from PIL import Image
+
+from stego import LSBDecoder, LSBEncoder, OUTPUT_FORMATS
+from benchmarks.bench_encoder import timed
+from benchmarks.bench_strip_encoder import cover_rows
+
+
+def make_cover(megapixels: float) -> bytes:
+    """Photo-like cover (gradient plus noise) as fast-compressed PNG bytes"""
+    side = int((megapixels * 1_000_000) ** 0.5)
+    buf = io.BytesIO()
+    Image.fromarray(cover_rows(side, 0, side)).save(buf, format='PNG', compress_level=1)
+    return buf.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=float, nargs='+', default=[1, 12],
+                        help='Cover sizes in megapixels')
+    lossless = [name for name, spec in OUTPUT_FORMATS.items() if spec["engine"] == "lsb"]
+    parser.add_argument('--formats', nargs='+', default=lossless, choices=lossless)
+    parser.add_argument('--message-bytes', type=int, default=64 * 1024)
+    args = parser.parse_args()
+    
+    message = bytes(range(256)) * (args.message_bytes // 256 + 1)
+    message = message[:args.message_bytes]
+    
+    print(f"{'MP':>5} | {'format':>8} | {'encode s':>8} | {'output MB':>9} | "
+          f"{'vs png time':>11} | {'vs png size':>11} | {'round trip':>10}")
+    for mp in args.sizes:
+        cover = make_cover(mp)
+        baseline = None
+        for name in args.formats:
+            stego, seconds = timed(LSBEncoder.encode, cover, message, 0, name)
+            if baseline is None or name == 'png':
+                baseline = (seconds, len(stego))
+            _, data = LSBDecoder.extract(stego)
+            print(f"{mp:>5g} | {name:>8} | {seconds:>8.3f} | {len(stego) / 2 ** 20:>9.2f} | "
+                  f"{seconds / baseline[0]:>10.2f}x | {len(stego) / baseline[1]:>10.2f}x | "
+                  f"{str(data == message):>10}")
+
+
+if __name__ == '__main__':
+    main()
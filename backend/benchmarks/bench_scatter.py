@@ -0,0 +1,73 @@
+"""
+Scatter Embedding Benchmark for StegoCrypt
+Sequential against password-scattered embedding and extraction
+
+Run from the backend directory:
+    python -m benchmarks.bench_scatter [--sizes 1 12 48] [--payloads 1024 65536 1048576]
+    
+Embed and extract are timed on pixel arrays, so image decoding and saving
+(identical for both layouts) do not hide the difference. Scatter cost should
+follow the payload size and stay flat as the image grows.
+"""
+import argparse
+import os
+
+import numpy as np
+
+from stego import LSBDecoder, LSBEncoder, PayloadContainer
+from stego.embed_modes import payload_capacity
+from benchmarks.bench_encoder import timed
+from benchmarks.bench_strip_encoder import cover_rows
+
+
+PASSWORD = "benchmark-password"
+
+
+def embed(pixels: np.ndarray, payload: bytes, flags: int, password) -> tuple:
+    """Embed into a copy of pixels, timing the embedding only"""
+    out = pixels.copy()
+    _, seconds = timed(LSBEncoder.embed_payload, out, payload, flags, password)
+    return out, seconds
+
+
+def extract(pixels: np.ndarray, password) -> bytes:
+    """Extract from pixels already decoded"""
+    flat = pixels.reshape(-1)
+    _, data = LSBDecoder.extract_channels(lambda count: flat, flat.size, password=password)
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=float, nargs='+', default=[1, 12, 48],
+                        help='Cover sizes in megapixels')
+    parser.add_argument('--payloads', type=int, nargs='+', default=[1024, 65536, 1048576],
+                        help='Payload sizes in bytes')
+    parser.add_argument('--mode-bits', type=int, default=1, choices=range(1, 5),
+                        help='Bits per channel')
+    args = parser.parse_args()
+    
+    print(f"{'MP':>5} | {'payload':>9} | {'seq embed':>9} | {'scat embed':>10} | "
+          f"{'seq extract':>11} | {'scat extract':>12} | {'round trip':>10}")
+    for mp in args.sizes:
+        side = int((mp * 1_000_000) ** 0.5)
+        pixels = cover_rows(side, 0, side)
+        capacity = payload_capacity(side, side, args.mode_bits, False, True)
+        for size in args.payloads:
+            if size > capacity:
+                continue
+            payload = os.urandom(size)
+            flags = PayloadContainer.set_mode(0, args.mode_bits, False)
+            sequential, seq_embed = embed(pixels, payload, flags, None)
+            scattered, scat_embed = embed(
+                pixels, payload, flags | PayloadContainer.FLAG_SCATTER, PASSWORD
+            )
+            seq_data, seq_extract = timed(extract, sequential, None)
+            scat_data, scat_extract = timed(extract, scattered, PASSWORD)
+            ok = seq_data == payload and scat_data == payload
+            print(f"{mp:>5g} | {size:>9} | {seq_embed:>8.3f}s | {scat_embed:>9.3f}s | "
+                  f"{seq_extract:>10.3f}s | {scat_extract:>11.3f}s | {str(ok):>10}")
+
+
+if __name__ == '__main__':
+    main()
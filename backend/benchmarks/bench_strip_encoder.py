@@ -0,0 +1,151 @@
+"""
+Strip Encoder Benchmark for StegoCrypt
+Compares peak memory of the whole-image and strip encoders on very large covers
+
+Run from the backend directory:
+    python -m benchmarks.bench_strip_encoder [--megapixels 100] [--format png bmp]
+    
+Each encode runs in a fresh process so its peak RSS is measured on its own.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from stego import LSBEncoder
+from stego.png_stream import PNGStripWriter
+from stego.strip_encoder import StripEncoder
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MB"""
+    # ru_maxrss survives exec on Linux and would include the parent's peak,
+    # so prefer the kernel's high-water mark for this address space
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def cover_rows(width: int, y0: int, y1: int) -> np.ndarray:
+    """Rows y0..y1 of a gradient-with-noise cover, shaped (rows, width, 3)"""
+    rng = np.random.default_rng(y0)
+    x = np.arange(width, dtype=np.int32)[None, :]
+    y = np.arange(y0, y1, dtype=np.int32)[:, None]
+    shape = (y1 - y0, width)
+    base = np.stack([
+        (x + y) % 256,
+        np.broadcast_to(x // 4 % 256, shape),
+        np.broadcast_to(y // 4 % 256, shape)
+    ], axis=-1)
+    noise = rng.integers(-3, 4, size=base.shape)
+    return np.clip(base + noise, 0, 255).astype(np.uint8)
+
+
+def make_cover(path: str, megapixels: float, fmt: str) -> None:
+    """Write a large cover strip by strip, so generating it stays small too"""
+    side = int((megapixels * 1_000_000) ** 0.5)
+    step = 256
+    with open(path, 'wb') as out:
+        if fmt == 'png':
+            writer = PNGStripWriter(out, side, side, compress_level=1)
+            for y in range(0, side, step):
+                writer.write_rows(cover_rows(side, y, min(y + step, side)))
+            writer.close()
+            return
+        
+        # Uncompressed 24-bit BMP, stored bottom-up with rows padded to 4 bytes
+        stride = (side * 3 + 3) & ~3
+        size = 54 + stride * side
+        out.write(b"BM" + size.to_bytes(4, 'little') + bytes(4) + (54).to_bytes(4, 'little'))
+        out.write(np.array([40, side, side], dtype='<i4').tobytes()
+                  + np.array([1, 24], dtype='<u2').tobytes()
+                  + np.array([0, stride * side, 2835, 2835, 0, 0], dtype='<u4').tobytes())
+        for y in range(side, 0, -step):
+            rows = cover_rows(side, max(y - step, 0), y)[::-1, :, ::-1]
+            padded = np.zeros((rows.shape[0], stride), dtype=np.uint8)
+            padded[:, :side * 3] = rows.reshape(rows.shape[0], -1)
+            out.write(padded.tobytes())
+
+
+def run_child(mode: str, cover: str, output: str, message_bytes: int, budget_mb: int) -> dict:
+    """Encode once in this process and report time and peak memory"""
+    message = os.urandom(message_bytes)
+    start = time.perf_counter()
+    if mode == 'whole':
+        stego = LSBEncoder.encode(cover, message)
+        with open(output, 'wb') as out:
+            out.write(stego)
+    elif mode == 'strip':
+        with open(output, 'wb') as out:
+            StripEncoder.encode(cover, message, memory_budget=budget_mb * 1024 * 1024, out=out)
+    return {
+        "mode": mode,
+        "seconds": round(time.perf_counter() - start, 2),
+        "peak_rss_mb": round(peak_rss_mb(), 1)
+    }
+
+
+def measure(mode: str, cover: str, output: str, args) -> dict:
+    """Run one encode in a fresh interpreter and parse its report"""
+    result = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.bench_strip_encoder', '--child', mode,
+         '--cover', cover, '--output', output, '--message-bytes', str(args.message_bytes),
+         '--budget-mb', str(args.budget_mb)],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        return {"mode": mode, "error": result.stderr.strip().splitlines()[-1]}
+    return json.loads(result.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--megapixels', type=float, default=100)
+    parser.add_argument('--format', nargs='+', default=['png', 'bmp'], choices=['png', 'bmp'])
+    parser.add_argument('--message-bytes', type=int, default=64 * 1024)
+    parser.add_argument('--budget-mb', type=int, default=64)
+    parser.add_argument('--skip-whole', action='store_true',
+                        help='Only run the strip encoder')
+    parser.add_argument('--child', choices=['idle', 'whole', 'strip'], help=argparse.SUPPRESS)
+    parser.add_argument('--cover', help=argparse.SUPPRESS)
+    parser.add_argument('--output', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.child:
+        print(json.dumps(run_child(args.child, args.cover, args.output,
+                                   args.message_bytes, args.budget_mb)))
+        return
+    
+    modes = ['idle', 'strip'] if args.skip_whole else ['idle', 'whole', 'strip']
+    print(f"{args.megapixels:g} MP cover, {args.message_bytes} byte message, "
+          f"{args.budget_mb} MB budget")
+    print(f"{'format':>6} | {'encoder':>7} | {'seconds':>8} | {'peak RSS MB':>11} | {'output MB':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt in args.format:
+            cover = os.path.join(tmp, f'cover.{fmt}')
+            make_cover(cover, args.megapixels, fmt)
+            for mode in modes:
+                output = os.path.join(tmp, f'stego_{mode}.png')
+                report = measure(mode, cover, output, args)
+                if "error" in report:
+                    print(f"{fmt:>6} | {mode:>7} | failed: {report['error']}")
+                    continue
+                size = os.path.getsize(output) / 2 ** 20 if mode != 'idle' else 0
+                print(f"{fmt:>6} | {mode:>7} | {report['seconds']:>8.2f} | "
+                      f"{report['peak_rss_mb']:>11.1f} | {size:>9.1f}")
+            os.remove(cover)
+
+
+if __name__ == '__main__':
+    main()
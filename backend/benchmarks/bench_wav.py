@@ -0,0 +1,83 @@
+"""
+WAV Carrier Benchmark for StegoCrypt
+Latency of memory-mapped WAV encoding and decoding as the recording grows
+
+Run from the backend directory:
+    python -m benchmarks.bench_wav [--minutes 1 10 60] [--message-bytes 4096]
+    
+Covers are 44.1 kHz 16-bit stereo noise written to a temporary directory.
+Encoding copies the file and embeds through a memory map; decoding from the
+path maps only the samples the payload uses, so its time should not grow
+with the file. Decoding from bytes is shown for comparison: it needs the
+whole file read into memory first.
+"""
+import argparse
+import os
+import tempfile
+import wave
+
+import numpy as np
+
+from stego import CapacityAnalyzer, LSBDecoder, LSBEncoder, detect
+from benchmarks.bench_encoder import timed
+
+
+# Frames per write while building a cover (about 4 MB)
+WRITE_FRAMES = 1 << 20
+
+
+def make_wav(path: str, minutes: float, rate: int = 44100) -> None:
+    """Write minutes of 16-bit stereo noise to path"""
+    rng = np.random.default_rng(0)
+    frames = int(minutes * 60 * rate)
+    with wave.open(path, 'wb') as w:
+        w.setnchannels(2)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        while frames > 0:
+            count = min(frames, WRITE_FRAMES)
+            w.writeframes(rng.integers(0, 256, size=count * 4, dtype=np.uint8).tobytes())
+            frames -= count
+
+
+def read_bytes(path: str) -> bytes:
+    """Whole file, as an upload would be"""
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--minutes', type=float, nargs='+', default=[1, 10, 60],
+                        help='Cover lengths in minutes')
+    parser.add_argument('--message-bytes', type=int, default=4 * 1024)
+    args = parser.parse_args()
+    
+    message = bytes(range(256)) * (args.message_bytes // 256 + 1)
+    message = message[:args.message_bytes]
+    
+    print(f"{'min':>5} | {'file MB':>8} | {'capacity MB':>11} | {'encode s':>8} | "
+          f"{'decode ms':>9} | {'detect ms':>9} | {'bytes decode ms':>15} | {'round trip':>10}")
+    with tempfile.TemporaryDirectory() as root:
+        for minutes in args.minutes:
+            cover = os.path.join(root, "cover.wav")
+            output = os.path.join(root, "stego.wav")
+            make_wav(cover, minutes)
+            capacity = CapacityAnalyzer.calculate_capacity(cover)
+            
+            _, encode_seconds = timed(
+                LSBEncoder.encode_wav, cover, message, 0, "rgb1", None, output
+            )
+            (_, data), decode_seconds = timed(LSBDecoder.extract, output)
+            _, detect_seconds = timed(detect, output)
+            _, bytes_seconds = timed(lambda: LSBDecoder.extract(read_bytes(output)))
+            print(f"{minutes:>5g} | {os.path.getsize(cover) / 2 ** 20:>8.1f} | "
+                  f"{capacity['max_bytes'] / 2 ** 20:>11.2f} | {encode_seconds:>8.3f} | "
+                  f"{decode_seconds * 1000:>9.2f} | {detect_seconds * 1000:>9.2f} | "
+                  f"{bytes_seconds * 1000:>15.2f} | {str(data == message):>10}")
+            os.remove(cover)
+            os.remove(output)
+
+
+if __name__ == '__main__':
+    main()
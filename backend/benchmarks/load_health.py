@@ -0,0 +1,108 @@
+"""
+Event Loop Load Test for StegoCrypt
+Measures /health latency while password-protected encodes are running
+
+Requires httpx. Run from the backend directory:
+    python -m benchmarks.load_health [--encodes 8] [--megapixels 4]
+"""
+import argparse
+import asyncio
+import io
+import statistics
+import time
+
+import httpx
+import numpy as np
+from PIL import Image
+
+import config
+import main
+from workers import WorkerPool
+
+
+def make_cover(megapixels: float) -> bytes:
+    """Create a noisy RGB PNG cover of roughly the given size"""
+    side = int((megapixels * 1_000_000) ** 0.5)
+    rng = np.random.default_rng(0)
+    pixels = rng.integers(0, 256, size=(side, side, 3), dtype=np.uint8)
+    buf = io.BytesIO()
+    Image.fromarray(pixels).save(buf, format='PNG', compress_level=1)
+    return buf.getvalue()
+
+
+async def ping_health(client: httpx.AsyncClient, stop: asyncio.Event, latencies: list):
+    """
+    Hit /health every 10 ms until stopped
+    
+    Latency is measured from when the ping was due, so time the event loop
+    spends blocked before it can even send the request is included.
+    """
+    while not stop.is_set():
+        due = time.perf_counter() + 0.01
+        await asyncio.sleep(0.01)
+        await client.get('/health')
+        latencies.append((time.perf_counter() - due) * 1000)
+
+
+async def run_load(encodes: int, cover: bytes) -> dict:
+    """Run concurrent encodes and return /health latency percentiles (ms)"""
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://test', timeout=None) as client:
+        stop = asyncio.Event()
+        latencies = []
+        pinger = asyncio.create_task(ping_health(client, stop, latencies))
+        
+        start = time.perf_counter()
+        responses = await asyncio.gather(*(
+            client.post(
+                '/encode',
+                files={'image': ('cover.png', cover, 'image/png')},
+                data={'message': f'load test message {i}', 'password': 'load-test'}
+            )
+            for i in range(encodes)
+        ))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await pinger
+    
+    latencies.sort()
+    return {
+        "statuses": sorted({r.status_code for r in responses}),
+        "elapsed": elapsed,
+        "samples": len(latencies),
+        "p50": statistics.median(latencies),
+        "p95": latencies[int(len(latencies) * 0.95) - 1] if latencies else 0.0,
+        "max": latencies[-1] if latencies else 0.0
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--encodes', type=int, default=8)
+    parser.add_argument('--megapixels', type=float, default=4)
+    args = parser.parse_args()
+    
+    cover = make_cover(args.megapixels)
+    modes = [
+        ("inline (event loop)", WorkerPool(0)),
+        (f"{config.WORKER_POOL_KIND} pool x{config.WORKER_COUNT}", WorkerPool(
+            config.WORKER_COUNT, config.WORKER_POOL_KIND, queue_size=args.encodes
+        )),
+    ]
+    
+    print(f"{args.encodes} concurrent encodes, {args.megapixels:g} MP cover, password set")
+    print(f"{'mode':<24} {'status':>8} {'total s':>8} {'pings':>6} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+    for label, pool in modes:
+        main.worker_pool = pool
+        try:
+            result = asyncio.run(run_load(args.encodes, cover))
+        finally:
+            pool.shutdown()
+        print(f"{label:<24} {str(result['statuses']):>8} {result['elapsed']:>8.2f} "
+              f"{result['samples']:>6} {result['p50']:>8.1f} {result['p95']:>8.1f} "
+              f"{result['max']:>8.1f}")
+
+
+if __name__ == '__main__':
+    main_cli()
@@ -0,0 +1,253 @@
+"""
+Micro-benchmark Suite for StegoCrypt
+Times each stage of the stego package and compares runs against JSON baselines
+
+Run from the backend directory:
+    python -m benchmarks.suite run [--quick] [--save results.json] [--compare baseline.json]
+    python -m benchmarks.suite compare baseline.json results.json [--threshold 0.15]
+    
+Stages are timed separately: capacity, kdf, encrypt, decrypt, embed (pixels
+only), png_save, encode (end to end) and decode (end to end). Each case
+reports the median of its runs, payload MB/s, image MP/s and peak memory
+(allocations traced by tracemalloc, which include NumPy arrays but not
+Pillow's internal image buffers).
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+import PIL
+from PIL import Image
+
+from stego import AESCrypto, CapacityAnalyzer, LSBDecoder, LSBEncoder, PayloadContainer
+from benchmarks.bench_output_formats import make_cover
+
+
+DEFAULT_SIZES = [0.5, 2, 12, 50]
+DEFAULT_PAYLOADS = ['16', '1024', '65536', 'full']
+QUICK_SIZES = [0.5, 2]
+QUICK_PAYLOADS = ['16', '1024', 'full']
+
+# Repeat a case while the total stays under this many seconds
+REPEAT_BUDGET = 2.0
+
+# Changes below these absolute amounts are noise, whatever the percentage
+MIN_FLAGGED_MS = 1.0
+MIN_FLAGGED_MB = 0.5
+
+
+def measure(func, *args, max_runs: int = 5) -> dict:
+    """
+    Time func and trace its peak memory
+    
+    Runs at least once, and again while the total stays within
+    REPEAT_BUDGET, up to max_runs. One extra traced run gives peak memory.
+    
+    Returns:
+        Dictionary with seconds (median), runs and peak_mb
+    """
+    times = []
+    while len(times) < max_runs:
+        start = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - start)
+        if sum(times) + times[-1] > REPEAT_BUDGET:
+            break
+    
+    tracemalloc.start()
+    func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    
+    return {
+        "seconds": statistics.median(times),
+        "runs": len(times),
+        "peak_mb": round(peak / 2 ** 20, 2)
+    }
+
+
+def record(results: list, stage: str, megapixels, payload_bytes, timing: dict) -> None:
+    """Add one case with its throughput figures and print it"""
+    seconds = timing["seconds"]
+    entry = {
+        "case": f"{stage}/{megapixels if megapixels is not None else '-'}MP/"
+                f"{payload_bytes if payload_bytes is not None else '-'}B",
+        "stage": stage,
+        "megapixels": megapixels,
+        "payload_bytes": payload_bytes,
+        "seconds": round(seconds, 6),
+        "runs": timing["runs"],
+        "payload_mb_per_s": round(payload_bytes / 2 ** 20 / seconds, 2) if payload_bytes else None,
+        "image_mp_per_s": round(megapixels / seconds, 2) if megapixels else None,
+        "peak_mb": timing["peak_mb"]
+    }
+    results.append(entry)
+    payload_rate = entry["payload_mb_per_s"] if payload_bytes else "-"
+    image_rate = entry["image_mp_per_s"] if megapixels else "-"
+    print(f"{entry['case']:<34} {seconds * 1000:>10.2f} ms  {payload_rate:>9} MB/s  "
+          f"{image_rate:>8} MP/s  {entry['peak_mb']:>8.2f} MB peak")
+
+
+def payload_size(spec: str, capacity: int) -> int:
+    """Resolve a payload spec ('16', 'full', ...) against an image's capacity"""
+    return capacity if spec == 'full' else min(int(spec), capacity)
+
+
+def run_suite(sizes: list, payloads: list) -> list:
+    """Run every stage for every size and payload"""
+    results = []
+    password = "benchmark-password"
+    
+    salted_key = AESCrypto.new_gcm_key(password)
+    record(results, "kdf", None, None, measure(AESCrypto.new_gcm_key, password))
+    
+    crypto_done = set()
+    for mp in sizes:
+        cover = make_cover(mp)
+        img = Image.open(io.BytesIO(cover)).convert('RGB')
+        
+        def capacity():
+            CapacityAnalyzer._cache.clear()
+            return CapacityAnalyzer.calculate_capacity(cover)
+        
+        record(results, "capacity", mp, None, measure(capacity))
+        capacity_bytes = CapacityAnalyzer.calculate_capacity(cover)["max_bytes"]
+        
+        for spec in payloads:
+            size = payload_size(spec, capacity_bytes)
+            payload = os.urandom(size)
+            
+            # Cipher cost depends on the payload only; the key is derived once
+            if size not in crypto_done:
+                crypto_done.add(size)
+                record(results, "encrypt", None, size,
+                       measure(AESCrypto.encrypt_bytes, payload, None, salted_key))
+                blob = AESCrypto.encrypt_bytes(payload, salted_key=salted_key)
+                record(results, "decrypt", None, size,
+                       measure(AESCrypto.decrypt_bytes, blob, None, salted_key[1]))
+            
+            def embed():
+                pixels = np.array(img, dtype=np.uint8)
+                bits = LSBEncoder.payload_to_bits(PayloadContainer.pack(payload))
+                LSBEncoder.embed_bits(pixels.reshape(-1), bits)
+                return Image.fromarray(pixels)
+            
+            stego_img = embed()
+            
+            def png_save():
+                stego_img.save(io.BytesIO(), format='PNG')
+            
+            stego = LSBEncoder.encode(cover, payload)
+            record(results, "embed", mp, size, measure(embed))
+            record(results, "png_save", mp, size, measure(png_save))
+            record(results, "encode", mp, size, measure(LSBEncoder.encode, cover, payload))
+            record(results, "decode", mp, size, measure(LSBDecoder.extract, stego))
+    
+    return results
+
+
+def environment() -> dict:
+    """Describe the machine and library versions a run was made with"""
+    return {
+        "date": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pillow": PIL.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count()
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list:
+    """
+    Compare two runs case by case
+    
+    Returns:
+        List of regression descriptions (time or memory up by more than threshold)
+    """
+    base_cases = {entry["case"]: entry for entry in baseline["results"]}
+    regressions = []
+    print(f"{'case':<34} {'base ms':>10} {'new ms':>10} {'change':>8}  {'peak change':>11}")
+    for entry in current["results"]:
+        base = base_cases.get(entry["case"])
+        if base is None:
+            continue
+        change = entry["seconds"] / base["seconds"] - 1 if base["seconds"] else 0.0
+        mem_change = entry["peak_mb"] / base["peak_mb"] - 1 if base["peak_mb"] else 0.0
+        flags = []
+        if change > threshold and entry["seconds"] * 1000 >= MIN_FLAGGED_MS:
+            flags.append("SLOWER")
+        if mem_change > threshold and entry["peak_mb"] - base["peak_mb"] >= MIN_FLAGGED_MB:
+            flags.append("MORE MEMORY")
+        print(f"{entry['case']:<34} {base['seconds'] * 1000:>10.2f} "
+              f"{entry['seconds'] * 1000:>10.2f} {change:>+8.1%}  {mem_change:>+11.1%}  "
+              f"{' '.join(flags)}")
+        if flags:
+            regressions.append(f"{entry['case']}: {', '.join(flags).lower()}")
+    
+    missing = set(base_cases) - {entry["case"] for entry in current["results"]}
+    if missing:
+        print(f"\n{len(missing)} baseline cases were not run")
+    return regressions
+
+
+def load(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+    
+    run = commands.add_parser('run', help='Run the suite')
+    run.add_argument('--sizes', type=float, nargs='+', help='Cover sizes in megapixels')
+    run.add_argument('--payloads', nargs='+',
+                     help="Payload sizes in bytes, or 'full' for the image capacity")
+    run.add_argument('--quick', action='store_true', help='Small sizes only')
+    run.add_argument('--save', help='Write results to this JSON file')
+    run.add_argument('--compare', help='Baseline JSON to compare the results with')
+    run.add_argument('--threshold', type=float, default=0.15,
+                     help='Relative slowdown or memory growth flagged as a regression')
+    
+    cmp = commands.add_parser('compare', help='Compare two saved runs')
+    cmp.add_argument('baseline')
+    cmp.add_argument('current')
+    cmp.add_argument('--threshold', type=float, default=0.15)
+    
+    args = parser.parse_args()
+    
+    if args.command == 'run':
+        sizes = args.sizes or (QUICK_SIZES if args.quick else DEFAULT_SIZES)
+        payloads = args.payloads or (QUICK_PAYLOADS if args.quick else DEFAULT_PAYLOADS)
+        current = {"environment": environment(), "results": run_suite(sizes, payloads)}
+        if args.save:
+            with open(args.save, 'w') as f:
+                json.dump(current, f, indent=2)
+            print(f"\nSaved {len(current['results'])} cases to {args.save}")
+        if not args.compare:
+            return
+        baseline = load(args.compare)
+    else:
+        baseline, current = load(args.baseline), load(args.current)
+    
+    print()
+    regressions = compare(baseline, current, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regressions above {args.threshold:.0%}:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print(f"\nNo regressions above {args.threshold:.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Configuration for the StegoCrypt API
+Settings are read from environment variables (or a .env file)
+"""
+import os
+import tempfile
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def _int_env(name: str, default: int) -> int:
+    """Read an integer setting, falling back to default when unset"""
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+# Worker pool for CPU-bound stego and key-derivation work
+# "thread" or "process"; STEGO_WORKERS=0 runs the work on the event loop
+WORKER_POOL_KIND = os.getenv("STEGO_WORKER_POOL", "thread")
+WORKER_COUNT = _int_env("STEGO_WORKERS", os.cpu_count() or 1)
+# Requests allowed to wait for a worker before new ones get a 503
+WORKER_QUEUE_SIZE = _int_env("STEGO_WORKER_QUEUE", 2 * max(WORKER_COUNT, 1))
+RETRY_AFTER_SECONDS = _int_env("STEGO_RETRY_AFTER", 2)
+
+# Derived-key cache for repeated decodes with the same password (0 disables)
+KEY_CACHE_SIZE = _int_env("STEGO_KEY_CACHE_SIZE", 0)
+KEY_CACHE_TTL = _int_env("STEGO_KEY_CACHE_TTL", 300)
+
+# Upload limits, checked before any pixel is decoded: the largest image
+# file, the largest request body for the batch and multi-image endpoints,
+# and the most pixels an image may declare in its header, by endpoint
+MAX_UPLOAD_BYTES = _int_env("STEGO_MAX_UPLOAD_MB", 10) * 1024 * 1024
+MAX_BATCH_REQUEST_BYTES = _int_env("STEGO_MAX_BATCH_MB", 1024) * 1024 * 1024
+MAX_ENCODE_PIXELS = _int_env("STEGO_MAX_ENCODE_MP", 50) * 1_000_000
+MAX_DECODE_PIXELS = _int_env("STEGO_MAX_DECODE_MP", 50) * 1_000_000
+MAX_CAPACITY_PIXELS = _int_env("STEGO_MAX_CAPACITY_MP", 500) * 1_000_000
+
+# Decode cache: raw payloads extracted from uploads, keyed by a hash of the
+# image bytes, kept in memory up to STEGO_DECODE_CACHE_MB (0 disables) and,
+# when a directory is set, on disk up to STEGO_DECODE_CACHE_DISK_MB
+DECODE_CACHE_BYTES = _int_env("STEGO_DECODE_CACHE_MB", 64) * 1024 * 1024
+DECODE_CACHE_DIR = os.getenv("STEGO_DECODE_CACHE_DIR", "")
+DECODE_CACHE_DISK_BYTES = _int_env("STEGO_DECODE_CACHE_DISK_MB", 1024) * 1024 * 1024
+
+# Maximum number of images in one /encode/batch or /decode/batch request
+BATCH_MAX_ITEMS = _int_env("STEGO_BATCH_MAX_ITEMS", 500)
+
+# Images of at least this many megapixels are encoded strip by strip,
+# within a fixed working-memory budget (MB)
+STRIP_ENCODE_PIXELS = _int_env("STEGO_STRIP_ENCODE_MP", 16) * 1_000_000
+ENCODE_MEMORY_BUDGET = _int_env("STEGO_MEMORY_BUDGET_MB", 64) * 1024 * 1024
+
+# Per-stage timings in a Server-Timing response header, and Prometheus
+# metrics at /metrics (0 disables either; with both off nothing is timed)
+SERVER_TIMING = _int_env("STEGO_SERVER_TIMING", 1) > 0
+METRICS_ENABLED = _int_env("STEGO_METRICS", 1) > 0
+
+# Background jobs (/jobs): how many run at once, how many may be queued or
+# running, the largest upload (bytes and pixels) accepted, and where results
+# are kept, for how long and up to what total size
+JOB_CONCURRENCY = _int_env("STEGO_JOB_CONCURRENCY", max(WORKER_COUNT // 2, 1))
+JOB_MAX_PENDING = _int_env("STEGO_JOB_MAX_PENDING", 100)
+JOB_MAX_FILE_SIZE = _int_env("STEGO_JOB_MAX_FILE_MB", 200) * 1024 * 1024
+JOB_MAX_PIXELS = _int_env("STEGO_JOB_MAX_MP", 250) * 1_000_000
+JOB_STORE_DIR = os.getenv("STEGO_JOB_STORE", os.path.join(tempfile.gettempdir(), "stegocrypt-jobs"))
+JOB_STORE_MAX_BYTES = _int_env("STEGO_JOB_STORE_MB", 2048) * 1024 * 1024
+JOB_RESULT_TTL = _int_env("STEGO_JOB_TTL", 3600)
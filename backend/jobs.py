@@ -0,0 +1,521 @@
+"""
+Background Jobs for StegoCrypt
+In-process job scheduler and on-disk result store for the /jobs endpoints
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from stego import (
+    CapacityAnalyzer, LSBDecoder, LSBEncoder, PayloadCompressor, PayloadContainer, StripEncoder,
+    get_output_format, prepare_payload, recover_message, sniff_wav, PasswordRequiredError,
+    DecryptionError
+)
+from stego.timing import StageTimings, timed_call
+from workers import PoolSaturatedError, WorkerPool
+
+
+class JobError(Exception):
+    """A job failure with the HTTP status its result request should get"""
+    
+    def __init__(self, status: int, detail: str):
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+
+
+class JobQueueFullError(RuntimeError):
+    """Raised when too many jobs are waiting or running"""
+
+
+class ResultStore:
+    """
+    Job results as files in one directory, evicted by age and total size
+    
+    Each result is <id>.result with a <id>.json sidecar holding its
+    metadata; uploads waiting for their job are kept as <id>.input, and
+    results being written as <id>.result.partial. Results left by an
+    earlier process are picked up again; inputs, partial files and results
+    without a sidecar are discarded.
+    """
+    
+    def __init__(self, directory: str, max_bytes: int, ttl: float):
+        """
+        Args:
+            directory: Where results are written (created if missing)
+            max_bytes: Total size of results kept; the oldest go first
+            ttl: Seconds a result is kept after it was stored
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.evictions = 0
+        # job ID -> (stored at, size, metadata), oldest first
+        self._entries: "OrderedDict[str, Tuple[float, int, dict]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+    
+    def _load(self) -> None:
+        """Index results already on disk and drop leftover inputs and partial results"""
+        found = []
+        names = os.listdir(self.directory)
+        for name in names:
+            job_id, ext = os.path.splitext(name)
+            if ext in (".input", ".partial"):
+                self._remove(os.path.join(self.directory, name))
+            elif ext == ".json":
+                try:
+                    with open(self.meta_path(job_id)) as f:
+                        meta = json.load(f)
+                    found.append((meta["stored_at"], job_id, os.path.getsize(self.result_path(job_id)), meta))
+                except (OSError, ValueError, KeyError):
+                    self._delete_files(job_id)
+        # Results whose job died before storing the sidecar
+        indexed = {job_id for _, job_id, _, _ in found}
+        for name in names:
+            job_id, ext = os.path.splitext(name)
+            if ext == ".result" and job_id not in indexed:
+                self._remove(os.path.join(self.directory, name))
+        for stored_at, job_id, size, meta in sorted(found):
+            self._entries[job_id] = (stored_at, size, meta)
+            self._bytes += size
+        self.evict()
+    
+    def input_path(self, job_id: str) -> str:
+        """Where a job's upload waits until the job has run"""
+        return os.path.join(self.directory, f"{job_id}.input")
+    
+    def result_path(self, job_id: str) -> str:
+        """Where a job's finished result is kept"""
+        return os.path.join(self.directory, f"{job_id}.result")
+    
+    @staticmethod
+    def partial_path(path: str) -> str:
+        """Where a result is written until it is complete and renamed to path"""
+        return f"{path}.partial"
+    
+    def meta_path(self, job_id: str) -> str:
+        """Sidecar with a result's metadata"""
+        return os.path.join(self.directory, f"{job_id}.json")
+    
+    @staticmethod
+    def _remove(path: str) -> None:
+        """Delete a file that may already be gone"""
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    
+    def _delete_files(self, job_id: str) -> None:
+        """Delete a result and its sidecar"""
+        for path in (self.result_path(job_id), self.meta_path(job_id)):
+            self._remove(path)
+    
+    def add(self, job_id: str, meta: dict) -> None:
+        """
+        Register the result file a job has written, then enforce the limits
+        
+        Args:
+            job_id: Job whose result_path() now holds the result
+            meta: JSON-ready metadata returned along with the result
+        """
+        meta = dict(meta, stored_at=time.time())
+        with open(self.meta_path(job_id), 'w') as f:
+            json.dump(meta, f)
+        size = os.path.getsize(self.result_path(job_id))
+        with self._lock:
+            self._entries[job_id] = (meta["stored_at"], size, meta)
+            self._bytes += size
+        self.evict()
+    
+    def put(self, job_id: str, data: bytes, meta: dict) -> None:
+        """Write a result held in memory and register it"""
+        partial = self.partial_path(self.result_path(job_id))
+        with open(partial, 'wb') as f:
+            f.write(data)
+        os.replace(partial, self.result_path(job_id))
+        self.add(job_id, meta)
+    
+    def get(self, job_id: str) -> Optional[Tuple[str, dict]]:
+        """
+        Look up a stored result
+        
+        Returns:
+            Tuple of (result file path, metadata), or None if there is none
+            (never stored, expired or evicted)
+        """
+        self.evict()
+        with self._lock:
+            entry = self._entries.get(job_id)
+        if entry is None:
+            return None
+        return self.result_path(job_id), entry[2]
+    
+    def discard_input(self, job_id: str) -> None:
+        """Delete a job's upload once the job is over"""
+        self._remove(self.input_path(job_id))
+    
+    def evict(self) -> None:
+        """Drop expired results, then the oldest ones until the total fits"""
+        dropped = []
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            while self._entries:
+                job_id, (stored_at, size, _) = next(iter(self._entries.items()))
+                if stored_at > cutoff and self._bytes <= self.max_bytes:
+                    break
+                del self._entries[job_id]
+                self._bytes -= size
+                self.evictions += 1
+                dropped.append(job_id)
+        for job_id in dropped:
+            self._delete_files(job_id)
+    
+    def stats(self) -> dict:
+        """Number and total size of stored results"""
+        with self._lock:
+            return {
+                "results": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions
+            }
+
+
+class Job:
+    """State and progress of one background job"""
+    
+    def __init__(self, kind: str, steps: List[str]):
+        """
+        Args:
+            kind: "encode" or "decode"
+            steps: Names of the steps the job goes through, in order
+        """
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.state = "queued"
+        self.steps = {name: {"state": "pending", "seconds": None} for name in steps}
+        self.current: Optional[str] = None
+        self.timings = StageTimings()
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.error: Optional[JobError] = None
+        self.task: Optional[asyncio.Task] = None
+    
+    def begin_step(self, name: str) -> None:
+        """Mark a step as running"""
+        self.current = name
+        self.steps[name] = {"state": "running", "seconds": None, "_start": time.perf_counter()}
+    
+    def end_step(self, name: str, events: List[Tuple[str, float]] = ()) -> None:
+        """Mark a step as done and add the stage timings it recorded"""
+        start = self.steps[name].pop("_start")
+        self.steps[name] = {"state": "done", "seconds": round(time.perf_counter() - start, 4)}
+        self.timings.extend(list(events))
+        self.current = None
+    
+    def status(self) -> dict:
+        """JSON-ready state, step progress and stage timings"""
+        done = sum(step["state"] == "done" for step in self.steps.values())
+        status = {
+            "job_id": self.id,
+            "kind": self.kind,
+            "state": self.state,
+            "step": self.current,
+            "progress": round(done / len(self.steps), 3) if self.steps else 1.0,
+            "steps": [
+                {"name": name, "state": step["state"], "seconds": step["seconds"]}
+                for name, step in self.steps.items()
+            ],
+            "timings_ms": {
+                name: round(seconds * 1000, 1) for name, seconds in self.timings.totals().items()
+            },
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished
+        }
+        if self.error is not None:
+            status["error"] = {"status": self.error.status, "detail": self.error.detail}
+        return status
+
+
+class JobManager:
+    """Runs jobs on the worker pool, a few at a time, and keeps their state"""
+    
+    def __init__(
+        self,
+        pool: WorkerPool,
+        store: ResultStore,
+        concurrency: int = 1,
+        max_jobs: int = 100,
+        retry_delay: float = 1.0
+    ):
+        """
+        Args:
+            pool: Worker pool the job steps run on
+            store: Where results are written
+            concurrency: Jobs running at once
+            max_jobs: Jobs allowed to be queued or running
+            retry_delay: Seconds to wait when the pool is saturated
+        """
+        self.pool = pool
+        self.store = store
+        self.max_jobs = max_jobs
+        self.retry_delay = retry_delay
+        self._slots = asyncio.Semaphore(max(concurrency, 1))
+        self._jobs: Dict[str, Job] = {}
+    
+    def active(self) -> int:
+        """Jobs queued or running"""
+        return sum(job.state in ("queued", "running") for job in self._jobs.values())
+    
+    def counts(self) -> Dict[str, int]:
+        """Known jobs per state"""
+        counts = {"queued": 0, "running": 0, "done": 0, "failed": 0}
+        for job in self._jobs.values():
+            counts[job.state] += 1
+        return counts
+    
+    def submit(self, job: Job, work: Callable[[Job], Awaitable[None]]) -> Job:
+        """
+        Schedule work(job) and return at once
+        
+        Raises:
+            JobQueueFullError: If max_jobs jobs are already queued or running
+        """
+        self._prune()
+        if self.active() >= self.max_jobs:
+            raise JobQueueFullError("Too many jobs in progress")
+        self._jobs[job.id] = job
+        job.task = asyncio.create_task(self._run(job, work))
+        return job
+    
+    def get(self, job_id: str) -> Optional[Job]:
+        """Look up a job that has not been forgotten yet"""
+        self._prune()
+        return self._jobs.get(job_id)
+    
+    async def _run(self, job: Job, work: Callable[[Job], Awaitable[None]]) -> None:
+        async with self._slots:
+            job.state = "running"
+            job.started = time.time()
+            try:
+                await work(job)
+                job.state = "done"
+            except JobError as e:
+                job.error = e
+                job.state = "failed"
+            except asyncio.CancelledError:
+                job.error = JobError(503, "Server shut down before the job finished")
+                job.state = "failed"
+                raise
+            except Exception as e:
+                job.error = JobError(500, str(e))
+                job.state = "failed"
+            finally:
+                job.finished = time.time()
+                job.current = None
+                self.store.discard_input(job.id)
+    
+    async def step(self, job: Job, name: str, func: Callable, *args: Any) -> Any:
+        """
+        Run one step of a job on the worker pool, recording its stage timings
+        
+        Waits (rather than failing) while the pool is saturated by requests.
+        """
+        job.begin_step(name)
+        while True:
+            try:
+                result, events, _ = await self.pool.run(timed_call, func, *args)
+                break
+            except PoolSaturatedError:
+                await asyncio.sleep(self.retry_delay)
+        job.end_step(name, events)
+        return result
+    
+    def _prune(self) -> None:
+        """Forget finished jobs whose results have outlived the store's TTL"""
+        cutoff = time.time() - self.store.ttl
+        for job_id in [job_id for job_id, job in self._jobs.items()
+                       if job.finished is not None and job.finished < cutoff]:
+            del self._jobs[job_id]
+    
+    def shutdown(self) -> None:
+        """Cancel jobs still queued or running"""
+        for job in self._jobs.values():
+            if job.task is not None and not job.task.done():
+                job.task.cancel()
+
+
+def strip_encodes(
+    image_path: str,
+    output_format: str,
+    mode: str,
+    scatter_password: Optional[str],
+    strip_pixels: int
+) -> bool:
+    """Whether an encode goes strip by strip: an rgb1 PNG of a large cover that can be streamed"""
+    if mode != "rgb1" or scatter_password or get_output_format(output_format)["format"] != "PNG":
+        return False
+    capacity = CapacityAnalyzer.calculate_capacity(image_path, mode)
+    return capacity["total_pixels"] >= strip_pixels and StripEncoder.streamable(image_path)
+
+
+def encode_to_file(
+    image_path: str,
+    output_path: str,
+    payload: bytes,
+    flags: int,
+    output_format: str,
+    mode: str,
+    scatter_password: Optional[str],
+    strip_pixels: int,
+    memory_budget: int
+) -> int:
+    """
+    Encode into a result file (runs on the worker pool)
+    
+    Very large PNG outputs in rgb1 go strip by strip when the cover can be
+    read a strip at a time, as in /encode. WAV files are copied to the
+    result and embedded there through a memory map. The stego file is
+    written under a temporary name and only renamed to output_path once it
+    is complete, so a failed encode leaves nothing behind.
+    
+    Returns:
+        Size of the stego file in bytes
+    """
+    partial = ResultStore.partial_path(output_path)
+    try:
+        if sniff_wav(image_path):
+            LSBEncoder.encode_wav(image_path, payload, flags, mode, scatter_password, partial)
+        elif strip_encodes(image_path, output_format, mode, scatter_password, strip_pixels):
+            with open(partial, 'wb') as f:
+                StripEncoder.encode(image_path, payload, flags, memory_budget, f, output_format)
+        else:
+            stego = LSBEncoder.encode(image_path, payload, flags, output_format, mode, scatter_password)
+            with open(partial, 'wb') as f:
+                f.write(stego)
+        os.replace(partial, output_path)
+    except BaseException:
+        ResultStore._remove(partial)
+        raise
+    return os.path.getsize(output_path)
+
+
+def prepare_encode(
+    image_path: str,
+    message: str,
+    password: Optional[str],
+    compress: bool,
+    output_format: str,
+    mode: str,
+    scatter: bool
+) -> Tuple[bytes, int, dict]:
+    """
+    Build the payload and measure the image's capacity (runs on the worker pool)
+    
+    JPEG capacity needs the pixels transformed, so it is found here rather
+    than on the event loop.
+    
+    Returns:
+        Tuple of (payload, container flags, capacity dictionary)
+    """
+    payload, flags = prepare_payload(message, password, compress)
+    capacity = CapacityAnalyzer.output_capacity(image_path, output_format, mode, scatter)
+    return payload, flags, capacity
+
+
+async def run_encode_job(
+    manager: JobManager,
+    job: Job,
+    message: str,
+    password: Optional[str],
+    compress: bool,
+    output_format: str,
+    mode: str,
+    scatter: bool,
+    strip_pixels: int,
+    memory_budget: int
+) -> None:
+    """Steps of an encode job: prepare (compress, encrypt, capacity), embed (and save), store"""
+    store = manager.store
+    image_path = store.input_path(job.id)
+    payload, flags, capacity = await manager.step(
+        job, "prepare", prepare_encode, image_path, message, password, compress,
+        output_format, mode, scatter
+    )
+    if len(payload) > capacity["max_bytes"]:
+        raise JobError(
+            400,
+            f"Message too large. Max capacity: {capacity['max_kb']} KB, "
+            f"Message size: {round(len(payload) / 1024, 2)} KB"
+        )
+    
+    size = await manager.step(
+        job, "embed", encode_to_file, image_path, store.result_path(job.id), payload, flags,
+        output_format, mode, password if scatter else None, strip_pixels, memory_budget
+    )
+    
+    job.begin_step("store")
+    output = get_output_format(output_format)
+    store.add(job.id, {
+        "kind": "encode",
+        "media_type": output["media_type"],
+        "filename": f"stego_image{output['extension']}",
+        "headers": {
+            "X-Capacity-Used": str(round(len(payload) / capacity["max_bytes"] * 100, 2)),
+            "X-Encryption-Used": str(bool(flags & PayloadContainer.FLAG_ENCRYPTED)),
+            "X-Message-Size": str(len(payload)),
+            "X-Compression": PayloadCompressor.CODEC_NAMES[PayloadContainer.get_codec(flags)],
+            "X-Output-Format": output_format,
+            "X-Output-Size": str(size),
+            "X-Embed-Mode": capacity["mode"],
+            "X-Scatter": str(scatter)
+        }
+    })
+    job.end_step("store")
+
+
+async def run_decode_job(manager: JobManager, job: Job, password: Optional[str]) -> None:
+    """Steps of a decode job: extract, recover (decrypt, decompress), store"""
+    store = manager.store
+    try:
+        header, payload = await manager.step(
+            job, "extract", LSBDecoder.extract, store.input_path(job.id), password
+        )
+    except PasswordRequiredError as e:
+        raise JobError(401, str(e))
+    except ValueError as e:
+        raise JobError(404, str(e))
+    
+    try:
+        message, decryption_used = await manager.step(
+            job, "recover", recover_message, header, payload, password
+        )
+    except (PasswordRequiredError, DecryptionError) as e:
+        raise JobError(401, str(e))
+    
+    job.begin_step("store")
+    result = {
+        "success": True,
+        "message": message,
+        "decryption_used": decryption_used,
+        "message_length": len(message)
+    }
+    store.put(job.id, json.dumps(result).encode('utf-8'), {
+        "kind": "decode",
+        "media_type": "application/json"
+    })
+    job.end_step("store")
+
+
+ENCODE_STEPS = ["prepare", "embed", "store"]
+DECODE_STEPS = ["extract", "recover", "store"]
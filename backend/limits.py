@@ -0,0 +1,77 @@
+"""
+Upload Limits for StegoCrypt
+Caps request bodies by endpoint before the multipart parser spools them
+"""
+from typing import Dict, Optional
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+import metrics
+
+
+def size_detail(kind: str, limit: int) -> str:
+    """Error message for a body or file over limit bytes"""
+    return f"{kind} too large. Max size: {limit // (1024*1024)} MB"
+
+
+class BodyTooLargeError(HTTPException):
+    """413 raised while the request body is still arriving"""
+    
+    def __init__(self, limit: int):
+        super().__init__(status_code=413, detail=size_detail("Request", limit))
+
+
+class UploadLimitMiddleware:
+    """
+    ASGI middleware that limits request body sizes by endpoint
+    
+    A request whose Content-Length is over the limit gets a 413 without its
+    body being read. Bodies sent chunked, or longer than they claimed, are
+    cut off as soon as the bytes received pass the limit, so no more than
+    the limit is ever spooled to memory or disk.
+    """
+    
+    def __init__(self, app, router=None, limits: Optional[Dict[str, int]] = None, default: int = 0):
+        """
+        Args:
+            app: Wrapped ASGI application
+            router: Router whose route paths key the limits
+            limits: Body limit in bytes by route path
+            default: Limit for routes not in limits (0 for none)
+        """
+        self.app = app
+        self.router = router
+        self.limits = limits or {}
+        self.default = default
+    
+    def limit(self, scope: dict) -> int:
+        """Body limit for a request, 0 when unlimited"""
+        return self.limits.get(metrics.route_path(self.router, scope), self.default)
+    
+    async def __call__(self, scope, receive, send):
+        limit = self.limit(scope) if scope["type"] == "http" else 0
+        if limit <= 0:
+            await self.app(scope, receive, send)
+            return
+        
+        declared = dict(scope.get("headers", ())).get(b"content-length")
+        if declared is not None and declared.isdigit() and int(declared) > limit:
+            metrics.observe_rejection("body_size")
+            response = JSONResponse({"detail": size_detail("Request", limit)}, status_code=413)
+            await response(scope, receive, send)
+            return
+        
+        received = 0
+        
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    metrics.observe_rejection("body_size")
+                    # Request parsing passes HTTPExceptions through, so the
+                    # client gets this 413 rather than a parse error
+                    raise BodyTooLargeError(limit)
+            return message
+        
+        await self.app(scope, limited_receive, send)
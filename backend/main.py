@@ -2,18 +2,103 @@
 FastAPI Main Application for StegoCrypt
 Handles API endpoints for encoding, decoding, and capacity analysis
 """
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
-from fastapi.responses import StreamingResponse
+import asyncio
+import json
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Optional
+from fastapi import FastAPI, UploadFile, File, Form, Header, HTTPException
+from fastapi.responses import FileResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-import io
-import os
-from stego import AESCrypto, LSBEncoder, LSBDecoder, CapacityAnalyzer
+from PIL import Image
+from stego import (
+    AESCrypto, LSBEncoder, StripEncoder, LSBDecoder, CapacityAnalyzer, PayloadCompressor, PayloadContainer,
+    open_image, prepare_payload, recover_message, PasswordRequiredError, DecryptionError,
+    split_payload, assemble_shards, get_output_format, resolve_output_format, format_for_media_type,
+    get_embed_mode, detect, is_wav, sniff_wav
+)
+from stego.cache import PayloadCache, content_hash
+from stego.timing import current_timings, stage, timed_call
+import config
+import limits
+import metrics
+from batch import ZipStream, encode_item, output_name
+from jobs import (
+    DECODE_STEPS, ENCODE_STEPS, Job, JobManager, JobQueueFullError, ResultStore,
+    run_decode_job, run_encode_job
+)
+from workers import WorkerPool, PoolSaturatedError
+
+
+def configure_stego() -> None:
+    """Apply stego package settings (also run in each worker process)"""
+    if config.KEY_CACHE_SIZE > 0:
+        AESCrypto.enable_key_cache(config.KEY_CACHE_SIZE, ttl=config.KEY_CACHE_TTL)
+    # Pillow's own decompression-bomb guard, as a backstop to the per-endpoint
+    # pixel limits checked from image headers
+    Image.MAX_IMAGE_PIXELS = max(
+        config.MAX_ENCODE_PIXELS, config.MAX_DECODE_PIXELS,
+        config.MAX_CAPACITY_PIXELS, config.JOB_MAX_PIXELS
+    )
+
+
+configure_stego()
+
+# Pool for CPU-bound work (PBKDF2, embedding, extraction, PNG encoding)
+worker_pool = WorkerPool(
+    workers=config.WORKER_COUNT,
+    kind=config.WORKER_POOL_KIND,
+    queue_size=config.WORKER_QUEUE_SIZE,
+    initializer=configure_stego
+)
+
+# Raw payloads of recently decoded uploads (see extract_payload)
+decode_cache = PayloadCache(
+    config.DECODE_CACHE_BYTES, config.DECODE_CACHE_DIR or None, config.DECODE_CACHE_DISK_BYTES
+) if config.DECODE_CACHE_BYTES > 0 else None
+
+# Background jobs (/jobs), run on the same pool with results kept on disk
+job_store = ResultStore(config.JOB_STORE_DIR, config.JOB_STORE_MAX_BYTES, config.JOB_RESULT_TTL)
+job_manager = JobManager(
+    worker_pool, job_store,
+    concurrency=config.JOB_CONCURRENCY,
+    max_jobs=config.JOB_MAX_PENDING,
+    retry_delay=config.RETRY_AFTER_SECONDS
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Shut the jobs and the worker pool down with the app"""
+    yield
+    job_manager.shutdown()
+    worker_pool.shutdown()
+
 
 # Initialize FastAPI app
 app = FastAPI(
     title="StegoCrypt API",
     description="Image Steganography with AES-256 Encryption",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
+)
+
+# Room for the form fields sent alongside an image
+FORM_FIELDS_ALLOWANCE = 2 * 1024 * 1024
+
+# Request body limits by route (innermost, so 413s still carry CORS headers)
+app.add_middleware(
+    limits.UploadLimitMiddleware,
+    router=app.router,
+    limits={
+        "/encode/batch": config.MAX_BATCH_REQUEST_BYTES,
+        "/decode/batch": config.MAX_BATCH_REQUEST_BYTES,
+        "/encode/multi": config.MAX_BATCH_REQUEST_BYTES,
+        "/decode/multi": config.MAX_BATCH_REQUEST_BYTES,
+        "/jobs/encode": config.JOB_MAX_FILE_SIZE + FORM_FIELDS_ALLOWANCE,
+        "/jobs/decode": config.JOB_MAX_FILE_SIZE + FORM_FIELDS_ALLOWANCE,
+    },
+    default=config.MAX_UPLOAD_BYTES + FORM_FIELDS_ALLOWANCE
 )
 
 # CORS configuration
@@ -27,12 +112,31 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["X-Capacity-Used", "X-Encryption-Used", "X-Message-Size"],
+    expose_headers=[
+        "X-Capacity-Used", "X-Encryption-Used", "X-Message-Size", "X-Compression", "X-Shard-Count",
+        "X-Output-Format", "X-Output-Size", "X-Encode-Time", "X-Embed-Mode", "Retry-After",
+        "X-Scatter", "Server-Timing"
+    ],
 )
 
-# Allowed image formats
-ALLOWED_FORMATS = {'image/png', 'image/bmp', 'image/jpeg', 'image/jpg'}
-MAX_FILE_SIZE = 10 * 1024 * 1024  # 10 MB
+# Request and stage timing (outermost, so CORS preflights are counted too)
+app.add_middleware(
+    metrics.MetricsMiddleware,
+    router=app.router,
+    server_timing=config.SERVER_TIMING,
+    metrics=config.METRICS_ENABLED
+)
+
+# Content types of PCM WAV uploads, which carry payloads in their samples
+AUDIO_FORMATS = {'audio/wav', 'audio/x-wav', 'audio/wave', 'audio/vnd.wave'}
+
+# Allowed upload formats
+ALLOWED_FORMATS = {
+    'image/png', 'image/bmp', 'image/jpeg', 'image/jpg', 'image/webp', 'image/tiff'
+} | AUDIO_FORMATS
+
+# Chunk size for reading uploads
+UPLOAD_CHUNK = 1024 * 1024
 
 
 def validate_image(file: UploadFile) -> None:
@@ -41,7 +145,97 @@ def validate_image(file: UploadFile) -> None:
     if file.content_type not in ALLOWED_FORMATS:
         raise HTTPException(
             status_code=400,
-            detail=f"Invalid file format. Allowed: PNG, BMP, JPEG"
+            detail=f"Invalid file format. Allowed: PNG, BMP, JPEG, WebP, TIFF, WAV"
+        )
+
+
+def is_audio(file: UploadFile) -> bool:
+    """Whether an upload was sent as a WAV file"""
+    return file.content_type in AUDIO_FORMATS
+
+
+def choose_output_format(output_format: str = None, accept: str = None, audio: bool = False) -> str:
+    """
+    Pick the stego format from the form field, else the Accept header
+    
+    Accept entries are tried in order of their q-value; types without a
+    format for the carrier (e.g. */*, or image types for audio) fall back
+    to its default: PNG for images, WAV for audio.
+    """
+    if output_format:
+        name = output_format
+    else:
+        name = None
+        candidates = []
+        for position, entry in enumerate((accept or "").split(",")):
+            media_type, _, params = entry.strip().partition(";")
+            quality = 1.0
+            for param in params.split(";"):
+                key, _, value = param.strip().partition("=")
+                if key == "q":
+                    try:
+                        quality = float(value)
+                    except ValueError:
+                        quality = 0.0
+            if quality > 0:
+                candidates.append((-quality, position, media_type.strip().lower()))
+        for _, _, media_type in sorted(candidates):
+            match = format_for_media_type(media_type)
+            if match and (get_output_format(match)["engine"] == "wav") == audio:
+                name = match
+                break
+    
+    try:
+        return resolve_output_format(name, audio)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def choose_embed_mode(mode: str = None) -> str:
+    """Validate the embedding mode form field (default rgb1)"""
+    try:
+        get_embed_mode(mode)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return (mode or "rgb1").lower()
+
+
+def check_output_mode(format_name: str, mode_name: str, scatter: bool) -> None:
+    """Refuse embedding options the output format cannot keep"""
+    output = get_output_format(format_name)
+    if output["engine"] == "dct" and (mode_name != "rgb1" or scatter):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Output format {format_name} supports only the rgb1 mode, without scatter"
+        )
+    if get_embed_mode(mode_name)["alpha"] and not output["alpha"]:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Output format {format_name} cannot keep the alpha channel {mode_name} uses"
+        )
+
+
+async def run_in_pool(func, *args):
+    """
+    Run a CPU-bound call on the worker pool, or reject with 503 when saturated
+    
+    While the request is being timed, the worker's stage timings are added
+    to it, along with the time spent waiting for (and sending work to) a worker.
+    """
+    timings = current_timings()
+    try:
+        if timings is None:
+            return await worker_pool.run(func, *args)
+        start = time.perf_counter()
+        result, events, busy = await worker_pool.run(timed_call, func, *args)
+        timings.extend(events)
+        timings.add("pool_wait", time.perf_counter() - start - busy)
+        return result
+    except PoolSaturatedError:
+        raise HTTPException(
+            status_code=503,
+            detail="Server busy, please retry",
+            headers={"Retry-After": str(config.RETRY_AFTER_SECONDS)}
         )
 
 
@@ -55,7 +249,14 @@ async def root():
         "endpoints": {
             "encode": "/encode",
             "decode": "/decode",
-            "capacity": "/capacity"
+            "encode_batch": "/encode/batch",
+            "decode_batch": "/decode/batch",
+            "encode_multi": "/encode/multi",
+            "decode_multi": "/decode/multi",
+            "capacity": "/capacity",
+            "detect": "/detect",
+            "jobs": "/jobs",
+            "metrics": "/metrics"
         }
     }
 
@@ -64,80 +265,124 @@ async def root():
 async def encode_message(
     image: UploadFile = File(...),
     message: str = Form(...),
-    password: str = Form(None)
+    password: str = Form(None),
+    compress: bool = Form(True),
+    output_format: str = Form(None),
+    mode: str = Form(None),
+    scatter: bool = Form(False),
+    accept: str = Header(None)
 ):
     """
-    Encode a message into an image
+    Encode a message into an image or WAV file
     
-    - **image**: Image file (PNG, BMP, JPEG)
+    - **image**: Image file (PNG, BMP, JPEG, WebP, TIFF) or PCM WAV file
     - **message**: Secret message to hide
     - **password**: Optional password for AES-256 encryption
+    - **compress**: Compress the message before encryption when it helps
+    - **output_format**: png, png-fast, png-max, webp, bmp, tiff or jpeg; when
+      omitted the Accept header picks the format (default png). jpeg hides
+      the message in DCT coefficients and allows only rgb1 without scatter.
+      WAV files are always written as wav
+    - **mode**: Embedding mode, rgb1-rgb4 or rgba1-rgba4 (bits per channel,
+      optionally using the alpha channel); default rgb1. For WAV files
+      rgb1-rgb4 set the bits per sample
+    - **scatter**: Spread the payload over the image in an order keyed by
+      the password (needs a password)
     """
     try:
-        # Validate image
-        validate_image(image)
+        encryption_used = bool(password and password.strip())
+        if scatter and not encryption_used:
+            raise HTTPException(status_code=400, detail="Scatter embedding needs a password")
+        audio = is_audio(image)
+        format_name = choose_output_format(output_format, accept, audio)
+        output = get_output_format(format_name)
+        mode_name = choose_embed_mode(mode)
+        check_output_mode(format_name, mode_name, scatter)
+        
+        # Read image, refusing oversized files and pixel counts
+        image_bytes = await read_upload(image, config.MAX_ENCODE_PIXELS)
         
-        # Read image
-        image_bytes = await image.read()
+        # Validate the image header; pixels are decoded once, in the worker
+        # (WAV headers are checked by the capacity analysis)
+        if not audio:
+            try:
+                open_image(image_bytes)
+            except Exception as e:
+                raise HTTPException(status_code=400, detail=f"Invalid image: {str(e)}")
+        
+        # Check capacity (header only, usually cached by a prior /capacity call;
+        # JPEG capacity depends on the coefficients, so it runs in the worker)
+        with stage("capacity"):
+            try:
+                if output["engine"] == "dct":
+                    capacity_info = await run_in_pool(
+                        CapacityAnalyzer.output_capacity, image_bytes, format_name
+                    )
+                else:
+                    capacity_info = CapacityAnalyzer.calculate_capacity(image_bytes, mode_name, scatter)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
         
-        if len(image_bytes) > MAX_FILE_SIZE:
+        # Compress, then encrypt if password provided (binary AES-GCM, no base64)
+        try:
+            payload, flags = await run_in_pool(
+                prepare_payload, message, password if encryption_used else None, compress
+            )
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Encryption error: {str(e)}")
+        codec = PayloadContainer.get_codec(flags)
+        
+        # Check if message fits
+        message_size = len(payload)
+        metrics.observe_payload(message_size)
+        if message_size > capacity_info["max_bytes"]:
             raise HTTPException(
                 status_code=400,
-                detail=f"File too large. Max size: {MAX_FILE_SIZE // (1024*1024)} MB"
+                detail=f"Message too large. Max capacity: {capacity_info['max_kb']} KB, "
+                       f"Message size: {round(message_size/1024, 2)} KB"
             )
         
-        # Save temp file
-        temp_input_path = f"temp_input_{os.urandom(8).hex()}.png"
-        with open(temp_input_path, "wb") as f:
-            f.write(image_bytes)
-        
-        try:
-            # Check capacity
-            capacity_info = CapacityAnalyzer.calculate_capacity(temp_input_path)
-            
-            # Encrypt message if password provided
-            final_message = message
-            encryption_used = False
-            
-            if password and password.strip():
-                try:
-                    final_message = AESCrypto.encrypt(message, password)
-                    encryption_used = True
-                except Exception as e:
-                    raise HTTPException(status_code=500, detail=f"Encryption error: {str(e)}")
-            
-            # Check if message fits
-            message_size = len(final_message.encode('utf-8'))
-            if message_size > capacity_info["max_bytes"]:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Message too large. Max capacity: {capacity_info['max_kb']} KB, "
-                           f"Message size: {round(message_size/1024, 2)} KB"
-                )
-            
-            # Encode message
-            stego_image_bytes = LSBEncoder.encode(temp_input_path, final_message)
-            
-            # Calculate capacity used
-            capacity_used_percent = round((message_size / capacity_info["max_bytes"]) * 100, 2)
-            
-            # Return stego image
-            return StreamingResponse(
-                io.BytesIO(stego_image_bytes),
-                media_type="image/png",
-                headers={
-                    "Content-Disposition": "attachment; filename=stego_image.png",
-                    "X-Capacity-Used": str(capacity_used_percent),
-                    "X-Encryption-Used": str(encryption_used),
-                    "X-Message-Size": str(message_size)
-                }
+        # Encode message; very large images that can be read a strip at a
+        # time go strip by strip to bound memory, others are decoded whole
+        encode_start = time.perf_counter()
+        if (output["format"] == "PNG" and mode_name == "rgb1" and not scatter
+                and capacity_info["total_pixels"] >= config.STRIP_ENCODE_PIXELS
+                and StripEncoder.streamable(image_bytes)):
+            stego_image_bytes = await run_in_pool(
+                StripEncoder.encode, image_bytes, payload, flags,
+                config.ENCODE_MEMORY_BUDGET, None, format_name
             )
-            
-        finally:
-            # Cleanup temp file
-            if os.path.exists(temp_input_path):
-                os.remove(temp_input_path)
-                
+        else:
+            stego_image_bytes = await run_in_pool(
+                LSBEncoder.encode, image_bytes, payload, flags, format_name, mode_name,
+                password if scatter else None
+            )
+        encode_ms = (time.perf_counter() - encode_start) * 1000
+        
+        # Calculate capacity used
+        capacity_used_percent = round((message_size / capacity_info["max_bytes"]) * 100, 2)
+        
+        # Return stego image
+        return Response(
+            content=stego_image_bytes,
+            media_type=output["media_type"],
+            headers={
+                "Content-Disposition": f"attachment; filename=stego_image{output['extension']}",
+                "X-Capacity-Used": str(capacity_used_percent),
+                "X-Encryption-Used": str(encryption_used),
+                "X-Message-Size": str(message_size),
+                "X-Compression": PayloadCompressor.CODEC_NAMES[codec],
+                "X-Output-Format": format_name,
+                "X-Output-Size": str(len(stego_image_bytes)),
+                "X-Encode-Time": f"{encode_ms:.1f}",
+                "X-Embed-Mode": capacity_info["mode"],
+                "X-Scatter": str(scatter),
+                "Vary": "Accept"
+            }
+        )
+        
     except HTTPException:
         raise
     except Exception as e:
@@ -152,56 +397,460 @@ async def decode_message(
     """
     Decode a hidden message from an image
     
-    - **image**: Stego image file
+    - **image**: Stego image or WAV file
     - **password**: Password if message was encrypted
     """
     try:
-        # Validate image
-        validate_image(image)
+        # Read image, refusing oversized files and pixel counts
+        image_bytes = await read_upload(image, config.MAX_DECODE_PIXELS)
+        
+        # Extract the raw payload (scattered payloads need the password)
+        has_password = bool(password and password.strip())
+        try:
+            header, payload = await extract_payload(
+                image_bytes, password if has_password else None
+            )
+        except PasswordRequiredError as e:
+            raise HTTPException(status_code=401, detail=str(e))
+        metrics.observe_payload(len(payload))
         
-        # Read image
-        image_bytes = await image.read()
+        # Decrypt (if encrypted) and decompress
+        try:
+            final_message, decryption_used = await run_in_pool(
+                recover_message, header, payload, password if has_password else None
+            )
+        except (PasswordRequiredError, DecryptionError) as e:
+            raise HTTPException(status_code=401, detail=str(e))
         
-        # Save temp file
-        temp_path = f"temp_decode_{os.urandom(8).hex()}.png"
-        with open(temp_path, "wb") as f:
-            f.write(image_bytes)
+        return {
+            "success": True,
+            "message": final_message,
+            "decryption_used": decryption_used,
+            "message_length": len(final_message)
+        }
+        
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+async def read_chunks(upload: UploadFile, max_bytes: int) -> AsyncIterator[bytes]:
+    """Yield an upload in chunks, stopping with a 413 once it passes max_bytes"""
+    size = 0
+    while True:
+        chunk = await upload.read(UPLOAD_CHUNK)
+        if not chunk:
+            return
+        size += len(chunk)
+        if size > max_bytes:
+            metrics.observe_rejection("file_size")
+            raise HTTPException(status_code=413, detail=limits.size_detail("File", max_bytes))
+        yield chunk
+
+
+def check_pixels(source, max_pixels: int) -> Optional[int]:
+    """
+    Refuse an image with more than max_pixels pixels, reading only its header
+    
+    Args:
+        source: Image bytes or path
+        max_pixels: Pixel limit of the endpoint
+        
+    Returns:
+        Pixel count (also recorded for /metrics), or None when the header
+        cannot be read, which is left for the caller to report
+    """
+    try:
+        with open_image(source) as img:
+            pixels = img.width * img.height
+    except Image.DecompressionBombError:
+        # Over Pillow's own limit, which is the largest endpoint limit
+        pixels = max_pixels + 1
+    except Exception:
+        return None
+    if pixels > max_pixels:
+        metrics.observe_rejection("pixels")
+        raise HTTPException(
+            status_code=413,
+            detail=f"Image too large. Max size: {max_pixels / 1_000_000:g} megapixels"
+        )
+    metrics.observe_image(pixels)
+    return pixels
+
+
+def check_content(upload: UploadFile, wav: bool) -> None:
+    """Refuse an upload whose content does not match its audio or image type"""
+    if wav != is_audio(upload):
+        raise HTTPException(
+            status_code=400,
+            detail=f"File content does not match its type ({upload.content_type})"
+        )
+
+
+async def read_upload(upload: UploadFile, max_pixels: int) -> bytes:
+    """
+    Validate and read one uploaded image, within the file size and pixel limits
+    
+    WAV uploads are limited by file size only.
+    """
+    validate_image(upload)
+    data = bytearray()
+    with stage("read"):
+        async for chunk in read_chunks(upload, config.MAX_UPLOAD_BYTES):
+            data += chunk
+    wav = is_wav(data)
+    check_content(upload, wav)
+    if not wav:
+        check_pixels(data, max_pixels)
+    return bytes(data)
+
+
+async def extract_payload(image_bytes: bytes, password: Optional[str]) -> tuple:
+    """
+    Extract the raw payload of an upload, through the decode cache
+    
+    Payloads are cached before decryption, so a repeated upload only pays
+    for the hash and recover_message. Scattered payloads are not cached:
+    their position depends on the password, which a hit would not check.
+    
+    Args:
+        image_bytes: Uploaded image
+        password: Password, needed only for scattered payloads
         
+    Returns:
+        Tuple of (header dictionary, payload bytes)
+    """
+    if decode_cache is None:
+        return await run_in_pool(LSBDecoder.extract, image_bytes, password)
+    
+    with stage("cache"):
+        key = content_hash(image_bytes)
+        cached = decode_cache.get(key)
+    metrics.observe_cache_lookup(cached is not None)
+    if cached is not None:
+        return cached
+    
+    header, payload = await run_in_pool(LSBDecoder.extract, image_bytes, password)
+    if not header["flags"] & PayloadContainer.FLAG_SCATTER:
+        with stage("cache"):
+            decode_cache.put(key, header, payload)
+    return header, payload
+
+
+def batch_limiter() -> asyncio.Semaphore:
+    """Limit one batch to as many concurrent items as there are workers"""
+    return asyncio.Semaphore(max(worker_pool.workers, 1))
+
+
+def validate_batch(images: List[UploadFile]) -> None:
+    """Validate the number of images in a batch request"""
+    if len(images) > config.BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many images. Max batch size: {config.BATCH_MAX_ITEMS}"
+        )
+
+
+def error_detail(error: Exception) -> str:
+    """Message for a failed batch item"""
+    return error.detail if isinstance(error, HTTPException) else str(error)
+
+
+@app.post("/encode/batch")
+async def encode_batch(
+    images: List[UploadFile] = File(...),
+    messages: List[str] = Form(None),
+    message: str = Form(None),
+    password: str = Form(None),
+    compress: bool = Form(True),
+    output_format: str = Form(None)
+):
+    """
+    Encode messages into many images, streamed back as a ZIP archive
+    
+    - **images**: Image files (PNG, BMP, JPEG, WebP, TIFF) or WAV files
+    - **messages**: One message per image, in the same order
+    - **message**: Shared message for every image (when messages is not given)
+    - **password**: Optional shared password; the key is derived once per batch
+    - **compress**: Compress messages before encryption when it helps
+    - **output_format**: Stego image format for every image item (default
+      png); WAV items are always written as wav
+      
+    The archive holds one stego file per successful item, added as each one
+    finishes, and a manifest.ndjson with a success or error entry per item.
+    """
+    validate_batch(images)
+    try:
+        get_output_format(output_format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if messages:
+        if len(messages) != len(images):
+            raise HTTPException(
+                status_code=400,
+                detail=f"Got {len(messages)} messages for {len(images)} images"
+            )
+    elif message is None:
+        raise HTTPException(status_code=400, detail="Provide 'messages' or a shared 'message'")
+    
+    # Stretch the shared password once; every item gets its own nonce
+    salted_key = None
+    if password and password.strip():
+        salted_key = await run_in_pool(AESCrypto.new_gcm_key, password)
+    
+    limiter = batch_limiter()
+    
+    async def process(index: int, upload: UploadFile):
         try:
-            # Decode message
-            hidden_message = LSBDecoder.decode(temp_path)
-            
-            # Decrypt if password provided
-            decryption_used = False
-            final_message = hidden_message
-            
-            if password and password.strip():
-                try:
-                    final_message = AESCrypto.decrypt(hidden_message, password)
-                    decryption_used = True
-                except ValueError as e:
-                    raise HTTPException(
-                        status_code=401,
-                        detail="Wrong password or message was not encrypted with a password"
-                    )
-                except Exception as e:
-                    raise HTTPException(
-                        status_code=401,
-                        detail=f"Decryption failed: {str(e)}"
-                    )
-            
-            return {
-                "success": True,
-                "message": final_message,
-                "decryption_used": decryption_used,
-                "message_length": len(final_message)
-            }
+            async with limiter:
+                audio = is_audio(upload)
+                format_name = choose_output_format(None if audio else output_format, None, audio)
+                image_bytes = await read_upload(upload, config.MAX_ENCODE_PIXELS)
+                item_message = messages[index] if messages else message
+                stego_bytes, info = await run_in_pool(
+                    encode_item, image_bytes, item_message, compress, salted_key, format_name
+                )
+            metrics.observe_payload(info["message_size"])
+            return index, upload, stego_bytes, dict(info, output_format=format_name)
+        except Exception as e:
+            return index, upload, None, {"error": error_detail(e)}
+    
+    async def stream():
+        archive = ZipStream()
+        used_names = set()
+        manifest = []
+        tasks = [asyncio.create_task(process(i, upload)) for i, upload in enumerate(images)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                index, upload, stego_bytes, info = await next_done
+                entry = {"index": index, "filename": upload.filename}
+                if stego_bytes is None:
+                    entry.update(success=False, **info)
+                else:
+                    extension = get_output_format(info.pop("output_format"))["extension"]
+                    name = output_name(upload.filename, index, used_names, extension)
+                    entry.update(success=True, output=name, **info)
+                    yield archive.add(name, stego_bytes)
+                manifest.append(entry)
             
+            manifest.sort(key=lambda item: item["index"])
+            yield archive.add(
+                "manifest.ndjson", "".join(json.dumps(item) + "\n" for item in manifest)
+            )
+            yield archive.close()
         finally:
-            # Cleanup temp file
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
-                
+            for task in tasks:
+                task.cancel()
+    
+    return StreamingResponse(
+        stream(),
+        media_type="application/zip",
+        headers={"Content-Disposition": "attachment; filename=stego_batch.zip"}
+    )
+
+
+@app.post("/decode/batch")
+async def decode_batch(
+    images: List[UploadFile] = File(...),
+    password: str = Form(None)
+):
+    """
+    Decode hidden messages from many images, streamed back as NDJSON
+    
+    - **images**: Stego image files
+    - **password**: Optional shared password
+    
+    One JSON line is written per image as soon as it finishes. Images that
+    share an encryption salt (e.g. from one /encode/batch call) derive the
+    key once.
+    """
+    validate_batch(images)
+    has_password = bool(password and password.strip())
+    limiter = batch_limiter()
+    keys = {}
+    
+    async def key_for(salt: bytes) -> bytes:
+        if salt not in keys:
+            keys[salt] = asyncio.ensure_future(run_in_pool(AESCrypto.derive_key, password, salt))
+        return await keys[salt]
+    
+    async def process(index: int, upload: UploadFile) -> dict:
+        entry = {"index": index, "filename": upload.filename}
+        try:
+            async with limiter:
+                image_bytes = await read_upload(upload, config.MAX_DECODE_PIXELS)
+                header, payload = await extract_payload(
+                    image_bytes, password if has_password else None
+                )
+                metrics.observe_payload(len(payload))
+                key = None
+                if has_password and header["flags"] & PayloadContainer.FLAG_ENCRYPTED:
+                    key = await key_for(AESCrypto.gcm_salt(payload))
+                final_message, decryption_used = await run_in_pool(
+                    recover_message, header, payload, password if has_password else None, key
+                )
+            entry.update(
+                success=True,
+                message=final_message,
+                decryption_used=decryption_used,
+                message_length=len(final_message)
+            )
+        except Exception as e:
+            entry.update(success=False, error=error_detail(e))
+        return entry
+    
+    async def stream():
+        tasks = [asyncio.create_task(process(i, upload)) for i, upload in enumerate(images)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield json.dumps(await next_done) + "\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+            for future in keys.values():
+                future.cancel()
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+@app.post("/encode/multi")
+async def encode_multi(
+    images: List[UploadFile] = File(...),
+    message: str = Form(...),
+    password: str = Form(None),
+    compress: bool = Form(True),
+    output_format: str = Form(None)
+):
+    """
+    Split one message across several images, returned as a ZIP archive
+    
+    - **images**: Carrier images (PNG, BMP, JPEG, WebP, TIFF)
+    - **message**: Secret message to hide
+    - **password**: Optional password for AES-256 encryption
+    - **compress**: Compress the message before encryption when it helps
+    - **output_format**: Stego image format for every shard (default png;
+      jpeg is not supported, nor are WAV carriers)
+      
+    Each carrier gets a share proportional to its capacity and is encoded in
+    parallel. All returned images are needed to decode the message.
+    """
+    validate_batch(images)
+    format_name = choose_output_format(output_format)
+    if get_output_format(format_name)["engine"] != "lsb":
+        raise HTTPException(
+            status_code=400,
+            detail=f"Output format {format_name} cannot be used for multi-image encoding"
+        )
+    extension = get_output_format(format_name)["extension"]
+    if any(is_audio(upload) for upload in images):
+        raise HTTPException(status_code=400, detail="WAV files cannot be used for multi-image encoding")
+    uploads = [await read_upload(upload, config.MAX_ENCODE_PIXELS) for upload in images]
+    for image_bytes in uploads:
+        try:
+            open_image(image_bytes)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Invalid image: {str(e)}")
+    
+    encryption_used = bool(password and password.strip())
+    payload, flags = await run_in_pool(
+        prepare_payload, message, password if encryption_used else None, compress
+    )
+    
+    with stage("capacity"):
+        plan = CapacityAnalyzer.plan_shards(uploads, len(payload))
+    metrics.observe_payload(len(payload))
+    if not plan["fits"]:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Message too large. Total capacity: "
+                   f"{round(plan['total_capacity'] / 1024, 2)} KB, "
+                   f"Message size: {round(len(payload) / 1024, 2)} KB"
+        )
+    
+    # One worker call per carrier, run concurrently
+    shards = split_payload(payload, [entry["bytes"] for entry in plan["shards"]])
+    try:
+        encoded = await asyncio.gather(*(
+            run_in_pool(
+                LSBEncoder.encode,
+                uploads[entry["image"]],
+                shard,
+                flags | PayloadContainer.FLAG_SHARD,
+                format_name
+            )
+            for entry, shard in zip(plan["shards"], shards)
+        ))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    archive = ZipStream()
+    parts = []
+    used_names = set()
+    for entry, stego_bytes in zip(plan["shards"], encoded):
+        index = entry["image"]
+        name = output_name(images[index].filename, index, used_names, extension)
+        parts.append(archive.add(name, stego_bytes))
+    parts.append(archive.close())
+    
+    return Response(
+        content=b"".join(parts),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": "attachment; filename=stego_multi.zip",
+            "X-Capacity-Used": str(round(len(payload) / plan["total_capacity"] * 100, 2)),
+            "X-Encryption-Used": str(encryption_used),
+            "X-Message-Size": str(len(payload)),
+            "X-Compression": PayloadCompressor.CODEC_NAMES[PayloadContainer.get_codec(flags)],
+            "X-Shard-Count": str(plan["shard_count"])
+        }
+    )
+
+
+@app.post("/decode/multi")
+async def decode_multi(
+    images: List[UploadFile] = File(...),
+    password: str = Form(None)
+):
+    """
+    Decode a message that was split across several images
+    
+    - **images**: Every image returned by /encode/multi, in any order
+    - **password**: Password if message was encrypted
+    """
+    validate_batch(images)
+    uploads = [await read_upload(upload, config.MAX_DECODE_PIXELS) for upload in images]
+    has_password = bool(password and password.strip())
+    
+    try:
+        # Extract every shard in parallel, then stitch the payload together
+        try:
+            extracted = await asyncio.gather(
+                *(extract_payload(image_bytes, password if has_password else None)
+                  for image_bytes in uploads)
+            )
+        except PasswordRequiredError as e:
+            raise HTTPException(status_code=401, detail=str(e))
+        header, payload = assemble_shards(extracted)
+        metrics.observe_payload(len(payload))
+        
+        try:
+            final_message, decryption_used = await run_in_pool(
+                recover_message, header, payload, password if has_password else None
+            )
+        except (PasswordRequiredError, DecryptionError) as e:
+            raise HTTPException(status_code=401, detail=str(e))
+        
+        return {
+            "success": True,
+            "message": final_message,
+            "decryption_used": decryption_used,
+            "message_length": len(final_message),
+            "shard_count": len(uploads)
+        }
+        
     except HTTPException:
         raise
     except ValueError as e:
@@ -211,50 +860,254 @@ async def decode_message(
 
 
 @app.post("/capacity")
-async def check_capacity(image: UploadFile = File(...)):
+async def check_capacity(
+    image: UploadFile = File(...),
+    sample_message: str = Form(None),
+    encrypted: bool = Form(False),
+    mode: str = Form(None),
+    scatter: bool = Form(False),
+    output_format: str = Form(None)
+):
     """
-    Check maximum message capacity for an image
+    Check maximum message capacity for an image or WAV file
     
-    - **image**: Image file to analyze
+    - **image**: Image or WAV file to analyze
+    - **sample_message**: Optional message to estimate effective (compressed) capacity for
+    - **encrypted**: Include encryption overhead in the estimate
+    - **mode**: Embedding mode the capacity is reported for (default rgb1);
+      the capacity of every mode the image supports is listed under "modes"
+    - **scatter**: Report the capacity for scatter embedding
+    - **output_format**: Report the capacity of this stego format (default
+      png, or wav for WAV files); jpeg capacity depends on the image
+      content, so the image is decoded and limited to the encode pixel count
     """
     try:
-        # Validate image
-        validate_image(image)
+        mode_name = choose_embed_mode(mode)
+        format_name = choose_output_format(output_format, None, is_audio(image))
+        check_output_mode(format_name, mode_name, scatter)
+        dct = get_output_format(format_name)["engine"] == "dct"
+        
+        # Read image (LSB capacity needs only the header, so larger images pass)
+        image_bytes = await read_upload(
+            image, config.MAX_ENCODE_PIXELS if dct else config.MAX_CAPACITY_PIXELS
+        )
         
-        # Read image
-        image_bytes = await image.read()
+        # Calculate capacity
+        with stage("capacity"):
+            try:
+                if dct:
+                    capacity_info = await run_in_pool(
+                        CapacityAnalyzer.output_capacity, image_bytes, format_name
+                    )
+                else:
+                    capacity_info = CapacityAnalyzer.calculate_capacity(image_bytes, mode_name, scatter)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
         
-        # Save temp file
-        temp_path = f"temp_capacity_{os.urandom(8).hex()}.png"
-        with open(temp_path, "wb") as f:
-            f.write(image_bytes)
+        response = {
+            "success": True,
+            "capacity": capacity_info
+        }
+        
+        # Effective capacity after compression of a sample message
+        if sample_message:
+            response["effective"] = await run_in_pool(
+                CapacityAnalyzer.effective_capacity, image_bytes, sample_message, encrypted,
+                mode_name, scatter, format_name
+            )
+        
+        return response
         
-        try:
-            # Calculate capacity
-            capacity_info = CapacityAnalyzer.calculate_capacity(temp_path)
-            
-            return {
-                "success": True,
-                "capacity": capacity_info
-            }
-            
-        finally:
-            # Cleanup temp file
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
-                
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/detect")
+async def detect_payload(image: UploadFile = File(...)):
+    """
+    Check whether an image or WAV file carries a hidden message, without extracting it
+    
+    - **image**: Image or WAV file to check
+    
+    Only the first pixels (or samples) are read: the container header gives
+    the payload length, embedding mode and whether it is encrypted; legacy
+    images are recognised by their leading text.
+    """
+    image_bytes = await read_upload(image, config.MAX_DECODE_PIXELS)
+    try:
+        detection = await run_in_pool(detect, image_bytes)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {
+        "success": True,
+        "detection": detection
+    }
+
+
+def job_busy() -> HTTPException:
+    """503 for when the job queue is full"""
+    return HTTPException(
+        status_code=503,
+        detail="Too many jobs in progress, please retry",
+        headers={"Retry-After": str(config.RETRY_AFTER_SECONDS)}
+    )
+
+
+async def spool_job_upload(upload: UploadFile, job: Job) -> None:
+    """Validate an upload and copy it to the job store in chunks"""
+    validate_image(upload)
+    if job_manager.active() >= job_manager.max_jobs:
+        raise job_busy()
+    path = job_store.input_path(job.id)
+    try:
+        with stage("read"):
+            with open(path, 'wb') as f:
+                async for chunk in read_chunks(upload, config.JOB_MAX_FILE_SIZE):
+                    f.write(chunk)
+        wav = sniff_wav(path)
+        check_content(upload, wav)
+        if not wav and check_pixels(path, config.JOB_MAX_PIXELS) is None:
+            raise HTTPException(status_code=400, detail="Invalid image: cannot identify image file")
+    except BaseException:
+        job_store.discard_input(job.id)
+        raise
+
+
+def start_job(job: Job, work) -> dict:
+    """Schedule a job whose input is spooled and describe where to poll it"""
+    try:
+        job_manager.submit(job, work)
+    except JobQueueFullError:
+        job_store.discard_input(job.id)
+        raise job_busy()
+    return {
+        "success": True,
+        "job_id": job.id,
+        "state": job.state,
+        "status_url": f"/jobs/{job.id}",
+        "result_url": f"/jobs/{job.id}/result"
+    }
+
+
+@app.post("/jobs/encode", status_code=202)
+async def create_encode_job(
+    image: UploadFile = File(...),
+    message: str = Form(...),
+    password: str = Form(None),
+    compress: bool = Form(True),
+    output_format: str = Form(None),
+    mode: str = Form(None),
+    scatter: bool = Form(False),
+    accept: str = Header(None)
+):
+    """
+    Start encoding a message into an image in the background
+    
+    Takes the same fields as /encode and returns a job ID at once; poll
+    /jobs/{id} for progress and fetch the stego image from /jobs/{id}/result.
+    Uploads may be up to STEGO_JOB_MAX_FILE_MB.
+    """
+    encryption_used = bool(password and password.strip())
+    if scatter and not encryption_used:
+        raise HTTPException(status_code=400, detail="Scatter embedding needs a password")
+    format_name = choose_output_format(output_format, accept, is_audio(image))
+    mode_name = choose_embed_mode(mode)
+    check_output_mode(format_name, mode_name, scatter)
+    
+    job = Job("encode", ENCODE_STEPS)
+    await spool_job_upload(image, job)
+    return start_job(job, lambda job: run_encode_job(
+        job_manager, job, message, password if encryption_used else None, compress,
+        format_name, mode_name, scatter, config.STRIP_ENCODE_PIXELS, config.ENCODE_MEMORY_BUDGET
+    ))
+
+
+@app.post("/jobs/decode", status_code=202)
+async def create_decode_job(
+    image: UploadFile = File(...),
+    password: str = Form(None)
+):
+    """
+    Start decoding a hidden message in the background
+    
+    Returns a job ID at once; the result is the /decode response body.
+    """
+    has_password = bool(password and password.strip())
+    job = Job("decode", DECODE_STEPS)
+    await spool_job_upload(image, job)
+    return start_job(job, lambda job: run_decode_job(
+        job_manager, job, password if has_password else None
+    ))
+
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    """State, step progress and stage timings of a job"""
+    job = job_manager.get(job_id)
+    if job is not None:
+        return job.status()
+    # Results outlive the process that made them; the job details do not
+    stored = job_store.get(job_id)
+    if stored is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+    return {"job_id": job_id, "kind": stored[1]["kind"], "state": "done"}
+
+
+@app.get("/jobs/{job_id}/result")
+async def job_result(job_id: str):
+    """
+    Result of a finished job: the stego image of an encode, the JSON of a decode
+    
+    409 while the job is queued or running; a failed job answers with the
+    status /encode or /decode would have given.
+    """
+    job = job_manager.get(job_id)
+    if job is not None:
+        if job.state in ("queued", "running"):
+            raise HTTPException(
+                status_code=409,
+                detail=f"Job is {job.state}",
+                headers={"Retry-After": str(config.RETRY_AFTER_SECONDS)}
+            )
+        if job.state == "failed":
+            raise HTTPException(status_code=job.error.status, detail=job.error.detail)
+    
+    stored = job_store.get(job_id)
+    if stored is None:
+        if job is None:
+            raise HTTPException(status_code=404, detail="Unknown or expired job")
+        raise HTTPException(status_code=410, detail="Job result was evicted from the store")
+    path, meta = stored
+    headers = dict(meta.get("headers", {}))
+    if meta.get("filename"):
+        headers["Content-Disposition"] = f"attachment; filename={meta['filename']}"
+    return FileResponse(path, media_type=meta["media_type"], headers=headers)
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "service": "StegoCrypt API"}
 
 
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Prometheus metrics: request, stage and size histograms, in-flight requests, errors"""
+    if not config.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    for state, count in job_manager.counts().items():
+        metrics.JOBS.set(count, state=state)
+    metrics.JOB_STORE_BYTES.set(job_store.stats()["bytes"])
+    if decode_cache is not None:
+        for tier, stats in decode_cache.stats().items():
+            if stats is not None:
+                metrics.DECODE_CACHE_BYTES.set(stats["bytes"], tier=tier)
+    return PlainTextResponse(metrics.registry.render(), media_type=metrics.Registry.CONTENT_TYPE)
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,366 @@
+"""
+Metrics for StegoCrypt
+Minimal Prometheus-style counters, gauges and histograms with text exposition
+"""
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Tuple
+from starlette.routing import Match
+from stego.timing import StageTimings, record_stages, reset_stages
+
+
+# Request and stage latencies, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+MEGAPIXEL_BUCKETS = (0.1, 0.5, 1, 2, 5, 10, 20, 50, 100)
+PAYLOAD_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    """Render {name="value",...}, or an empty string without labels"""
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    """Escape a label value for the text format"""
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_number(value: float) -> str:
+    """Render a sample value, with +Inf for infinity"""
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """Labelled family of samples"""
+    
+    kind = ""
+    
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+    
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        """Label values in declaration order"""
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+    
+    def samples(self) -> List[str]:
+        """Sample lines of the text format"""
+        raise NotImplementedError
+    
+    def render(self) -> str:
+        """HELP and TYPE lines followed by the samples"""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+    
+    kind = "counter"
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+    
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        """Add amount to the labelled value"""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+    
+    def value(self, **labels: str) -> float:
+        """Current value for a label set"""
+        return self._values.get(self._key(labels), 0)
+    
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_number(value)}"
+                for key, value in items]
+
+
+class Gauge(_Metric):
+    """Value that goes up and down"""
+    
+    kind = "gauge"
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+    
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        """Add amount to the labelled value"""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+    
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        """Subtract amount from the labelled value"""
+        self.inc(-amount, **labels)
+    
+    def set(self, value: float, **labels: str) -> None:
+        """Replace the labelled value"""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+    
+    def value(self, **labels: str) -> float:
+        """Current value for a label set"""
+        return self._values.get(self._key(labels), 0)
+    
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_number(value)}"
+                for key, value in items]
+
+
+class Histogram(_Metric):
+    """Observations counted into cumulative buckets"""
+    
+    kind = "histogram"
+    
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = (),
+                 buckets: Iterable[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (last is +Inf), sum]
+        self._values: Dict[Tuple[str, ...], list] = {}
+    
+    def observe(self, value: float, **labels: str) -> None:
+        """Count value into its bucket"""
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+    
+    def count(self, **labels: str) -> int:
+        """Number of observations for a label set"""
+        entry = self._values.get(self._key(labels))
+        return sum(entry[0]) if entry else 0
+    
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        lines = []
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_number(float(bound))}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} "
+                             f"{cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_number(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Collection of metrics rendered together for /metrics"""
+    
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+    
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+    
+    def register(self, metric: _Metric) -> _Metric:
+        """Add a metric to the exposition"""
+        self._metrics.append(metric)
+        return metric
+    
+    def counter(self, name: str, documentation: str, labels: Iterable[str] = ()) -> Counter:
+        """Create and register a counter"""
+        return self.register(Counter(name, documentation, labels))
+    
+    def gauge(self, name: str, documentation: str, labels: Iterable[str] = ()) -> Gauge:
+        """Create and register a gauge"""
+        return self.register(Gauge(name, documentation, labels))
+    
+    def histogram(self, name: str, documentation: str, labels: Iterable[str] = (),
+                  buckets: Iterable[float] = LATENCY_BUCKETS) -> Histogram:
+        """Create and register a histogram"""
+        return self.register(Histogram(name, documentation, labels, buckets))
+    
+    def render(self) -> str:
+        """Prometheus text exposition of every metric"""
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+
+registry = Registry()
+
+REQUEST_SECONDS = registry.histogram(
+    "stegocrypt_request_duration_seconds", "Request latency by endpoint",
+    ["endpoint", "method"]
+)
+STAGE_SECONDS = registry.histogram(
+    "stegocrypt_stage_duration_seconds", "Time per processing stage within a request",
+    ["endpoint", "stage"]
+)
+IMAGE_MEGAPIXELS = registry.histogram(
+    "stegocrypt_image_megapixels", "Size of processed carrier images",
+    ["endpoint"], MEGAPIXEL_BUCKETS
+)
+PAYLOAD_BYTES = registry.histogram(
+    "stegocrypt_payload_bytes", "Size of embedded or extracted payloads",
+    ["endpoint"], PAYLOAD_BUCKETS
+)
+IN_FLIGHT = registry.gauge(
+    "stegocrypt_requests_in_flight", "Requests currently being handled",
+    ["endpoint"]
+)
+ERRORS = registry.counter(
+    "stegocrypt_request_errors_total", "Responses with a 4xx or 5xx status",
+    ["endpoint", "status"]
+)
+REJECTED = registry.counter(
+    "stegocrypt_rejected_uploads_total", "Uploads refused by the size or pixel limits",
+    ["endpoint", "reason"]
+)
+DECODE_CACHE = registry.counter(
+    "stegocrypt_decode_cache_lookups_total", "Decode cache lookups, by hit or miss",
+    ["endpoint", "result"]
+)
+DECODE_CACHE_BYTES = registry.gauge(
+    "stegocrypt_decode_cache_bytes", "Size of the cached decode payloads, by tier",
+    ["tier"]
+)
+JOBS = registry.gauge(
+    "stegocrypt_jobs", "Background jobs known to the scheduler, by state",
+    ["state"]
+)
+JOB_STORE_BYTES = registry.gauge(
+    "stegocrypt_job_store_bytes", "Size of the job results on disk"
+)
+
+
+# Endpoint of the request being handled, set while metrics are collected
+_endpoint: ContextVar[Optional[str]] = ContextVar("stegocrypt_endpoint", default=None)
+
+
+def observe_image(pixels: int) -> None:
+    """Record the size of a carrier image handled by the current request"""
+    endpoint = _endpoint.get()
+    if endpoint is not None:
+        IMAGE_MEGAPIXELS.observe(pixels / 1_000_000, endpoint=endpoint)
+
+
+def observe_payload(size: int) -> None:
+    """Record the size of a payload embedded or extracted by the current request"""
+    endpoint = _endpoint.get()
+    if endpoint is not None:
+        PAYLOAD_BYTES.observe(size, endpoint=endpoint)
+
+
+def observe_rejection(reason: str) -> None:
+    """Record an upload the current request refused (body_size, file_size or pixels)"""
+    endpoint = _endpoint.get()
+    if endpoint is not None:
+        REJECTED.inc(endpoint=endpoint, reason=reason)
+
+
+def observe_cache_lookup(hit: bool) -> None:
+    """Record a decode cache hit or miss for the current request"""
+    endpoint = _endpoint.get()
+    if endpoint is not None:
+        DECODE_CACHE.inc(endpoint=endpoint, result="hit" if hit else "miss")
+
+
+def collecting() -> bool:
+    """Whether the current request is being measured"""
+    return _endpoint.get() is not None
+
+
+def route_path(router, scope: dict) -> str:
+    """Route path template for a request, so labels stay bounded"""
+    for route in getattr(router, "routes", ()):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return "other"
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware that times requests and their stages
+    
+    Adds a Server-Timing header with the stage totals recorded so far when
+    the response starts (streamed responses report the stages before their
+    first byte) and feeds the request, stage and error metrics once the
+    response is complete. With both features off, requests pass straight
+    through.
+    """
+    
+    def __init__(self, app, router=None, server_timing: bool = True, metrics: bool = True):
+        """
+        Args:
+            app: Wrapped ASGI application
+            router: Router whose route paths label the metrics
+            server_timing: Send the Server-Timing header
+            metrics: Feed the /metrics histograms and counters
+        """
+        self.app = app
+        self.router = router
+        self.server_timing = server_timing
+        self.metrics = metrics
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not (self.server_timing or self.metrics):
+            await self.app(scope, receive, send)
+            return
+        
+        start = time.perf_counter()
+        timings = StageTimings()
+        timings_token = record_stages(timings)
+        endpoint = route_path(self.router, scope) if self.metrics else None
+        endpoint_token = _endpoint.set(endpoint)
+        status = 500
+        if endpoint is not None:
+            IN_FLIGHT.inc(endpoint=endpoint)
+        
+        async def timed_receive():
+            message = await receive()
+            # The request body has fully arrived
+            if message["type"] == "http.request" and not message.get("more_body"):
+                timings.add("upload", time.perf_counter() - start)
+            return message
+        
+        async def timed_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    value = timings.server_timing(total=time.perf_counter() - start)
+                    message = dict(message)
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"server-timing", value.encode("latin-1"))
+                    ]
+            await send(message)
+        
+        try:
+            await self.app(scope, timed_receive, timed_send)
+        finally:
+            reset_stages(timings_token)
+            _endpoint.reset(endpoint_token)
+            if endpoint is not None:
+                IN_FLIGHT.dec(endpoint=endpoint)
+                REQUEST_SECONDS.observe(time.perf_counter() - start,
+                                        endpoint=endpoint, method=scope["method"])
+                for name, seconds in timings.totals().items():
+                    STAGE_SECONDS.observe(seconds, endpoint=endpoint, stage=name)
+                if status >= 400:
+                    ERRORS.inc(endpoint=endpoint, status=str(status))
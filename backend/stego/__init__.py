@@ -1,7 +1,33 @@
 """StegoCrypt - Steganography Engine"""
 from .crypto import AESCrypto
 from .lsb_encoder import LSBEncoder
+from .strip_encoder import StripEncoder
 from .lsb_decoder import LSBDecoder
+from .dct_encoder import DCTEncoder
+from .dct_decoder import DCTDecoder
 from .capacity import CapacityAnalyzer
+from .container import PayloadContainer
+from .compression import PayloadCompressor
+from .image_io import open_image, load_rgb
+from .output_formats import (
+    OUTPUT_FORMATS, get_output_format, resolve_output_format, format_for_media_type
+)
+from .wav_carrier import WavCarrier, is_wav, sniff_wav
+from .embed_modes import EMBED_MODES, get_embed_mode
+from .detect import detect, scan_directory
+from .sharding import (
+    encode_shards, decode_shards, split_payload, join_shards, assemble_shards
+)
+from .pipeline import (
+    prepare_payload, recover_message, PasswordRequiredError, DecryptionError
+)
 
-__all__ = ['AESCrypto', 'LSBEncoder', 'LSBDecoder', 'CapacityAnalyzer']
+__all__ = ['AESCrypto', 'LSBEncoder', 'StripEncoder', 'LSBDecoder', 'DCTEncoder',
+           'DCTDecoder', 'CapacityAnalyzer', 'PayloadContainer',
+           'PayloadCompressor', 'open_image', 'load_rgb', 'OUTPUT_FORMATS',
+           'get_output_format', 'resolve_output_format', 'format_for_media_type',
+           'WavCarrier', 'is_wav', 'sniff_wav', 'EMBED_MODES', 'get_embed_mode',
+           'detect', 'scan_directory', 'prepare_payload', 'recover_message',
+           'PasswordRequiredError', 'DecryptionError',
+           'encode_shards', 'decode_shards', 'split_payload', 'join_shards',
+           'assemble_shards']
@@ -0,0 +1,5 @@
+"""Entry point for python -m stego (see cli.py)"""
+import sys
+from .cli import main
+
+sys.exit(main())
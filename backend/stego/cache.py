@@ -0,0 +1,338 @@
+"""
+Cache Module
+Bounded LRU caches used across the stego package
+"""
+import hashlib
+import json
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+
+def content_hash(data: bytes) -> str:
+    """Return a short hex digest identifying a blob of bytes"""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class LRUCache:
+    """Thread-safe LRU cache bounded by entry count (and optionally size), with hit/miss counters"""
+    
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: Optional[float] = None,
+        on_evict: Optional[Callable[[Hashable, Any], None]] = None,
+        max_bytes: Optional[int] = None,
+        sizeof: Callable[[Any], int] = len
+    ):
+        """
+        Args:
+            max_entries: Maximum number of entries kept
+            ttl: Seconds an entry stays valid, or None to keep it until evicted
+            on_evict: Called with (key, value) whenever an entry is dropped
+            max_bytes: Maximum total size of the values, or None for no limit
+            sizeof: Size of a value in bytes, used with max_bytes
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # key -> (expiry timestamp or None, value)
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def _drop(self, key: Hashable) -> None:
+        """Remove an entry and run the eviction callback (lock held)"""
+        _, value = self._data.pop(key)
+        self.evictions += 1
+        if self.max_bytes is not None:
+            self.bytes -= self.sizeof(value)
+        if self.on_evict is not None:
+            self.on_evict(key, value)
+    
+    def _expire(self) -> None:
+        """Drop every expired entry, so its eviction callback runs (lock held)"""
+        if self.ttl is None:
+            return
+        now = time.monotonic()
+        for key in [key for key, (expires, _) in self._data.items() if expires <= now]:
+            self._drop(key)
+    
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for key, marking it most recently used"""
+        with self._lock:
+            self._expire()
+            entry = self._data.get(key)
+            if entry is not None:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return default
+    
+    def put(self, key: Hashable, value: Any) -> None:
+        """Store value under key, evicting the least recently used entries"""
+        if self.max_entries <= 0:
+            return
+        expires = time.monotonic() + self.ttl if self.ttl is not None else None
+        size = self.sizeof(value) if self.max_bytes is not None else 0
+        with self._lock:
+            self._expire()
+            if key in self._data:
+                self._drop(key)
+            if self.max_bytes is not None and size > self.max_bytes:
+                # Would push out everything else and still not fit
+                return
+            self._data[key] = (expires, value)
+            self.bytes += size
+            while len(self._data) > self.max_entries or (
+                self.max_bytes is not None and self.bytes > self.max_bytes
+            ):
+                self._drop(next(iter(self._data)))
+    
+    def clear(self) -> None:
+        """Remove all entries and reset the counters"""
+        with self._lock:
+            while self._data:
+                self._drop(next(iter(self._data)))
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+    
+    def stats(self) -> dict:
+        """Return hit/miss counters and current size"""
+        with self._lock:
+            self._expire()
+            lookups = self.hits + self.misses
+            stats = {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._data),
+                "max_entries": self.max_entries
+            }
+            if self.max_bytes is not None:
+                stats.update(bytes=self.bytes, max_bytes=self.max_bytes)
+            return stats
+    
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class DiskCache:
+    """
+    Directory of blobs bounded by total size, evicting the least recently used
+    
+    Recency is the file modification time, refreshed on every hit, so
+    several processes can share one directory. Writes go through a temporary
+    file and an atomic rename; eviction rescans the directory.
+    """
+    
+    SUFFIX = ".bin"
+    
+    def __init__(self, directory: str, max_bytes: int):
+        """
+        Args:
+            directory: Directory for the cache files (created if missing)
+            max_bytes: Maximum total size of the files
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.bytes = sum(size for _, size, _ in self._scan())
+    
+    def _path(self, key: str) -> str:
+        """File for key (a hex digest, so always a safe file name)"""
+        return os.path.join(self.directory, key + self.SUFFIX)
+    
+    def _scan(self) -> list:
+        """(mtime, size, path) of every cache file, oldest first"""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(self.SUFFIX):
+                try:
+                    info = entry.stat()
+                except OSError:
+                    continue
+                entries.append((info.st_mtime, info.st_size, entry.path))
+        entries.sort()
+        return entries
+    
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the blob stored under key, marking it most recently used"""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return data
+    
+    def put(self, key: str, data: bytes) -> None:
+        """Store data under key, evicting the least recently used files"""
+        if len(data) > self.max_bytes:
+            return
+        path = self._path(key)
+        temp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp, 'wb') as f:
+                f.write(data)
+        except OSError:
+            if os.path.exists(temp):
+                os.remove(temp)
+            return
+        with self._lock:
+            # An overwrite only adds the difference to the tracked size
+            try:
+                replaced = os.stat(path).st_size
+            except OSError:
+                replaced = 0
+            try:
+                os.replace(temp, path)
+            except OSError:
+                if os.path.exists(temp):
+                    os.remove(temp)
+                return
+            self.bytes += len(data) - replaced
+            if self.bytes > self.max_bytes:
+                self._evict()
+    
+    def _evict(self) -> None:
+        """Remove the oldest files until the rest fit (lock held)"""
+        entries = self._scan()
+        self.bytes = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if self.bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self.bytes -= size
+            self.evictions += 1
+    
+    def clear(self) -> None:
+        """Remove every cache file and reset the counters"""
+        with self._lock:
+            for _, _, path in self._scan():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self.bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+    
+    def stats(self) -> dict:
+        """Return hit/miss counters and current size"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes
+            }
+
+
+class PayloadCache:
+    """
+    Raw extracted payloads keyed by a content hash of the carrier image
+    
+    Payloads are kept as extracted, before decryption, so a hit still needs
+    the password and no plaintext of an encrypted message is stored. The
+    memory tier is an LRU bounded by total bytes; the optional disk tier
+    keeps entries that memory evicts or that another process extracted.
+    """
+    
+    # Rough per-entry cost beyond the payload (key, header dict, bookkeeping)
+    ENTRY_OVERHEAD = 256
+    
+    def __init__(self, max_bytes: int, directory: Optional[str] = None, disk_max_bytes: int = 0):
+        """
+        Args:
+            max_bytes: Memory tier size
+            directory: Directory for the disk tier, or None for memory only
+            disk_max_bytes: Disk tier size
+        """
+        self.memory = LRUCache(
+            max(max_bytes // self.ENTRY_OVERHEAD, 1),
+            max_bytes=max_bytes,
+            sizeof=lambda entry: len(entry[1]) + self.ENTRY_OVERHEAD
+        )
+        self.disk = DiskCache(directory, disk_max_bytes) if directory and disk_max_bytes > 0 else None
+    
+    @staticmethod
+    def _pack(header: dict, payload: bytes) -> bytes:
+        """Disk format: header JSON length, header JSON, payload"""
+        meta = json.dumps(header).encode('utf-8')
+        return struct.pack('>I', len(meta)) + meta + payload
+    
+    @staticmethod
+    def _unpack(data: bytes) -> Tuple[dict, bytes]:
+        """Inverse of _pack"""
+        (size,) = struct.unpack_from('>I', data)
+        return json.loads(data[4:4 + size]), data[4 + size:]
+    
+    def get(self, key: str) -> Optional[Tuple[dict, bytes]]:
+        """
+        Look up a payload, in memory first and then on disk
+        
+        Args:
+            key: content_hash of the carrier image bytes
+            
+        Returns:
+            Tuple of (header dictionary, payload bytes), or None on a miss
+        """
+        entry = self.memory.get(key)
+        if entry is None and self.disk is not None:
+            data = self.disk.get(key)
+            if data is None:
+                return None
+            try:
+                entry = self._unpack(data)
+            except (struct.error, ValueError):
+                return None
+            self.memory.put(key, entry)
+        if entry is None:
+            return None
+        header, payload = entry
+        return dict(header), payload
+    
+    def put(self, key: str, header: dict, payload: bytes) -> None:
+        """Store an extracted payload in both tiers"""
+        self.memory.put(key, (dict(header), payload))
+        if self.disk is not None:
+            self.disk.put(key, self._pack(header, payload))
+    
+    def clear(self) -> None:
+        """Drop every entry from both tiers"""
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+    
+    def stats(self) -> dict:
+        """Return hit/miss counters and sizes of both tiers"""
+        return {
+            "memory": self.memory.stats(),
+            "disk": self.disk.stats() if self.disk is not None else None
+        }
@@ -2,73 +2,356 @@
 Capacity Analyzer Module
 Calculates maximum message capacity for an image
 """
-from PIL import Image
+from typing import List, Optional, Union
+import numpy as np
+from .cache import LRUCache, content_hash
+from .compression import PayloadCompressor
+from .container import PayloadContainer
+from .crypto import AESCrypto
+from .dct_encoder import DCTEncoder, DEFAULT_QUALITY
+from .embed_modes import (
+    DEFAULT_EMBED_MODE, EMBED_MODES, channel_capacity, get_embed_mode, payload_capacity
+)
+from .image_io import ImageSource, has_alpha, load_rgb, open_image
+from .jpeg_codec import forward
+from .output_formats import get_output_format
+from .wav_carrier import WavCarrier, sniff_wav
 
 
 class CapacityAnalyzer:
     """Analyze image capacity for steganography"""
     
+    # Results for uploaded bytes, keyed by content hash
+    CACHE_SIZE = 1024
+    _cache = LRUCache(CACHE_SIZE)
+    
     @staticmethod
-    def calculate_capacity(image_path: str) -> dict:
+    def calculate_capacity(
+        image: ImageSource,
+        mode: Optional[str] = None,
+        scatter: bool = False
+    ) -> dict:
         """
         Calculate maximum message capacity
         
+        Only the image header is read; pixels are never decoded. Results
+        for raw bytes are cached by content hash. WAV files are measured by
+        wav_capacity.
+        
+        Args:
+            image: Path, bytes, file-like object or PIL image (or WAV file)
+            mode: Embedding mode the main figures are for (default rgb1)
+            scatter: Whether the payload will be scattered (a seed is
+                stored ahead of it)
+                
+        Returns:
+            Dictionary with capacity information, including max_bytes for
+            every mode the image supports under "modes"
+        """
+        name = (mode or DEFAULT_EMBED_MODE).lower()
+        embed = get_embed_mode(name)
+        if sniff_wav(image):
+            return CapacityAnalyzer.wav_capacity(image, name, scatter)
+        
+        cache_key = None
+        if isinstance(image, (bytes, bytearray, memoryview)):
+            cache_key = (content_hash(image), name, bool(scatter))
+            cached = CapacityAnalyzer._cache.get(cache_key)
+            if cached is not None:
+                return dict(cached)
+        
+        try:
+            # Image.open parses the header only; size needs no pixel data
+            img = open_image(image)
+            width, height = img.size
+            alpha = has_alpha(img)
+            if img is not image:
+                img.close()
+            
+            # Total pixels
+            total_pixels = width * height
+            
+            # Channels carrying payload bits: RGB, plus alpha in rgba modes
+            channels = 4 if embed["alpha"] else 3
+            total_bits = total_pixels * channels * embed["bits"]
+            
+            # Available bytes after the container header
+            max_bytes = payload_capacity(
+                width, height, embed["bits"], embed["alpha"], scatter
+            )
+            
+            # Convert to KB
+            max_kb = max_bytes / 1024
+            
+            capacity = {
+                "max_bytes": max_bytes,
+                "max_kb": round(max_kb, 2),
+                "total_pixels": total_pixels,
+                "width": width,
+                "height": height,
+                "total_bits": total_bits,
+                "mode": name,
+                "has_alpha": alpha,
+                "scatter": bool(scatter),
+                "modes": {
+                    key: payload_capacity(width, height, spec["bits"], spec["alpha"], scatter)
+                    for key, spec in EMBED_MODES.items()
+                    if alpha or not spec["alpha"]
+                }
+            }
+            
+        except Exception as e:
+            raise ValueError(f"Failed to analyze image: {str(e)}")
+        
+        if embed["alpha"] and not alpha:
+            raise ValueError(f"Mode {name} needs an image with an alpha channel")
+        
+        if cache_key is not None:
+            CapacityAnalyzer._cache.put(cache_key, capacity)
+        return dict(capacity)
+    
+    @staticmethod
+    def wav_capacity(audio, mode: Optional[str] = None, scatter: bool = False) -> dict:
+        """
+        Calculate maximum message capacity of a PCM WAV file
+        
+        Only the RIFF chunk headers are read. Each sample carries the
+        mode's bits per channel, as one image channel would.
+        
+        Args:
+            audio: Path, bytes or file-like object of a WAV file
+            mode: rgb embedding mode the main figures are for (default rgb1)
+            scatter: Whether the payload will be scattered
+            
+        Returns:
+            Dictionary with capacity information, including max_bytes for
+            every rgb mode under "modes"
+        """
+        name = (mode or DEFAULT_EMBED_MODE).lower()
+        embed = get_embed_mode(name)
+        if embed["alpha"]:
+            raise ValueError(f"Mode {name} needs an alpha channel, which WAV files lack")
+        try:
+            with WavCarrier(audio) as carrier:
+                info = carrier.info()
+        except Exception as e:
+            raise ValueError(f"Failed to analyze audio: {str(e)}")
+        
+        samples = info["samples"]
+        max_bytes = channel_capacity(samples, embed["bits"], False, scatter)
+        return {
+            "max_bytes": max_bytes,
+            "max_kb": round(max_bytes / 1024, 2),
+            "carrier": "wav",
+            **info,
+            "total_bits": samples * embed["bits"],
+            "mode": name,
+            "scatter": bool(scatter),
+            "modes": {
+                key: channel_capacity(samples, spec["bits"], False, scatter)
+                for key, spec in EMBED_MODES.items()
+                if not spec["alpha"]
+            }
+        }
+    
+    @staticmethod
+    def dct_capacity(image: ImageSource, quality: int = DEFAULT_QUALITY) -> dict:
+        """
+        Calculate maximum message capacity of JPEG (DCT) output
+        
+        Capacity depends on the coefficients the image quantizes to, so
+        unlike calculate_capacity the pixels are decoded and transformed.
+        Results for raw bytes are cached by content hash.
+        
         Args:
-            image_path: Path to image file
+            image: Path, bytes, file-like object or PIL image
+            quality: JPEG quality the stego image will be written at
             
         Returns:
             Dictionary with capacity information
         """
+        cache_key = None
+        if isinstance(image, (bytes, bytearray, memoryview)):
+            cache_key = (content_hash(image), "dct", quality)
+            cached = CapacityAnalyzer._cache.get(cache_key)
+            if cached is not None:
+                return dict(cached)
+        
         try:
-            with Image.open(image_path) as img:
-                # Convert to RGB if needed
-                if img.mode != 'RGB':
-                    img = img.convert('RGB')
-                
-                width, height = img.size
-                
-                # Total pixels
-                total_pixels = width * height
-                
-                # Each pixel has 3 channels (RGB)
-                # We can use 1 bit per channel (LSB)
-                total_bits = total_pixels * 3
-                
-                # Account for delimiter (16 bits)
-                delimiter_bits = 16
-                
-                # Available bits for message
-                available_bits = total_bits - delimiter_bits
-                
-                # Convert to bytes
-                max_bytes = available_bits // 8
-                
-                # Convert to KB
-                max_kb = max_bytes / 1024
-                
-                return {
-                    "max_bytes": max_bytes,
-                    "max_kb": round(max_kb, 2),
-                    "total_pixels": total_pixels,
-                    "width": width,
-                    "height": height,
-                    "total_bits": total_bits
-                }
-                
+            img = load_rgb(image)
+            width, height = img.size
+            blocks = forward(np.asarray(img, dtype=np.uint8), quality)
+            max_bytes = DCTEncoder.capacity(blocks)
+            carriers = DCTEncoder.carrier_count(blocks)
+            
+            capacity = {
+                "max_bytes": max_bytes,
+                "max_kb": round(max_bytes / 1024, 2),
+                "total_pixels": width * height,
+                "width": width,
+                "height": height,
+                "carriers": carriers,
+                "mode": "dct",
+                "quality": quality,
+                "has_alpha": False,
+                "scatter": False
+            }
         except Exception as e:
             raise ValueError(f"Failed to analyze image: {str(e)}")
+        
+        if cache_key is not None:
+            CapacityAnalyzer._cache.put(cache_key, capacity)
+        return dict(capacity)
+    
+    @staticmethod
+    def output_capacity(
+        image: ImageSource,
+        output_format: Optional[str] = None,
+        mode: Optional[str] = None,
+        scatter: bool = False
+    ) -> dict:
+        """
+        Capacity of a stego image written in output_format
+        
+        Formats of the lsb engine use calculate_capacity (header only), as
+        does wav, whose carrier is the audio file itself; the dct engine
+        (jpeg) uses dct_capacity, which decodes the pixels.
+        
+        Args:
+            image: Path, bytes, file-like object or PIL image
+            output_format: Name of a format in OUTPUT_FORMATS (default png)
+            mode: Embedding mode, for lsb formats (default rgb1)
+            scatter: Whether the payload will be scattered, for lsb formats
+            
+        Returns:
+            Dictionary with capacity information
+        """
+        output = get_output_format(output_format)
+        if output["engine"] == "dct":
+            return CapacityAnalyzer.dct_capacity(image, output["params"]["quality"])
+        return CapacityAnalyzer.calculate_capacity(image, mode, scatter)
+    
+    @staticmethod
+    def cache_stats() -> dict:
+        """Return hit/miss counters of the capacity cache"""
+        return CapacityAnalyzer._cache.stats()
+    
+    @staticmethod
+    def effective_capacity(
+        image: ImageSource,
+        sample_message: Union[str, bytes],
+        encrypted: bool = False,
+        mode: Optional[str] = None,
+        scatter: bool = False,
+        output_format: Optional[str] = None
+    ) -> dict:
+        """
+        Estimate capacity for messages like sample_message
+        
+        The sample is run through the same compression stage as /encode; the
+        compression ratio it achieves is applied to the raw capacity.
+        
+        Args:
+            image: Path, bytes, file-like object or PIL image
+            sample_message: Representative message
+            encrypted: Account for the AES-GCM overhead
+            mode: Embedding mode (default rgb1)
+            scatter: Whether the payload will be scattered
+            output_format: Stego image format (default png)
+            
+        Returns:
+            Dictionary with payload size and effective capacity for the sample
+        """
+        capacity = CapacityAnalyzer.output_capacity(image, output_format, mode, scatter)
+        
+        sample = sample_message.encode('utf-8') if isinstance(sample_message, str) else sample_message
+        codec, compressed = PayloadCompressor.compress(sample)
+        overhead = AESCrypto.GCM_OVERHEAD if encrypted else 0
+        payload_bytes = len(compressed) + overhead
+        
+        # Bytes of similar content that fit once compressed
+        ratio = len(sample) / len(compressed) if compressed else 1.0
+        effective_max_bytes = max(int((capacity["max_bytes"] - overhead) * ratio), 0)
+        
+        max_bytes = capacity["max_bytes"]
+        capacity_used = round(payload_bytes / max_bytes * 100, 2) if max_bytes > 0 else 100.0
+        
+        return {
+            "sample_bytes": len(sample),
+            "payload_bytes": payload_bytes,
+            "codec": PayloadCompressor.CODEC_NAMES[codec],
+            "compression_ratio": round(ratio, 2),
+            "fits": payload_bytes <= max_bytes,
+            "capacity_used": capacity_used,
+            "effective_max_bytes": effective_max_bytes,
+            "effective_max_kb": round(effective_max_bytes / 1024, 2)
+        }
+    
+    @staticmethod
+    def plan_shards(images: List[ImageSource], payload_size: int) -> dict:
+        """
+        Plan how to split a payload over several carrier images
+        
+        Each image gets a share proportional to its capacity, so every
+        carrier is filled to about the same fraction and parallel encode and
+        decode work is balanced. Every shard also carries a shard header.
+        
+        Args:
+            images: Carrier images (paths, bytes, file-like objects or PIL images)
+            payload_size: Size of the payload to split, in bytes
+            
+        Returns:
+            Dictionary with the per-image layout and whether the payload fits
+        """
+        capacities = [
+            max(CapacityAnalyzer.calculate_capacity(image)["max_bytes"]
+                - PayloadContainer.SHARD_HEADER_SIZE, 0)
+            for image in images
+        ]
+        total_capacity = sum(capacities)
+        fits = (
+            0 < len(images) <= PayloadContainer.MAX_SHARDS
+            and payload_size <= total_capacity
+        )
+        
+        sizes = [0] * len(images)
+        if fits and total_capacity > 0:
+            # Proportional share, then hand out the rounding remainder
+            for i, capacity in enumerate(capacities):
+                sizes[i] = payload_size * capacity // total_capacity
+            remainder = payload_size - sum(sizes)
+            for i, capacity in enumerate(capacities):
+                extra = min(remainder, capacity - sizes[i])
+                sizes[i] += extra
+                remainder -= extra
+        
+        # Images that get no data are left out; an empty payload still needs one shard
+        shards = [
+            {"image": i, "bytes": size, "capacity": capacities[i]}
+            for i, size in enumerate(sizes) if size > 0
+        ]
+        if fits and not shards:
+            shards = [{"image": 0, "bytes": 0, "capacity": capacities[0]}]
+        
+        return {
+            "fits": fits,
+            "payload_bytes": payload_size,
+            "total_capacity": total_capacity,
+            "shard_count": len(shards) if fits else 0,
+            "shards": shards if fits else []
+        }
     
     @staticmethod
-    def can_fit_message(image_path: str, message_length: int) -> bool:
+    def can_fit_message(image: ImageSource, message_length: int) -> bool:
         """
         Check if message can fit in image
         
         Args:
-            image_path: Path to image
+            image: Path, bytes, file-like object or PIL image
             message_length: Length of message in bytes
             
         Returns:
             True if message fits, False otherwise
         """
-        capacity = CapacityAnalyzer.calculate_capacity(image_path)
+        capacity = CapacityAnalyzer.calculate_capacity(image)
         return message_length <= capacity["max_bytes"]
@@ -0,0 +1,402 @@
+"""
+Command-Line Interface
+Bulk encode, decode, capacity and scan jobs over directories, on a process pool
+
+Run from the backend directory:
+    python -m stego scan archive/ --carriers-only
+    python -m stego encode covers/ --message "Meet at noon" --password pw --out-dir stego/
+    find archive -name '*.png' | python -m stego decode --password pw -o results.jsonl
+    python -m stego capacity covers/ --mode rgb2 --workers 4
+    
+Inputs are files or directories (walked recursively); with no inputs, or
+"-", paths are read from stdin, one per line. Every file produces one JSON
+line on stdout (or in the -o log) as soon as it is done, with "ok" false and
+an "error" for files that failed. A throughput summary goes to stderr at the
+end. An interrupted run continues with --resume, which skips every file the
+log already has a successful line for.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Callable, Iterable, Iterator, Optional, Set, TextIO, Tuple
+
+from .capacity import CapacityAnalyzer
+from .container import PayloadContainer
+from .compression import PayloadCompressor
+from .crypto import AESCrypto
+from .detect import detect
+from .embed_modes import EMBED_MODES, get_embed_mode
+from .image_io import iter_image_files, open_image
+from .lsb_decoder import LSBDecoder
+from .lsb_encoder import LSBEncoder
+from .output_formats import OUTPUT_FORMATS, get_output_format, resolve_output_format
+from .pipeline import prepare_payload, recover_message
+from .wav_carrier import sniff_wav
+
+
+# Environment variable read when --password is not given
+PASSWORD_ENV = "STEGO_PASSWORD"
+
+# Files submitted ahead of the results, per worker
+QUEUE_PER_WORKER = 4
+
+# Command and options of the current run, set in each worker by _init_worker
+_job: Tuple[str, dict] = ("", {})
+
+
+def _init_worker(command: str, options: dict) -> None:
+    """Receive the run's settings once per worker instead of with every file"""
+    global _job
+    _job = (command, options)
+    if command == "decode":
+        # Images encoded together share a salt; derive each key once per worker
+        AESCrypto.enable_key_cache()
+
+
+def _pixels(path: str) -> int:
+    """Pixel count from the image header (0 for WAV files)"""
+    if sniff_wav(path):
+        return 0
+    with open_image(path) as img:
+        return img.width * img.height
+
+
+def _encode(path: str, relative: str, options: dict) -> dict:
+    payload, flags = prepare_payload(
+        options["message"], compress=options["compress"], salted_key=options["salted_key"]
+    )
+    wav = sniff_wav(path)
+    # --format names the image format; WAV files are always written as wav
+    output_format = get_output_format(resolve_output_format(None if wav else options["format"], wav))
+    output = os.path.join(
+        options["out_dir"], os.path.splitext(relative)[0] + output_format["extension"]
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    scatter_password = options["password"] if options["scatter"] else None
+    if wav:
+        # Copied and memory-mapped, so long recordings stay out of memory
+        LSBEncoder.encode_wav(path, payload, flags, options["mode"], scatter_password, output)
+    else:
+        stego = LSBEncoder.encode(
+            path, payload, flags, options["format"], options["mode"], scatter_password
+        )
+        with open(output, 'wb') as f:
+            f.write(stego)
+    return {
+        "output": output,
+        "message_size": len(payload),
+        "encryption_used": bool(flags & PayloadContainer.FLAG_ENCRYPTED),
+        "compression": PayloadCompressor.CODEC_NAMES[PayloadContainer.get_codec(flags)],
+        "mode": "dct" if output_format["engine"] == "dct" else options["mode"],
+        "output_size": os.path.getsize(output),
+        "pixels": _pixels(path)
+    }
+
+
+def _decode(path: str, relative: str, options: dict) -> dict:
+    # Non-carriers are turned away after their first pixels
+    detection = detect(path)
+    if not detection["found"]:
+        raise ValueError(f"No hidden message found in image: {detection['reason']}")
+    header, data = LSBDecoder.extract(path, options["password"])
+    message, decryption_used = recover_message(header, data, options["password"])
+    return {
+        "message": message,
+        "decryption_used": decryption_used,
+        "message_length": len(message),
+        "pixels": _pixels(path)
+    }
+
+
+def _capacity(path: str, relative: str, options: dict) -> dict:
+    capacity = CapacityAnalyzer.calculate_capacity(path, options["mode"], options["scatter"])
+    return {**capacity, "pixels": capacity.get("total_pixels", 0)}
+
+
+def _scan(path: str, relative: str, options: dict) -> dict:
+    result = detect(path)
+    return {**result, "pixels": result.get("width", 0) * result.get("height", 0)}
+
+
+HANDLERS = {
+    "encode": _encode,
+    "decode": _decode,
+    "capacity": _capacity,
+    "scan": _scan
+}
+
+
+def process_file(path: str, relative: str) -> dict:
+    """
+    Run the current command on one file (in a worker)
+    
+    Returns:
+        JSON-ready record with path, ok, the command's fields and seconds
+    """
+    command, options = _job
+    start = time.perf_counter()
+    try:
+        fields = HANDLERS[command](path, relative, options)
+        record = {"path": path, "ok": True, **fields}
+    except Exception as e:
+        record = {"path": path, "ok": False, "error": str(e)}
+    record["seconds"] = round(time.perf_counter() - start, 4)
+    return record
+
+
+def iter_inputs(
+    inputs: Iterable[str],
+    recursive: bool = True,
+    stdin: TextIO = sys.stdin
+) -> Iterator[Tuple[str, str]]:
+    """
+    Expand files, directories and stdin lists into (path, relative path) pairs
+    
+    The relative path (within its directory argument, or the bare file name)
+    names encode outputs.
+    """
+    inputs = list(inputs) or ["-"]
+    for item in inputs:
+        if item == "-":
+            for line in stdin:
+                path = line.strip()
+                if path:
+                    yield path, os.path.basename(path)
+        elif os.path.isdir(item):
+            for path in iter_image_files(item, recursive):
+                yield path, os.path.relpath(path, item)
+        else:
+            yield item, os.path.basename(item)
+
+
+def completed_paths(log_path: str) -> Set[str]:
+    """Paths with a successful record in an earlier run's log"""
+    done = set()
+    if not os.path.exists(log_path):
+        return done
+    with open(log_path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # The line being written when the run was interrupted
+                continue
+            if record.get("ok"):
+                done.add(record["path"])
+    return done
+
+
+def open_log(log_path: str, resume: bool) -> TextIO:
+    """Open the output log, appending on resume (after any partial last line)"""
+    if resume and os.path.exists(log_path):
+        partial = False
+        with open(log_path, 'rb') as f:
+            if f.seek(0, os.SEEK_END) > 0:
+                f.seek(-1, os.SEEK_END)
+                partial = f.read(1) != b"\n"
+        out = open(log_path, 'a', encoding='utf-8')
+        if partial:
+            out.write("\n")
+        return out
+    return open(log_path, 'w', encoding='utf-8')
+
+
+def run(
+    command: str,
+    options: dict,
+    tasks: Iterable[Tuple[str, str]],
+    out: TextIO,
+    workers: int,
+    skip: Optional[Set[str]] = None,
+    keep: Optional[Callable[[dict], bool]] = None
+) -> dict:
+    """
+    Process every task and write one JSON line per file as it completes
+    
+    Args:
+        command: Key of HANDLERS
+        options: Settings every file is processed with
+        tasks: (path, relative path) pairs
+        out: Text stream the JSON lines go to (flushed after each line)
+        workers: Worker processes (0 processes files in this process)
+        skip: Paths to leave out (already done)
+        keep: Optional predicate; records it rejects are counted but not written
+        
+    Returns:
+        Summary with ok, failed and skipped counts, seconds, files/s and MP/s
+    """
+    skip = skip or set()
+    summary = {"ok": 0, "failed": 0, "skipped": 0, "megapixels": 0.0}
+    
+    def emit(record: dict) -> None:
+        pixels = record.pop("pixels", 0)
+        summary["ok" if record["ok"] else "failed"] += 1
+        summary["megapixels"] += pixels / 1_000_000
+        if keep is None or keep(record):
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+    
+    start = time.perf_counter()
+    executor = None
+    if workers > 0:
+        executor = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(command, options))
+    else:
+        _init_worker(command, options)
+    
+    pending = set()
+    interrupted = False
+    try:
+        for path, relative in tasks:
+            if path in skip:
+                summary["skipped"] += 1
+                continue
+            if executor is None:
+                emit(process_file(path, relative))
+                continue
+            pending.add(executor.submit(process_file, path, relative))
+            # Bounded queue: file lists can be far longer than memory allows
+            if len(pending) >= workers * QUEUE_PER_WORKER:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    emit(future.result())
+        while pending:
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                emit(future.result())
+    except KeyboardInterrupt:
+        interrupted = True
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=not interrupted, cancel_futures=True)
+    
+    seconds = time.perf_counter() - start
+    processed = summary["ok"] + summary["failed"]
+    summary.update(
+        interrupted=interrupted,
+        seconds=round(seconds, 3),
+        files_per_second=round(processed / seconds, 2) if seconds else 0.0,
+        megapixels_per_second=round(summary["megapixels"] / seconds, 2) if seconds else 0.0,
+        megapixels=round(summary["megapixels"], 3)
+    )
+    return summary
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m stego", description=__doc__.strip().splitlines()[1]
+    )
+    commands = parser.add_subparsers(dest='command', required=True)
+    
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('inputs', nargs='*',
+                        help="Image files or directories; '-' or none reads paths from stdin")
+    common.add_argument('-o', '--output', help='Write JSON lines to this log instead of stdout')
+    common.add_argument('--resume', action='store_true',
+                        help='Append to the log, skipping files it already has a successful line for')
+    common.add_argument('-w', '--workers', type=int, default=os.cpu_count() or 1,
+                        help='Worker processes (0 runs in this process)')
+    common.add_argument('--no-recursive', dest='recursive', action='store_false',
+                        help='Only the top level of directory inputs')
+    
+    encode = commands.add_parser('encode', parents=[common], help='Hide a message in every image')
+    message = encode.add_mutually_exclusive_group(required=True)
+    message.add_argument('-m', '--message', help='Message to hide')
+    message.add_argument('--message-file', help='Read the message from this file')
+    encode.add_argument('--out-dir', required=True,
+                        help='Directory for stego images (input layout is kept)')
+    encode.add_argument('--password', help=f'Encrypt with this password (default ${PASSWORD_ENV})')
+    encode.add_argument('--no-compress', dest='compress', action='store_false')
+    encode.add_argument('--format', choices=list(OUTPUT_FORMATS),
+                        help='Output format for images (default png); WAV files stay wav')
+    encode.add_argument('--mode', default='rgb1', choices=list(EMBED_MODES))
+    encode.add_argument('--scatter', action='store_true',
+                        help='Scatter the payload in a password-keyed order')
+    
+    decode = commands.add_parser('decode', parents=[common], help='Extract hidden messages')
+    decode.add_argument('--password', help=f'Password of encrypted messages (default ${PASSWORD_ENV})')
+    
+    capacity = commands.add_parser('capacity', parents=[common], help='Report image capacity')
+    capacity.add_argument('--mode', default='rgb1', choices=list(EMBED_MODES))
+    capacity.add_argument('--scatter', action='store_true')
+    
+    scan = commands.add_parser('scan', parents=[common],
+                               help='Detect payloads from the image headers only')
+    scan.add_argument('--carriers-only', action='store_true',
+                      help='Only write lines for images that carry a payload')
+    
+    return parser
+
+
+def options_for(args: argparse.Namespace, parser: argparse.ArgumentParser) -> dict:
+    """Per-file settings for a command, checked up front"""
+    password = getattr(args, 'password', None) or os.getenv(PASSWORD_ENV) or None
+    if args.command == 'encode':
+        if args.scatter and not password:
+            parser.error("--scatter needs a password")
+        if get_embed_mode(args.mode)["alpha"] and not get_output_format(args.format)["alpha"]:
+            parser.error(f"--format {args.format} cannot keep the alpha channel {args.mode} uses")
+        if get_output_format(args.format)["engine"] == "dct" and (args.mode != "rgb1" or args.scatter):
+            parser.error(f"--format {args.format} supports only --mode rgb1, without --scatter")
+        if args.message_file:
+            with open(args.message_file, encoding='utf-8') as f:
+                text = f.read()
+        else:
+            text = args.message
+        return {
+            "message": text,
+            "compress": args.compress,
+            "format": args.format,
+            "mode": args.mode,
+            "out_dir": args.out_dir,
+            "scatter": args.scatter,
+            "password": password,
+            # One key derivation for the whole run, as in /encode/batch
+            "salted_key": AESCrypto.new_gcm_key(password) if password else None
+        }
+    if args.command == 'decode':
+        return {"password": password}
+    if args.command == 'capacity':
+        return {"mode": args.mode, "scatter": args.scatter}
+    return {}
+
+
+def main(argv=None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    options = options_for(args, parser)
+    
+    if args.resume and not args.output:
+        parser.error("--resume needs an --output log")
+    skip = completed_paths(args.output) if args.resume else set()
+    out = open_log(args.output, args.resume) if args.output else sys.stdout
+    keep = None
+    if args.command == 'scan' and args.carriers_only:
+        keep = lambda record: record.get("found")
+    
+    try:
+        summary = run(
+            args.command, options, iter_inputs(args.inputs, args.recursive), out,
+            max(args.workers, 0), skip, keep
+        )
+    except BrokenPipeError:
+        # The reader went away (e.g. piped into head); silence the final flush
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    
+    print(
+        f"{args.command}: {summary['ok']} ok, {summary['failed']} failed, "
+        f"{summary['skipped']} skipped in {summary['seconds']:.2f} s "
+        f"({summary['files_per_second']:.1f} files/s, "
+        f"{summary['megapixels_per_second']:.1f} MP/s)"
+        + (" - interrupted, rerun with --resume to continue" if summary["interrupted"] else ""),
+        file=sys.stderr
+    )
+    if summary["interrupted"]:
+        return 130
+    return 1 if summary["failed"] else 0
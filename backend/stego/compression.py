@@ -0,0 +1,115 @@
+"""
+Payload Compression Module
+Adaptive zlib/bz2/lzma compression applied before encryption and embedding
+"""
+import bz2
+import lzma
+import zlib
+from typing import Tuple
+from .timing import stage
+
+
+class PayloadCompressor:
+    """Pick the smallest encoding of a payload among the supported codecs"""
+    
+    # Codec IDs, stored in the container flags
+    CODEC_NONE = 0
+    CODEC_ZLIB = 1
+    CODEC_BZ2 = 2
+    CODEC_LZMA = 3
+    
+    CODEC_NAMES = {
+        CODEC_NONE: "none",
+        CODEC_ZLIB: "zlib",
+        CODEC_BZ2: "bz2",
+        CODEC_LZMA: "lzma"
+    }
+    
+    # Smallest payload each codec is tried on; below these the codec's own
+    # framing overhead outweighs what it can save
+    MIN_SIZES = {
+        CODEC_ZLIB: 32,
+        CODEC_LZMA: 256,
+        CODEC_BZ2: 4096
+    }
+    
+    # Upper bound on decompressed size, so a crafted payload cannot expand
+    # into gigabytes
+    MAX_DECOMPRESSED_SIZE = 256 * 1024 * 1024
+    
+    # Raw LZMA2 stream without the .xz container (~60 bytes smaller)
+    _LZMA_FILTERS = [{"id": lzma.FILTER_LZMA2, "preset": 6}]
+    
+    @staticmethod
+    def _compress_with(codec: int, data: bytes) -> bytes:
+        if codec == PayloadCompressor.CODEC_ZLIB:
+            return zlib.compress(data, 9)
+        if codec == PayloadCompressor.CODEC_BZ2:
+            return bz2.compress(data, 9)
+        if codec == PayloadCompressor.CODEC_LZMA:
+            return lzma.compress(
+                data, format=lzma.FORMAT_RAW, filters=PayloadCompressor._LZMA_FILTERS
+            )
+        raise ValueError(f"Unknown compression codec: {codec}")
+    
+    @staticmethod
+    def compress(data: bytes) -> Tuple[int, bytes]:
+        """
+        Compress data with whichever codec gives the smallest result
+        
+        Args:
+            data: Payload bytes
+            
+        Returns:
+            Tuple of (codec ID, payload); CODEC_NONE and the original data
+            when no codec makes it smaller
+        """
+        best_codec, best = PayloadCompressor.CODEC_NONE, data
+        with stage("compress"):
+            for codec, min_size in PayloadCompressor.MIN_SIZES.items():
+                if len(data) < min_size:
+                    continue
+                candidate = PayloadCompressor._compress_with(codec, data)
+                if len(candidate) < len(best):
+                    best_codec, best = codec, candidate
+        return best_codec, best
+    
+    @staticmethod
+    def decompress(codec: int, data: bytes) -> bytes:
+        """
+        Reverse compress()
+        
+        Args:
+            codec: Codec ID recorded with the payload
+            data: Compressed payload
+            
+        Returns:
+            Original payload bytes
+        """
+        if codec == PayloadCompressor.CODEC_NONE:
+            return data
+        
+        limit = PayloadCompressor.MAX_DECOMPRESSED_SIZE
+        with stage("decompress"):
+            try:
+                if codec == PayloadCompressor.CODEC_ZLIB:
+                    decompressor = zlib.decompressobj()
+                    result = decompressor.decompress(data, limit)
+                elif codec == PayloadCompressor.CODEC_BZ2:
+                    decompressor = bz2.BZ2Decompressor()
+                    result = decompressor.decompress(data, limit)
+                elif codec == PayloadCompressor.CODEC_LZMA:
+                    decompressor = lzma.LZMADecompressor(
+                        format=lzma.FORMAT_RAW, filters=PayloadCompressor._LZMA_FILTERS
+                    )
+                    result = decompressor.decompress(data, limit)
+                else:
+                    raise ValueError(f"Unknown compression codec: {codec}")
+            except (zlib.error, OSError, lzma.LZMAError) as e:
+                raise ValueError(f"Decompression failed: {str(e)}")
+        
+        if not decompressor.eof:
+            if len(result) >= limit:
+                raise ValueError("Decompression failed: payload expands beyond size limit")
+            raise ValueError("Decompression failed: truncated payload")
+        return result
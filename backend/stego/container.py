@@ -0,0 +1,170 @@
+"""
+Payload Container Module
+Versioned, length-prefixed framing shared by the encoder and decoder
+"""
+import struct
+import zlib
+from typing import Optional, Tuple
+
+
+class PayloadContainer:
+    """Frame payloads with a magic/version/flags/length header"""
+    
+    MAGIC = b"SGC"
+    VERSION = 2
+    
+    # magic (3 bytes) + version (1 byte) + flags (2 bytes) + length (4 bytes)
+    HEADER_FORMAT = ">3sBHI"
+    HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+    HEADER_BITS = HEADER_SIZE * 8
+    
+    # Flag bits
+    # Payload is an AESCrypto.encrypt_bytes (AES-GCM) blob
+    FLAG_ENCRYPTED = 0x0001
+    # Compression codec ID (PayloadCompressor.CODEC_*) in bits 1-2
+    CODEC_SHIFT = 1
+    CODEC_MASK = 0x0006
+    # Payload is one shard of a message split over several carriers
+    FLAG_SHARD = 0x0008
+    # Embedding mode: bits per channel minus one in bits 4-5, and whether
+    # the alpha channel carries payload bits too (see embed_modes)
+    MODE_BITS_SHIFT = 4
+    MODE_BITS_MASK = 0x0030
+    FLAG_ALPHA = 0x0040
+    # Payload is scattered over the image in a password-keyed order
+    FLAG_SCATTER = 0x0080
+    # Payload is in the quantized DCT coefficients of a JPEG (see DCTEncoder)
+    FLAG_DCT = 0x0100
+    
+    # Shard header, in front of the shard data:
+    # payload ID (8 bytes) + shard index (2) + shard count (2) + CRC32 of data (4)
+    SHARD_FORMAT = ">8sHHI"
+    SHARD_HEADER_SIZE = struct.calcsize(SHARD_FORMAT)
+    MAX_SHARDS = 0xFFFF
+    
+    @staticmethod
+    def pack(payload: bytes, flags: int = 0) -> bytes:
+        """
+        Prefix payload with a container header
+        
+        Args:
+            payload: Raw payload bytes
+            flags: Bitwise OR of FLAG_* values
+            
+        Returns:
+            Header followed by the payload
+        """
+        header = struct.pack(
+            PayloadContainer.HEADER_FORMAT,
+            PayloadContainer.MAGIC,
+            PayloadContainer.VERSION,
+            flags,
+            len(payload)
+        )
+        return header + payload
+    
+    @staticmethod
+    def get_codec(flags: int) -> int:
+        """Return the compression codec ID stored in flags"""
+        return (flags & PayloadContainer.CODEC_MASK) >> PayloadContainer.CODEC_SHIFT
+    
+    @staticmethod
+    def set_codec(flags: int, codec: int) -> int:
+        """Return flags with the compression codec ID replaced"""
+        return (flags & ~PayloadContainer.CODEC_MASK) | (
+            (codec << PayloadContainer.CODEC_SHIFT) & PayloadContainer.CODEC_MASK
+        )
+    
+    @staticmethod
+    def get_mode(flags: int) -> Tuple[int, bool]:
+        """Return (bits per channel, alpha used) of the embedding mode stored in flags"""
+        bits = ((flags & PayloadContainer.MODE_BITS_MASK) >> PayloadContainer.MODE_BITS_SHIFT) + 1
+        return bits, bool(flags & PayloadContainer.FLAG_ALPHA)
+    
+    @staticmethod
+    def set_mode(flags: int, bits: int, alpha: bool) -> int:
+        """Return flags with the embedding mode replaced"""
+        if not 1 <= bits <= 4:
+            raise ValueError(f"Bits per channel must be 1-4, not {bits}")
+        flags &= ~(PayloadContainer.MODE_BITS_MASK | PayloadContainer.FLAG_ALPHA)
+        flags |= (bits - 1) << PayloadContainer.MODE_BITS_SHIFT
+        return flags | (PayloadContainer.FLAG_ALPHA if alpha else 0)
+    
+    @staticmethod
+    def read_header(data: bytes) -> Optional[dict]:
+        """
+        Parse a container header
+        
+        Args:
+            data: At least HEADER_SIZE bytes from the start of the carrier
+            
+        Returns:
+            Dictionary with version, flags and length, or None if the data
+            does not start with a supported header
+        """
+        if len(data) < PayloadContainer.HEADER_SIZE:
+            return None
+        
+        magic, version, flags, length = struct.unpack(
+            PayloadContainer.HEADER_FORMAT,
+            data[:PayloadContainer.HEADER_SIZE]
+        )
+        if magic != PayloadContainer.MAGIC or version != PayloadContainer.VERSION:
+            return None
+        
+        return {
+            "version": version,
+            "flags": flags,
+            "length": length
+        }
+    
+    @staticmethod
+    def pack_shard(payload_id: bytes, index: int, count: int, data: bytes) -> bytes:
+        """
+        Prefix one piece of a payload with a shard header
+        
+        Args:
+            payload_id: 8-byte ID shared by all shards of a payload
+            index: Position of this shard (0-based)
+            count: Total number of shards
+            data: This shard's slice of the payload
+            
+        Returns:
+            Shard header followed by data
+        """
+        header = struct.pack(
+            PayloadContainer.SHARD_FORMAT,
+            payload_id,
+            index,
+            count,
+            zlib.crc32(data)
+        )
+        return header + data
+    
+    @staticmethod
+    def read_shard(shard: bytes) -> dict:
+        """
+        Parse and verify a shard produced by pack_shard
+        
+        Returns:
+            Dictionary with payload_id, index, count and data
+        """
+        if len(shard) < PayloadContainer.SHARD_HEADER_SIZE:
+            raise ValueError("Shard is truncated")
+        
+        payload_id, index, count, checksum = struct.unpack(
+            PayloadContainer.SHARD_FORMAT,
+            shard[:PayloadContainer.SHARD_HEADER_SIZE]
+        )
+        data = shard[PayloadContainer.SHARD_HEADER_SIZE:]
+        if zlib.crc32(data) != checksum:
+            raise ValueError(f"Shard {index + 1} of {count} failed its checksum")
+        if index >= count:
+            raise ValueError("Shard header is corrupted")
+        
+        return {
+            "payload_id": payload_id,
+            "index": index,
+            "count": count,
+            "data": data
+        }
@@ -1,13 +1,20 @@
 """
 AES-256 Encryption Module for StegoCrypt
-Provides secure encryption/decryption using AES-256-CBC
+Provides secure encryption/decryption using AES-256-GCM (binary) and
+AES-256-CBC (base64 text, used by older images)
 """
 import base64
+import hashlib
+import hmac
 import os
+import struct
+from typing import Optional, Tuple
 from Crypto.Cipher import AES
 from Crypto.Protocol.KDF import PBKDF2
 from Crypto.Util.Padding import pad, unpad
 from Crypto.Random import get_random_bytes
+from .cache import LRUCache
+from .timing import stage
 
 
 class AESCrypto:
@@ -18,6 +25,88 @@ class AESCrypto:
     KEY_SIZE = 32
     ITERATIONS = 100000
     
+    # Compact binary mode: salt + nonce + ciphertext + tag, no padding
+    GCM_SALT_SIZE = 16
+    GCM_NONCE_SIZE = 12
+    GCM_TAG_SIZE = 16
+    GCM_OVERHEAD = GCM_SALT_SIZE + GCM_NONCE_SIZE + GCM_TAG_SIZE
+    
+    # Optional derived-key cache, see enable_key_cache()
+    _key_cache: Optional[LRUCache] = None
+    # Per-process secret so cache keys cannot be matched to passwords
+    _cache_secret = get_random_bytes(32)
+    
+    @staticmethod
+    def _wipe_key(cache_key: bytes, key: bytearray) -> None:
+        """Overwrite an evicted derived key in place"""
+        key[:] = bytes(len(key))
+    
+    @staticmethod
+    def enable_key_cache(max_entries: int = 256, ttl: float = 300.0) -> None:
+        """
+        Cache PBKDF2-derived keys in memory
+        
+        Entries are keyed by an HMAC of (password, salt, iterations) under a
+        random per-process secret, so no password is stored. Evicted and
+        expired keys are zeroed; expired entries are swept on every cache
+        access, not only when the same key is looked up again.
+        
+        Args:
+            max_entries: Maximum number of cached keys
+            ttl: Seconds a derived key stays cached
+        """
+        AESCrypto.disable_key_cache()
+        AESCrypto._key_cache = LRUCache(max_entries, ttl=ttl, on_evict=AESCrypto._wipe_key)
+    
+    @staticmethod
+    def disable_key_cache() -> None:
+        """Drop (and wipe) all cached keys and stop caching"""
+        cache, AESCrypto._key_cache = AESCrypto._key_cache, None
+        if cache is not None:
+            cache.clear()
+    
+    @staticmethod
+    def key_cache_stats() -> dict:
+        """Return hit/miss counters of the derived-key cache"""
+        if AESCrypto._key_cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **AESCrypto._key_cache.stats()}
+    
+    @staticmethod
+    def derive_key(password: str, salt: bytes, iterations: int = ITERATIONS) -> bytes:
+        """
+        Derive an AES key from password using PBKDF2
+        
+        Args:
+            password: User password
+            salt: Random salt stored with the ciphertext
+            iterations: PBKDF2 iteration count
+            
+        Returns:
+            KEY_SIZE-byte key
+        """
+        cache = AESCrypto._key_cache
+        if cache is None:
+            with stage("kdf"):
+                return PBKDF2(password, salt, dkLen=AESCrypto.KEY_SIZE, count=iterations)
+        
+        password_bytes = password.encode('utf-8')
+        cache_key = hmac.new(
+            AESCrypto._cache_secret,
+            struct.pack('>I', len(password_bytes)) + password_bytes
+            + struct.pack('>I', iterations) + salt,
+            hashlib.sha256
+        ).digest()
+        
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return bytes(cached)
+        
+        with stage("kdf"):
+            key = PBKDF2(password, salt, dkLen=AESCrypto.KEY_SIZE, count=iterations)
+        cache.put(cache_key, bytearray(key))
+        return key
+    
     @staticmethod
     def encrypt(message: str, password: str) -> str:
         """
@@ -36,12 +125,7 @@ class AESCrypto:
             iv = get_random_bytes(AESCrypto.IV_SIZE)
             
             # Derive key from password using PBKDF2
-            key = PBKDF2(
-                password, 
-                salt, 
-                dkLen=AESCrypto.KEY_SIZE,
-                count=AESCrypto.ITERATIONS
-            )
+            key = AESCrypto.derive_key(password, salt)
             
             # Encrypt message
             cipher = AES.new(key, AES.MODE_CBC, iv)
@@ -79,12 +163,7 @@ class AESCrypto:
             ciphertext = encrypted_data[AESCrypto.SALT_SIZE + AESCrypto.IV_SIZE:]
             
             # Derive key from password
-            key = PBKDF2(
-                password,
-                salt,
-                dkLen=AESCrypto.KEY_SIZE,
-                count=AESCrypto.ITERATIONS
-            )
+            key = AESCrypto.derive_key(password, salt)
             
             # Decrypt
             cipher = AES.new(key, AES.MODE_CBC, iv)
@@ -97,3 +176,93 @@ class AESCrypto:
             raise ValueError("Decryption failed: Invalid password or corrupted data")
         except Exception as e:
             raise ValueError(f"Decryption failed: {str(e)}")
+    
+    @staticmethod
+    def new_gcm_key(password: str) -> Tuple[bytes, bytes]:
+        """
+        Derive a key under a fresh random salt for encrypt_bytes
+        
+        Lets a batch run PBKDF2 once and encrypt many payloads with the same
+        (salt, key); every payload still gets its own random nonce.
+        
+        Returns:
+            Tuple of (salt, key)
+        """
+        salt = get_random_bytes(AESCrypto.GCM_SALT_SIZE)
+        return salt, AESCrypto.derive_key(password, salt)
+    
+    @staticmethod
+    def gcm_salt(encrypted_data: bytes) -> bytes:
+        """Return the salt stored at the start of an encrypt_bytes blob"""
+        return encrypted_data[:AESCrypto.GCM_SALT_SIZE]
+    
+    @staticmethod
+    def encrypt_bytes(
+        data: bytes,
+        password: Optional[str] = None,
+        salted_key: Optional[Tuple[bytes, bytes]] = None
+    ) -> bytes:
+        """
+        Encrypt data using AES-256-GCM
+        
+        Args:
+            data: Plain payload bytes
+            password: User password
+            salted_key: (salt, key) from new_gcm_key, used instead of password
+            
+        Returns:
+            Raw bytes: salt + nonce + ciphertext + tag
+        """
+        try:
+            if salted_key is not None:
+                salt, key = salted_key
+            else:
+                salt, key = AESCrypto.new_gcm_key(password)
+            nonce = get_random_bytes(AESCrypto.GCM_NONCE_SIZE)
+            
+            with stage("encrypt"):
+                cipher = AES.new(key, AES.MODE_GCM, nonce=nonce, mac_len=AESCrypto.GCM_TAG_SIZE)
+                ciphertext, tag = cipher.encrypt_and_digest(data)
+            
+            return salt + nonce + ciphertext + tag
+            
+        except Exception as e:
+            raise ValueError(f"Encryption failed: {str(e)}")
+    
+    @staticmethod
+    def decrypt_bytes(
+        encrypted_data: bytes,
+        password: Optional[str] = None,
+        key: Optional[bytes] = None
+    ) -> bytes:
+        """
+        Decrypt and authenticate AES-256-GCM data
+        
+        A wrong password fails the tag check before any plaintext is used.
+        
+        Args:
+            encrypted_data: Bytes produced by encrypt_bytes
+            password: User password
+            key: Key already derived for this blob's salt, used instead of password
+            
+        Returns:
+            Decrypted payload bytes
+        """
+        nonce_start = AESCrypto.GCM_SALT_SIZE
+        body_start = nonce_start + AESCrypto.GCM_NONCE_SIZE
+        if len(encrypted_data) < body_start + AESCrypto.GCM_TAG_SIZE:
+            raise ValueError("Decryption failed: Invalid password or corrupted data")
+        
+        salt = encrypted_data[:nonce_start]
+        nonce = encrypted_data[nonce_start:body_start]
+        ciphertext = encrypted_data[body_start:-AESCrypto.GCM_TAG_SIZE]
+        tag = encrypted_data[-AESCrypto.GCM_TAG_SIZE:]
+        
+        if key is None:
+            key = AESCrypto.derive_key(password, salt)
+        cipher = AES.new(key, AES.MODE_GCM, nonce=nonce, mac_len=AESCrypto.GCM_TAG_SIZE)
+        try:
+            with stage("decrypt"):
+                return cipher.decrypt_and_verify(ciphertext, tag)
+        except ValueError:
+            raise ValueError("Decryption failed: Invalid password or corrupted data")
@@ -0,0 +1,122 @@
+"""
+DCT Decoder Module
+Reads payloads back from the quantized DCT coefficients of a JPEG
+"""
+from typing import Optional, Tuple
+import numpy as np
+from .container import PayloadContainer
+from .image_io import ImageSource, open_stream
+from .jpeg_codec import JpegReader, UnsupportedJpegError
+from .timing import stage
+
+
+class _CarrierBits:
+    """Payload bits of a JPEG, decoding blocks only as far as they are asked for"""
+    
+    def __init__(self, reader: JpegReader):
+        self.reader = reader
+        self._blocks = reader.blocks()
+        self._bits = []
+    
+    @property
+    def max_bytes(self) -> int:
+        """Upper bound on the bytes the image can carry (every AC coefficient)"""
+        return self.reader.block_count() * 63 // 8
+    
+    def take(self, count: int) -> Optional[bytes]:
+        """Next count bytes, or None if the image ends first"""
+        needed = count * 8
+        while len(self._bits) < needed:
+            block = next(self._blocks, None)
+            if block is None:
+                return None
+            self._bits.extend(value & 1 for value in block[1][1:] if value >= 2 or value <= -2)
+        bits, self._bits = self._bits[:needed], self._bits[needed:]
+        return np.packbits(np.array(bits, dtype=np.uint8)).tobytes()
+
+
+class DCTDecoder:
+    """Extract payloads hidden by DCTEncoder"""
+    
+    @staticmethod
+    def _open(image: ImageSource) -> _CarrierBits:
+        """
+        Carrier bits of a JPEG path, bytes or file-like object
+        
+        Raises UnsupportedJpegError for progressive and other non-baseline
+        files; callers treat those as holding no payload.
+        """
+        if isinstance(image, (bytes, bytearray, memoryview)):
+            return _CarrierBits(JpegReader(bytes(image)))
+        stream, owned = open_stream(image)
+        try:
+            return _CarrierBits(JpegReader(stream.read()))
+        finally:
+            if owned:
+                stream.close()
+    
+    @staticmethod
+    def _header(carrier: _CarrierBits) -> Optional[dict]:
+        """Container header at the start of the carrier bits, if it is a DCT payload"""
+        data = carrier.take(PayloadContainer.HEADER_SIZE)
+        header = PayloadContainer.read_header(data) if data is not None else None
+        if header is None or not header["flags"] & PayloadContainer.FLAG_DCT:
+            return None
+        if header["length"] > carrier.max_bytes:
+            return None
+        return header
+    
+    @staticmethod
+    def probe(image: ImageSource) -> dict:
+        """
+        Read a JPEG's container header without extracting the payload
+        
+        Args:
+            image: Path, bytes or file-like object
+            
+        Returns:
+            Dictionary with width, height and header (None when the image
+            holds no DCT payload)
+        """
+        carrier = DCTDecoder._open(image)
+        return {
+            "width": carrier.reader.width,
+            "height": carrier.reader.height,
+            "header": DCTDecoder._header(carrier)
+        }
+    
+    @staticmethod
+    def read_payload(image: ImageSource) -> Tuple[dict, bytes]:
+        """
+        Read the header and payload, untimed and with the reader's own errors
+        
+        Blocks are Huffman-decoded only until the payload is complete.
+        """
+        try:
+            carrier = DCTDecoder._open(image)
+        except UnsupportedJpegError:
+            raise ValueError("No hidden message found in image")
+        header = DCTDecoder._header(carrier)
+        data = carrier.take(header["length"]) if header is not None else None
+        if data is None:
+            raise ValueError("No hidden message found in image")
+        return header, data
+    
+    @staticmethod
+    def extract(image: ImageSource) -> Tuple[dict, bytes]:
+        """
+        Extract the raw payload from a JPEG written by DCTEncoder
+        
+        Args:
+            image: Path, bytes or file-like object
+            
+        Returns:
+            Tuple of (header dictionary, payload bytes)
+        """
+        try:
+            with stage("extract"):
+                return DCTDecoder.read_payload(image)
+        except Exception as e:
+            if "No hidden message" in str(e):
+                raise
+            raise ValueError(f"Decoding failed: {str(e)}")
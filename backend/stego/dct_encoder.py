@@ -0,0 +1,115 @@
+"""
+DCT Encoder Module
+Hides payloads in the quantized DCT coefficients of a JPEG
+"""
+from typing import Union
+import numpy as np
+from .container import PayloadContainer
+from .image_io import ImageSource, load_rgb
+from .jpeg_codec import forward, write_jpeg
+from .timing import stage
+
+
+# Quality used when none is given
+DEFAULT_QUALITY = 90
+
+
+class DCTEncoder:
+    """
+    Embed payloads in JPEG coefficients by LSB replacement
+    
+    Bits go in the AC coefficients whose magnitude is at least 2: the
+    lowest bit of the magnitude is replaced, which keeps it at 2 or more.
+    Zeros and ±1, most of the coded data, are left alone, so the decoder
+    finds the same carrier coefficients. Header and payload are one bit
+    stream in coding order, so decoding reads only the blocks it needs.
+    """
+    
+    @staticmethod
+    def carriers(blocks: np.ndarray) -> np.ndarray:
+        """Flat indices of the coefficients that carry payload bits, in coding order"""
+        usable = np.abs(blocks) >= 2
+        usable[:, 0] = False
+        return np.flatnonzero(usable)
+    
+    @staticmethod
+    def carrier_count(blocks: np.ndarray) -> int:
+        """Number of coefficients that carry payload bits"""
+        return int(np.count_nonzero(np.abs(blocks[:, 1:]) >= 2))
+    
+    @staticmethod
+    def capacity(blocks: np.ndarray) -> int:
+        """Payload bytes blocks can hold after the container header"""
+        return max(DCTEncoder.carrier_count(blocks) // 8 - PayloadContainer.HEADER_SIZE, 0)
+    
+    @staticmethod
+    def embed_payload(blocks: np.ndarray, message: bytes, flags: int) -> None:
+        """
+        Frame message and write it into coefficient blocks, in place
+        
+        Args:
+            blocks: (blocks, 64) int32 array from jpeg_codec.forward()
+            message: Payload bytes
+            flags: Container flags; FLAG_DCT is added and the pixel
+                embedding mode cleared
+        """
+        flags = PayloadContainer.set_mode(flags, 1, False) & ~PayloadContainer.FLAG_SCATTER
+        packed = PayloadContainer.pack(message, flags | PayloadContainer.FLAG_DCT)
+        bits = np.unpackbits(np.frombuffer(packed, dtype=np.uint8)).astype(blocks.dtype)
+        positions = DCTEncoder.carriers(blocks)[:bits.size]
+        if positions.size < bits.size:
+            raise ValueError("Payload does not fit in the image's DCT coefficients")
+        flat = blocks.reshape(-1)
+        values = flat[positions]
+        flat[positions] = np.sign(values) * ((np.abs(values) & ~1) | bits)
+    
+    @staticmethod
+    def encode(
+        image: ImageSource,
+        message: Union[str, bytes],
+        flags: int = 0,
+        quality: int = DEFAULT_QUALITY
+    ) -> bytes:
+        """
+        Encode message into image and write it as a JPEG
+        
+        Args:
+            image: Path, bytes, file-like object or PIL image
+            message: Message to hide (text is stored as UTF-8)
+            flags: Container flags describing the payload
+            quality: JPEG quality, 1-100; lower gives smaller files and
+                less capacity
+                
+        Returns:
+            Bytes of the stego JPEG
+        """
+        try:
+            with stage("decode"):
+                img = load_rgb(image)
+                pixels = np.asarray(img, dtype=np.uint8)
+            width, height = img.size
+            
+            if isinstance(message, str):
+                message = message.encode('utf-8')
+            
+            with stage("dct"):
+                blocks = forward(pixels, quality)
+            # Capacity stops at 0, so compare bits, header included: images
+            # too small for the header refuse even an empty message
+            capacity = DCTEncoder.capacity(blocks)
+            needed = (PayloadContainer.HEADER_SIZE + len(message)) * 8
+            if needed > DCTEncoder.carrier_count(blocks):
+                raise ValueError(
+                    f"Message too large. "
+                    f"Max capacity: {capacity} bytes, "
+                    f"Message size: {len(message)} bytes"
+                )
+            
+            with stage("embed"):
+                DCTEncoder.embed_payload(blocks, message, flags)
+            
+            with stage("save"):
+                return write_jpeg(blocks, width, height, quality)
+                
+        except Exception as e:
+            raise ValueError(f"Encoding failed: {str(e)}")
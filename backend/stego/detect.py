@@ -0,0 +1,227 @@
+"""
+Detection Module
+Checks whether an image carries a payload by reading only its first pixels
+"""
+from typing import Iterable, Iterator
+import numpy as np
+from PIL import Image
+from .compression import PayloadCompressor
+from .container import PayloadContainer
+from .embed_modes import channel_capacity, mode_name, payload_capacity
+from .image_io import (
+    IMAGE_EXTENSIONS, ImageSource, has_alpha, iter_image_files, load_rgb, open_image, open_stream
+)
+from .dct_decoder import DCTDecoder
+from .jpeg_codec import UnsupportedJpegError, is_jpeg
+from .lsb_decoder import LSBDecoder
+from .row_reader import open_row_reader
+from .timing import stage
+from .wav_carrier import WavCarrier, is_wav
+
+
+# Leading bytes checked for a legacy (delimiter-terminated) text message
+LEGACY_PROBE_BYTES = 32
+
+# Channels read from the top of the image: the container header, or the
+# legacy probe plus its delimiter
+PROBE_CHANNELS = max(PayloadContainer.HEADER_BITS, (LEGACY_PROBE_BYTES + 2) * 8)
+
+# Formats whose lossy compression cannot keep LSB payloads; JPEG files
+# (not decoded PIL images) are still checked for DCT payloads
+LOSSY_FORMATS = {"JPEG", "MPO"}
+
+# Bytes of legacy messages: printable ASCII plus tab, newline and carriage return
+_TEXT_BYTES = np.zeros(256, dtype=bool)
+_TEXT_BYTES[0x20:0x7F] = True
+_TEXT_BYTES[[0x09, 0x0A, 0x0D]] = True
+
+
+def _not_found(width: int, height: int, reason: str) -> dict:
+    """Result for an image without a payload"""
+    return {"found": False, "format": None, "width": width, "height": height, "reason": reason}
+
+
+def _container(header: dict, carrier: dict) -> dict:
+    """Result for a container header, after the carrier's size fields"""
+    flags = header["flags"]
+    bits, uses_alpha = PayloadContainer.get_mode(flags)
+    return {
+        "found": True,
+        "format": "container",
+        **carrier,
+        "version": header["version"],
+        "length": header["length"],
+        "mode": mode_name(bits, uses_alpha),
+        "encrypted": bool(flags & PayloadContainer.FLAG_ENCRYPTED),
+        "compression": PayloadCompressor.CODEC_NAMES.get(
+            PayloadContainer.get_codec(flags), "unknown"
+        ),
+        "scatter": bool(flags & PayloadContainer.FLAG_SCATTER),
+        "shard": bool(flags & PayloadContainer.FLAG_SHARD)
+    }
+
+
+def inspect_channels(channels: np.ndarray, width: int, height: int, alpha: bool = False) -> dict:
+    """
+    Look for a container header or a legacy message in the first channels
+    
+    A container header counts only if the payload it declares fits the
+    image in its mode. A legacy message counts if its leading bytes are
+    plain text, either up to a delimiter or for all LEGACY_PROBE_BYTES.
+    
+    Args:
+        channels: Flat RGB channel values from the top of the image
+            (at least PROBE_CHANNELS, unless the image is smaller)
+        width: Image width in pixels
+        height: Image height in pixels
+        alpha: Whether the image has an alpha channel
+        
+    Returns:
+        Dictionary with found and format ("container", "legacy" or None);
+        containers add length, mode, encrypted, compression, scatter and
+        shard, legacy messages add length (None when the end was not seen)
+    """
+    header = PayloadContainer.read_header(
+        LSBDecoder.read_bytes(channels, 0, PayloadContainer.HEADER_SIZE)
+    )
+    if header is not None:
+        flags = header["flags"]
+        bits, uses_alpha = PayloadContainer.get_mode(flags)
+        scatter = bool(flags & PayloadContainer.FLAG_SCATTER)
+        if uses_alpha and not alpha:
+            return _not_found(width, height, "Header names an alpha mode the image cannot have")
+        if header["length"] > payload_capacity(width, height, bits, uses_alpha, scatter):
+            return _not_found(width, height, "Header declares more data than the image holds")
+        return _container(header, {"width": width, "height": height})
+    
+    data = LSBDecoder.find_delimiter(channels[:PROBE_CHANNELS])
+    length = len(data) if data else None
+    if not data:
+        # No end in sight: the whole probe has to look like text
+        data = np.packbits(channels[:LEGACY_PROBE_BYTES * 8] & 1).tobytes()
+        if len(data) < LEGACY_PROBE_BYTES:
+            return _not_found(width, height, "No payload signature")
+    if _TEXT_BYTES[np.frombuffer(data, dtype=np.uint8)].all():
+        return {"found": True, "format": "legacy", "width": width, "height": height,
+                "version": 1, "length": length, "encrypted": False}
+    return _not_found(width, height, "No payload signature")
+
+
+def detect(image: ImageSource) -> dict:
+    """
+    Check for a hidden payload without extracting it
+    
+    8-bit RGB PNGs and 24-bit BMPs are decoded only as far as their first
+    row or two; other lossless images are decoded whole. JPEG files are
+    checked for a DCT payload by Huffman-decoding their first blocks; JPEGs
+    already opened as PIL images are reported as empty, since lossy
+    compression destroys LSB payloads. WAV files are checked from their
+    first samples, and report their sample layout instead of a size.
+    
+    Args:
+        image: Path, bytes, file-like object or PIL image
+        
+    Returns:
+        Dictionary from inspect_channels
+    """
+    try:
+        with stage("detect"):
+            if isinstance(image, Image.Image):
+                return _detect_whole(image)
+            
+            stream, owned = open_stream(image)
+            try:
+                start = stream.tell()
+                signature = stream.read(12)
+                stream.seek(start)
+                if is_jpeg(signature):
+                    return _detect_jpeg(stream)
+                if is_wav(signature):
+                    return _detect_wav(
+                        image if isinstance(image, (bytes, bytearray, memoryview)) else stream
+                    )
+                
+                reader = open_row_reader(stream)
+                if reader is None:
+                    return _detect_whole(open_image(stream))
+                try:
+                    rows = -(-PROBE_CHANNELS // (reader.width * 3))
+                    channels = reader.read(rows).reshape(-1)
+                    return inspect_channels(channels, reader.width, reader.height)
+                finally:
+                    reader.close()
+            finally:
+                if owned:
+                    stream.close()
+    except Exception as e:
+        raise ValueError(f"Detection failed: {str(e)}")
+
+
+def _detect_jpeg(stream) -> dict:
+    """Detect a DCT payload in a JPEG file"""
+    start = stream.tell()
+    try:
+        probe = DCTDecoder.probe(stream)
+    except UnsupportedJpegError:
+        stream.seek(start)
+        width, height = open_image(stream).size
+        return _not_found(width, height, "Only baseline JPEGs can carry DCT payloads")
+    width, height, header = probe["width"], probe["height"], probe["header"]
+    if header is None:
+        return _not_found(width, height, "No payload signature")
+    return {**_container(header, {"width": width, "height": height}), "mode": "dct"}
+
+
+def _detect_wav(audio) -> dict:
+    """Detect a container payload in the first samples of a WAV file"""
+    with WavCarrier(audio) as carrier:
+        info = {"carrier": "wav", **carrier.info()}
+        header = PayloadContainer.read_header(
+            LSBDecoder.read_bytes(carrier.low_bytes, 0, PayloadContainer.HEADER_SIZE)
+        )
+    if header is None:
+        return {"found": False, "format": None, **info, "reason": "No payload signature"}
+    flags = header["flags"]
+    bits, uses_alpha = PayloadContainer.get_mode(flags)
+    scatter = bool(flags & PayloadContainer.FLAG_SCATTER)
+    if uses_alpha or header["length"] > channel_capacity(info["samples"], bits, False, scatter):
+        return {"found": False, "format": None, **info,
+                "reason": "Header declares more data than the audio holds"}
+    return _container(header, info)
+
+
+def _detect_whole(img: Image.Image) -> dict:
+    """Detect in an image that has to be decoded whole"""
+    width, height = img.size
+    if img.format in LOSSY_FORMATS:
+        return _not_found(width, height, f"{img.format} images cannot carry LSB payloads")
+    channels = np.asarray(load_rgb(img), dtype=np.uint8).reshape(-1)[:PROBE_CHANNELS]
+    return inspect_channels(channels, width, height, has_alpha(img))
+
+
+def scan_directory(
+    root: str,
+    recursive: bool = True,
+    extensions: Iterable[str] = IMAGE_EXTENSIONS,
+    carriers_only: bool = False
+) -> Iterator[dict]:
+    """
+    Run detect over every image file under root
+    
+    Args:
+        root: Directory to scan
+        recursive: Descend into subdirectories
+        extensions: File extensions (lower case, with dot) to look at
+        carriers_only: Yield only files where a payload was found
+        
+    Yields:
+        detect() results with the file's path added, or found False and an
+        error for files that could not be read
+    """
+    for path in iter_image_files(root, recursive, extensions):
+        try:
+            result = detect(path)
+        except ValueError as e:
+            result = {"found": False, "format": None, "error": str(e)}
+        if result["found"] or not carriers_only:
+            yield {"path": path, **result}
@@ -0,0 +1,129 @@
+"""
+Embedding Modes Module
+How many low bits of which channels the encoders hide payload bits in
+"""
+from typing import Optional
+from .container import PayloadContainer
+from .scatter import SEED_SIZE
+
+
+# Mode name -> bits per channel and whether the alpha channel is used.
+# rgb1 is the original layout; the others multiply capacity by using more
+# low bits (up to 4 of 8) and/or the alpha plane of RGBA images
+EMBED_MODES = {
+    f"{'rgba' if alpha else 'rgb'}{bits}": {"bits": bits, "alpha": alpha}
+    for alpha in (False, True)
+    for bits in range(1, 5)
+}
+
+DEFAULT_EMBED_MODE = "rgb1"
+
+# The header is always stored at 1 bit per RGB channel in the first pixels,
+# so it can be read before the mode is known. Payloads in any mode other
+# than rgb1 start at the pixel after it
+HEADER_PIXELS = -(-PayloadContainer.HEADER_BITS // 3)
+
+
+def get_embed_mode(name: Optional[str]) -> dict:
+    """
+    Look up an embedding mode by name
+    
+    Args:
+        name: Key of EMBED_MODES, or None for the default
+        
+    Returns:
+        Mode settings (bits, alpha)
+    """
+    key = (name or DEFAULT_EMBED_MODE).lower()
+    if key not in EMBED_MODES:
+        raise ValueError(
+            f"Unknown embedding mode '{name}'. Choose from: {', '.join(EMBED_MODES)}"
+        )
+    return EMBED_MODES[key]
+
+
+def mode_name(bits: int, alpha: bool) -> str:
+    """Name of the mode with the given bits per channel and alpha use"""
+    return f"{'rgba' if alpha else 'rgb'}{bits}"
+
+
+def payload_offset(bits: int, alpha: bool) -> int:
+    """
+    Index of the first payload channel in the flat RGB (or RGBA) channel array
+    
+    rgb1 continues straight after the header; other modes start at the
+    first pixel after HEADER_PIXELS.
+    """
+    if bits == 1 and not alpha:
+        return PayloadContainer.HEADER_BITS
+    return HEADER_PIXELS * (4 if alpha else 3)
+
+
+def seed_channels(bits: int) -> int:
+    """Channels holding the scatter seed, ahead of the scattered payload"""
+    return -(-SEED_SIZE * 8 // bits)
+
+
+def payload_capacity(
+    width: int,
+    height: int,
+    bits: int = 1,
+    alpha: bool = False,
+    scatter: bool = False
+) -> int:
+    """
+    Largest payload, in bytes, an image holds in a mode
+    
+    Args:
+        width: Image width in pixels
+        height: Image height in pixels
+        bits: Bits per channel (1-4)
+        alpha: Whether the alpha channel is used as well
+        scatter: Whether the payload is scattered (which stores a seed first)
+        
+    Returns:
+        Payload bytes that fit after the container header
+    """
+    return channel_capacity(width * height * (4 if alpha else 3), bits, alpha, scatter)
+
+
+def channel_capacity(
+    channels: int,
+    bits: int = 1,
+    alpha: bool = False,
+    scatter: bool = False
+) -> int:
+    """
+    Largest payload, in bytes, a flat channel array holds in a mode
+    
+    Args:
+        channels: Number of channels (RGB or RGBA values, or WAV samples)
+        bits: Bits per channel (1-4)
+        alpha: Whether the channels include alpha values
+        scatter: Whether the payload is scattered
+        
+    Returns:
+        Payload bytes that fit after the container header
+    """
+    channels -= payload_offset(bits, alpha)
+    if scatter:
+        channels -= seed_channels(bits)
+    return max(channels, 0) * bits // 8
+
+
+def channels_needed(
+    length: int,
+    bits: int = 1,
+    alpha: bool = False,
+    scatter: bool = False
+) -> int:
+    """
+    Channels a payload of length bytes occupies, header and scatter seed included
+    
+    Unlike the capacities above, which stop at 0, this also tells whether
+    the header and seed fit at all, so even an empty payload is checked.
+    """
+    needed = payload_offset(bits, alpha) + -(-length * 8 // bits)
+    if scatter:
+        needed += seed_channels(bits)
+    return needed
@@ -0,0 +1,112 @@
+"""
+Image Input Module
+Opens carrier images from paths, bytes, file-like objects or PIL images
+"""
+import io
+import os
+from typing import BinaryIO, Iterable, Iterator, Tuple, Union
+from PIL import Image
+
+
+# Anything the stego classes accept as an image
+ImageSource = Union[str, bytes, bytearray, BinaryIO, Image.Image]
+
+# File extensions picked up when walking directories (WAV files are
+# carriers too)
+IMAGE_EXTENSIONS = (".png", ".bmp", ".webp", ".tif", ".tiff", ".jpg", ".jpeg", ".wav")
+
+
+def open_image(source: ImageSource) -> Image.Image:
+    """
+    Open an image without decoding its pixels
+    
+    Args:
+        source: Path, raw bytes, file-like object or an opened PIL image
+        
+    Returns:
+        PIL image (the same object if one was passed in)
+    """
+    if isinstance(source, Image.Image):
+        return source
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    return Image.open(source)
+
+
+def open_stream(source: ImageSource) -> Tuple[BinaryIO, bool]:
+    """
+    Get a binary stream for an image source that is not a PIL image
+    
+    Args:
+        source: Path, raw bytes or file-like object
+        
+    Returns:
+        Tuple of (stream, whether the caller opened it and must close it)
+    """
+    if isinstance(source, str):
+        return open(source, 'rb'), True
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(source), True
+    return source, False
+
+
+def load_rgb(source: ImageSource) -> Image.Image:
+    """
+    Open an image and make sure it is in RGB mode
+    
+    Args:
+        source: Path, raw bytes, file-like object or an opened PIL image
+        
+    Returns:
+        RGB PIL image
+    """
+    img = open_image(source)
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    return img
+
+
+def has_alpha(img: Image.Image) -> bool:
+    """Whether an opened image has an alpha channel or transparency (header only)"""
+    return img.mode in ('RGBA', 'LA', 'PA', 'RGBa', 'La') or 'transparency' in img.info
+
+
+def load_rgba(source: ImageSource) -> Image.Image:
+    """
+    Open an image with an alpha channel in RGBA mode
+    
+    Args:
+        source: Path, raw bytes, file-like object or an opened PIL image
+        
+    Returns:
+        RGBA PIL image
+    """
+    img = open_image(source)
+    if not has_alpha(img):
+        raise ValueError("This embedding mode needs an image with an alpha channel")
+    if img.mode != 'RGBA':
+        img = img.convert('RGBA')
+    return img
+
+
+def iter_image_files(
+    root: str,
+    recursive: bool = True,
+    extensions: Iterable[str] = IMAGE_EXTENSIONS
+) -> Iterator[str]:
+    """
+    Yield the paths of image files under root, in sorted order
+    
+    Args:
+        root: Directory to walk
+        recursive: Descend into subdirectories
+        extensions: File extensions (lower case, with dot) to include
+    """
+    extensions = tuple(extensions)
+    for directory, subdirectories, files in os.walk(root):
+        if not recursive:
+            subdirectories.clear()
+        subdirectories.sort()
+        for name in sorted(files):
+            if name.lower().endswith(extensions):
+                yield os.path.join(directory, name)
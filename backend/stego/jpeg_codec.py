@@ -0,0 +1,556 @@
+"""
+JPEG Codec Module
+Baseline JPEG coding on quantized DCT coefficients
+
+Pillow only hands out pixels, so the DCT engine codes JPEGs itself: colour
+conversion, 4:2:0 subsampling, the blockwise DCT and quantization run as a
+few NumPy passes over the whole coefficient array, and Huffman coding with
+the standard tables packs every block's symbols at once. Reading goes the
+other way one block at a time, so callers can stop as soon as they have
+the coefficients they need.
+"""
+import re
+import struct
+from typing import Iterator, List, Tuple
+import numpy as np
+
+
+BLOCK = 8
+
+# ZIGZAG[i] is the row-major index of the i-th coefficient in zigzag order
+ZIGZAG = np.array(sorted(
+    range(64),
+    key=lambda i: (i // 8 + i % 8, i % 8 if (i // 8 + i % 8) % 2 == 0 else i // 8)
+))
+
+# Example quantization tables of the JPEG standard (Annex K), row-major,
+# for quality 50
+LUMA_QUANT = np.array([
+    16, 11, 10, 16, 24, 40, 51, 61,
+    12, 12, 14, 19, 26, 58, 60, 55,
+    14, 13, 16, 24, 40, 57, 69, 56,
+    14, 17, 22, 29, 51, 87, 80, 62,
+    18, 22, 37, 56, 68, 109, 103, 77,
+    24, 35, 55, 64, 81, 104, 113, 92,
+    49, 64, 78, 87, 103, 121, 120, 101,
+    72, 92, 95, 98, 112, 100, 103, 99
+], dtype=np.int32)
+CHROMA_QUANT = np.full(64, 99, dtype=np.int32)
+CHROMA_QUANT.reshape(8, 8)[:4, :4] = [
+    [17, 18, 24, 47],
+    [18, 21, 26, 66],
+    [24, 26, 56, 99],
+    [47, 66, 99, 99]
+]
+
+# Standard Huffman tables (Annex K): code counts by length 1-16, then symbols
+HUFFMAN_TABLES = {
+    "dc_luma": (
+        bytes.fromhex("00010501010101010100000000000000"),
+        bytes.fromhex("000102030405060708090a0b")
+    ),
+    "dc_chroma": (
+        bytes.fromhex("00030101010101010101010000000000"),
+        bytes.fromhex("000102030405060708090a0b")
+    ),
+    "ac_luma": (
+        bytes.fromhex("0002010303020403050504040000017d"),
+        bytes.fromhex(
+            "01020300041105122131410613516107227114328191a1082342b1c11552d1f0"
+            "2433627282090a161718191a25262728292a3435363738393a43444546474849"
+            "4a535455565758595a636465666768696a737475767778797a83848586878889"
+            "8a92939495969798999aa2a3a4a5a6a7a8a9aab2b3b4b5b6b7b8b9bac2c3c4c5"
+            "c6c7c8c9cad2d3d4d5d6d7d8d9dae1e2e3e4e5e6e7e8e9eaf1f2f3f4f5f6f7f8"
+            "f9fa"
+        )
+    ),
+    "ac_chroma": (
+        bytes.fromhex("00020102040403040705040400010277"),
+        bytes.fromhex(
+            "000102031104052131061241510761711322328108144291a1b1c109233352f0"
+            "156272d10a162434e125f11718191a262728292a35363738393a434445464748"
+            "494a535455565758595a636465666768696a737475767778797a828384858687"
+            "88898a92939495969798999aa2a3a4a5a6a7a8a9aab2b3b4b5b6b7b8b9bac2c3"
+            "c4c5c6c7c8c9cad2d3d4d5d6d7d8d9dae2e3e4e5e6e7e8e9eaf2f3f4f5f6f7f8"
+            "f9fa"
+        )
+    ),
+}
+
+# Components of the files written here: (id, sampling factors, quant table,
+# DC table, AC table). Luma is sampled 2x2 per MCU, each chroma plane once
+COMPONENTS = (
+    (1, 0x22, 0, "dc_luma", "ac_luma"),
+    (2, 0x11, 1, "dc_chroma", "ac_chroma"),
+    (3, 0x11, 1, "dc_chroma", "ac_chroma"),
+)
+MCU_SIZE = 16
+
+# Component of each block of an MCU: four luma blocks, then Cb and Cr
+MCU_LAYOUT = np.array([0, 0, 0, 0, 1, 2])
+
+# Largest magnitudes the baseline Huffman tables can code
+MAX_DC = 2047
+MAX_AC = 1023
+
+# Huffman items packed into bits per NumPy pass
+PACK_CHUNK = 1 << 16
+
+# Orthonormal 8-point DCT-II matrix; the 2-D transform is D @ block @ D.T
+_DCT = np.array([
+    [(np.sqrt(1 / 8) if k == 0 else np.sqrt(2 / 8)) * np.cos((2 * n + 1) * k * np.pi / 16)
+     for n in range(BLOCK)]
+    for k in range(BLOCK)
+], dtype=np.float32)
+
+
+def quant_tables(quality: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Scale the standard tables for a quality of 1-100 (IJG formula)
+    
+    Returns:
+        (luma, chroma) tables in zigzag order
+    """
+    quality = min(max(int(quality), 1), 100)
+    scale = 5000 // quality if quality < 50 else 200 - 2 * quality
+    return tuple(
+        np.clip((table * scale + 50) // 100, 1, 255)[ZIGZAG]
+        for table in (LUMA_QUANT, CHROMA_QUANT)
+    )
+
+
+def huffman_codes(table: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Code and code length of every symbol of a Huffman table"""
+    counts, symbols = HUFFMAN_TABLES[table]
+    codes = np.zeros(256, dtype=np.int64)
+    lengths = np.zeros(256, dtype=np.int64)
+    code = 0
+    k = 0
+    for length, count in enumerate(counts, start=1):
+        for _ in range(count):
+            codes[symbols[k]] = code
+            lengths[symbols[k]] = length
+            code += 1
+            k += 1
+        code <<= 1
+    return codes, lengths
+
+
+def _blocks(plane: np.ndarray) -> np.ndarray:
+    """Split a plane whose sides are multiples of 8 into (rows, cols, 8, 8) blocks"""
+    height, width = plane.shape
+    return plane.reshape(height // BLOCK, BLOCK, width // BLOCK, BLOCK).transpose(0, 2, 1, 3)
+
+
+def _dct(blocks: np.ndarray) -> np.ndarray:
+    """2-D DCT of (n, 8, 8) blocks as two large matrix products"""
+    n = blocks.shape[0]
+    rows = (blocks.reshape(n * BLOCK, BLOCK) @ _DCT.T).reshape(n, BLOCK, BLOCK)
+    cols = rows.transpose(0, 2, 1).reshape(n * BLOCK, BLOCK) @ _DCT.T
+    return cols.reshape(n, BLOCK, BLOCK).transpose(0, 2, 1)
+
+
+def forward(pixels: np.ndarray, quality: int) -> np.ndarray:
+    """
+    Quantized DCT coefficients of an RGB image, in the order they are coded
+    
+    Args:
+        pixels: (height, width, 3) uint8 RGB array
+        quality: JPEG quality, 1-100
+        
+    Returns:
+        (blocks, 64) int32 array in zigzag order, one row per block in MCU
+        order (see MCU_LAYOUT)
+    """
+    height, width = pixels.shape[:2]
+    pad_y = -height % MCU_SIZE
+    pad_x = -width % MCU_SIZE
+    rgb = np.pad(pixels, ((0, pad_y), (0, pad_x), (0, 0)), mode='edge').astype(np.float32)
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    
+    # JFIF YCbCr, level-shifted to be centred on zero
+    y = 0.299 * r + 0.587 * g + 0.114 * b - 128
+    cb = -0.168736 * r - 0.331264 * g + 0.5 * b
+    cr = 0.5 * r - 0.418688 * g - 0.081312 * b
+    del rgb, r, g, b
+    
+    # 4:2:0: chroma is averaged over 2x2 pixels
+    def subsample(plane):
+        h, w = plane.shape
+        return plane.reshape(h // 2, 2, w // 2, 2).mean(axis=(1, 3))
+    
+    mcu_rows = y.shape[0] // MCU_SIZE
+    mcu_cols = y.shape[1] // MCU_SIZE
+    luma = _blocks(y).reshape(mcu_rows, 2, mcu_cols, 2, BLOCK, BLOCK)
+    luma = luma.transpose(0, 2, 1, 3, 4, 5).reshape(mcu_rows, mcu_cols, 4, BLOCK, BLOCK)
+    chroma = [_blocks(subsample(plane))[:, :, None] for plane in (cb, cr)]
+    blocks = np.concatenate([luma] + chroma, axis=2).reshape(-1, BLOCK, BLOCK)
+    
+    coefficients = _dct(blocks).reshape(-1, 64)[:, ZIGZAG]
+    luma_table, chroma_table = quant_tables(quality)
+    tables = np.stack([luma_table, chroma_table, chroma_table])
+    layout = np.tile(MCU_LAYOUT, mcu_rows * mcu_cols)
+    quantized = np.rint(coefficients / tables[layout]).astype(np.int32)
+    np.clip(quantized[:, 0], -MAX_DC, MAX_DC, out=quantized[:, 0])
+    np.clip(quantized[:, 1:], -MAX_AC, MAX_AC, out=quantized[:, 1:])
+    return quantized
+
+
+def _magnitude_bits(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """JPEG size category and appended bits of each value"""
+    sizes = np.frexp(np.abs(values).astype(np.float64))[1].astype(np.int64)
+    extra = np.where(values < 0, values + (1 << sizes) - 1, values).astype(np.int64)
+    return sizes, extra
+
+
+def _pack_bits(values: np.ndarray, lengths: np.ndarray) -> bytes:
+    """Concatenate variable-length codes, MSB first, padding the end with 1 bits"""
+    out = []
+    carry = np.zeros(0, dtype=np.uint8)
+    for start in range(0, values.size, PACK_CHUNK):
+        chunk = values[start:start + PACK_CHUNK]
+        sizes = lengths[start:start + PACK_CHUNK]
+        ends = np.cumsum(sizes)
+        item = np.repeat(np.arange(chunk.size), sizes)
+        shifts = ends[item] - 1 - np.arange(int(ends[-1]) if ends.size else 0)
+        bits = np.concatenate([carry, ((chunk[item] >> shifts) & 1).astype(np.uint8)])
+        whole = bits.size // 8 * 8
+        out.append(np.packbits(bits[:whole]).tobytes())
+        carry = bits[whole:]
+    if carry.size:
+        out.append(np.packbits(np.concatenate([carry, np.ones(8 - carry.size, dtype=np.uint8)])).tobytes())
+    return b"".join(out)
+
+
+def encode_scan(blocks: np.ndarray) -> bytes:
+    """
+    Huffman-code coefficient blocks into entropy-coded scan data
+    
+    Every block is turned into its symbols at once: a DC difference, then
+    (zero run, size) pairs for the non-zero AC coefficients with ZRL codes
+    for runs over 15 and an EOB after the last one. Symbols are put in
+    order by sorting on (block, position).
+    
+    Args:
+        blocks: (blocks, 64) int32 array from forward()
+        
+    Returns:
+        Entropy-coded data, byte-stuffed
+    """
+    count = blocks.shape[0]
+    component = np.tile(MCU_LAYOUT, count // MCU_LAYOUT.size)
+    chroma = (component > 0).astype(np.int64)
+    dc_tables = [huffman_codes("dc_luma"), huffman_codes("dc_chroma")]
+    ac_tables = [huffman_codes("ac_luma"), huffman_codes("ac_chroma")]
+    dc_codes = np.stack([codes for codes, _ in dc_tables])
+    dc_lengths = np.stack([lengths for _, lengths in dc_tables])
+    ac_codes = np.stack([codes for codes, _ in ac_tables])
+    ac_lengths = np.stack([lengths for _, lengths in ac_tables])
+    
+    # DC: difference from the previous block of the same component
+    dc = blocks[:, 0].astype(np.int64)
+    diff = np.empty_like(dc)
+    for c in range(len(COMPONENTS)):
+        index = np.flatnonzero(component == c)
+        diff[index] = np.diff(dc[index], prepend=0)
+    sizes, extra = _magnitude_bits(diff)
+    keys = [np.arange(count, dtype=np.int64) * 256]
+    values = [(dc_codes[chroma, sizes] << sizes) | extra]
+    lengths = [dc_lengths[chroma, sizes] + sizes]
+    
+    # AC: non-zero coefficients with the zero run before each
+    block, position = np.nonzero(blocks[:, 1:])
+    previous = np.empty_like(position)
+    previous[1:] = position[:-1]
+    first = np.ones(block.size, dtype=bool)
+    first[1:] = block[1:] != block[:-1]
+    previous[first] = -1
+    run = position - previous - 1
+    ac = blocks[block, position + 1].astype(np.int64)
+    sizes, extra = _magnitude_bits(ac)
+    symbols = (run % 16) << 4 | sizes
+    table = chroma[block]
+    base = block * 256 + 1 + position * 4
+    keys.append(base + 3)
+    values.append((ac_codes[table, symbols] << sizes) | extra)
+    lengths.append(ac_lengths[table, symbols] + sizes)
+    
+    # ZRL (16 zeros) codes ahead of runs longer than 15
+    zrl = run // 16
+    owner = np.repeat(np.arange(block.size), zrl)
+    if owner.size:
+        step = np.arange(owner.size) - np.repeat(np.cumsum(zrl) - zrl, zrl)
+        keys.append(base[owner] + step)
+        values.append(ac_codes[table[owner], 0xF0])
+        lengths.append(ac_lengths[table[owner], 0xF0])
+    
+    # EOB unless the last coefficient of the block is non-zero
+    final = np.ones(block.size, dtype=bool)
+    final[:-1] = block[1:] != block[:-1]
+    last = np.full(count, -1, dtype=np.int64)
+    last[block[final]] = position[final]
+    eob = np.flatnonzero(last < 62)
+    keys.append(eob * 256 + 255)
+    values.append(ac_codes[chroma[eob], 0x00])
+    lengths.append(ac_lengths[chroma[eob], 0x00])
+    
+    order = np.argsort(np.concatenate(keys), kind='stable')
+    data = np.frombuffer(
+        _pack_bits(np.concatenate(values)[order], np.concatenate(lengths)[order]), dtype=np.uint8
+    )
+    # Byte stuffing: every 0xFF in the scan is followed by 0x00
+    return np.insert(data, np.flatnonzero(data == 0xFF) + 1, 0).tobytes()
+
+
+def _segment(marker: int, payload: bytes) -> bytes:
+    """Marker segment with its length field"""
+    return struct.pack('>BBH', 0xFF, marker, len(payload) + 2) + payload
+
+
+def write_jpeg(blocks: np.ndarray, width: int, height: int, quality: int) -> bytes:
+    """
+    Write coefficient blocks from forward() as a baseline JFIF file
+    
+    Args:
+        blocks: (blocks, 64) int32 array in coding order
+        width: Image width in pixels
+        height: Image height in pixels
+        quality: Quality the blocks were quantized with (for the DQT tables)
+        
+    Returns:
+        JPEG file bytes
+    """
+    if not (0 < width <= 0xFFFF and 0 < height <= 0xFFFF):
+        raise ValueError("JPEG images are limited to 65535 pixels per side")
+    luma_table, chroma_table = quant_tables(quality)
+    parts = [
+        b"\xff\xd8",
+        _segment(0xE0, b"JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00"),
+        _segment(0xDB, bytes([0]) + luma_table.astype(np.uint8).tobytes()
+                 + bytes([1]) + chroma_table.astype(np.uint8).tobytes()),
+        _segment(0xC0, struct.pack('>BHHB', 8, height, width, len(COMPONENTS)) + b"".join(
+            bytes([ident, sampling, quant]) for ident, sampling, quant, _, _ in COMPONENTS
+        )),
+        _segment(0xC4, b"".join(
+            bytes([table_class << 4 | table_id]) + counts + symbols
+            for table_class, table_id, (counts, symbols) in (
+                (0, 0, HUFFMAN_TABLES["dc_luma"]), (1, 0, HUFFMAN_TABLES["ac_luma"]),
+                (0, 1, HUFFMAN_TABLES["dc_chroma"]), (1, 1, HUFFMAN_TABLES["ac_chroma"])
+            )
+        )),
+        _segment(0xDA, bytes([len(COMPONENTS)]) + bytes([1, 0x00, 2, 0x11, 3, 0x11]) + b"\x00\x3f\x00"),
+        encode_scan(blocks),
+        b"\xff\xd9",
+    ]
+    return b"".join(parts)
+
+
+def is_jpeg(data: bytes) -> bool:
+    """Whether data starts with a JPEG start-of-image marker"""
+    return data[:3] == b"\xff\xd8\xff"
+
+
+class UnsupportedJpegError(ValueError):
+    """Raised for valid JPEGs that are not baseline 8-bit, which DCTEncoder never writes"""
+
+
+class _BitReader:
+    """MSB-first bit reader over unstuffed scan data, padded with 1 bits"""
+    
+    def __init__(self, data: bytes):
+        self.data = data
+        self.pos = 0
+        self.acc = 0
+        self.count = 0
+    
+    def _fill(self, bits: int) -> None:
+        while self.count < bits:
+            byte = self.data[self.pos] if self.pos < len(self.data) else 0xFF
+            self.pos += 1
+            self.acc = (self.acc << 8) | byte
+            self.count += 8
+    
+    def peek16(self) -> int:
+        self._fill(16)
+        return (self.acc >> (self.count - 16)) & 0xFFFF
+    
+    def skip(self, bits: int) -> None:
+        self.count -= bits
+        self.acc &= (1 << self.count) - 1
+    
+    def receive(self, size: int) -> int:
+        """Read a size-category value (F.2.2.1 EXTEND)"""
+        if size == 0:
+            return 0
+        self._fill(size)
+        self.count -= size
+        value = self.acc >> self.count
+        self.acc &= (1 << self.count) - 1
+        return value if value >= 1 << (size - 1) else value - (1 << size) + 1
+    
+    @property
+    def exhausted(self) -> bool:
+        """Whether more bits were consumed than the data holds"""
+        return self.pos * 8 - self.count > len(self.data) * 8
+
+
+class JpegReader:
+    """
+    Coefficient reader for baseline (Huffman, 8-bit) JPEG files
+    
+    Only the first scan is read. Blocks are decoded on demand, so reading
+    the start of an image costs little whatever its size.
+    """
+    
+    def __init__(self, data: bytes):
+        """
+        Args:
+            data: JPEG file bytes
+        """
+        if not is_jpeg(data):
+            raise ValueError("Not a JPEG file")
+        self.width = 0
+        self.height = 0
+        self.components = []
+        self.restart_interval = 0
+        self._tables = {}
+        self._scan = None
+        pos = 2
+        while self._scan is None:
+            if pos + 4 > len(data) or data[pos] != 0xFF:
+                raise ValueError("Truncated or corrupt JPEG")
+            marker = data[pos + 1]
+            if marker == 0xFF:
+                pos += 1
+                continue
+            length = struct.unpack_from('>H', data, pos + 2)[0]
+            segment = data[pos + 4:pos + 2 + length]
+            if marker in (0xC0, 0xC1):
+                self._read_frame(segment)
+            elif 0xC2 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                raise UnsupportedJpegError("Only baseline JPEGs are supported")
+            elif marker == 0xC4:
+                self._read_tables(segment)
+            elif marker == 0xDD:
+                self.restart_interval = struct.unpack('>H', segment[:2])[0]
+            elif marker == 0xDA:
+                self._read_scan(segment, data, pos + 2 + length)
+            elif marker == 0xD9:
+                raise ValueError("JPEG has no image data")
+            pos += 2 + length
+        if not self.components:
+            raise ValueError("JPEG has no frame header")
+    
+    def _read_frame(self, segment: bytes) -> None:
+        precision, self.height, self.width, count = struct.unpack_from('>BHHB', segment)
+        if precision != 8:
+            raise UnsupportedJpegError("Only 8-bit JPEGs are supported")
+        for i in range(count):
+            ident, sampling, _ = segment[6 + 3 * i:9 + 3 * i]
+            self.components.append({"id": ident, "h": sampling >> 4, "v": sampling & 15})
+    
+    def _read_tables(self, segment: bytes) -> None:
+        pos = 0
+        while pos < len(segment):
+            key = segment[pos]
+            counts = segment[pos + 1:pos + 17]
+            symbols = segment[pos + 17:pos + 17 + sum(counts)]
+            pos += 17 + sum(counts)
+            # 16-bit lookup: every code prefix maps to (symbol, code length)
+            lookup = [(0, 0)] * 65536
+            code = 0
+            k = 0
+            for length, count in enumerate(counts, start=1):
+                for _ in range(count):
+                    start = code << (16 - length)
+                    lookup[start:start + (1 << (16 - length))] = [(symbols[k], length)] * (1 << (16 - length))
+                    code += 1
+                    k += 1
+                code <<= 1
+            self._tables[key] = lookup
+    
+    def _read_scan(self, segment: bytes, data: bytes, start: int) -> None:
+        count = segment[0]
+        ids = [component["id"] for component in self.components]
+        scan = []
+        for i in range(count):
+            ident, selectors = segment[1 + 2 * i:3 + 2 * i]
+            if ident not in ids:
+                raise ValueError("Scan names an unknown component")
+            scan.append((ids.index(ident), self._tables.get(selectors >> 4),
+                         self._tables.get(0x10 | (selectors & 15))))
+        if any(dc is None or ac is None for _, dc, ac in scan):
+            raise ValueError("Scan uses an undefined Huffman table")
+        # Entropy-coded data runs to the first marker other than a restart
+        end = re.compile(rb"\xff[^\x00\xd0-\xd7]").search(data, start)
+        self._scan = (scan, data[start:end.start() if end else len(data)])
+    
+    def _mcus(self) -> Tuple[int, List[Tuple[int, list, list]]]:
+        """Number of MCUs, and the (component, DC table, AC table) of each block of one"""
+        scan, _ = self._scan
+        h_max = max(c["h"] for c in self.components)
+        v_max = max(c["v"] for c in self.components)
+        if len(scan) == 1:
+            # Non-interleaved: one block per MCU, over the component's own grid
+            component = self.components[scan[0][0]]
+            width = -(-self.width * component["h"] // h_max)
+            height = -(-self.height * component["v"] // v_max)
+            return -(-width // BLOCK) * -(-height // BLOCK), scan
+        mcu = [entry for entry in scan
+               for _ in range(self.components[entry[0]]["h"] * self.components[entry[0]]["v"])]
+        return -(-self.width // (BLOCK * h_max)) * -(-self.height // (BLOCK * v_max)), mcu
+    
+    def block_count(self) -> int:
+        """Number of blocks in the scan"""
+        count, mcu = self._mcus()
+        return count * len(mcu)
+    
+    def blocks(self) -> Iterator[Tuple[int, List[int]]]:
+        """
+        Decode the scan block by block
+        
+        Yields:
+            (component index, 64 quantized coefficients in zigzag order,
+            with the DC coefficient already undifferenced)
+        """
+        _, data = self._scan
+        segments = re.split(rb"\xff[\xd0-\xd7]", data) if self.restart_interval else [data]
+        segment = 0
+        reader = _BitReader(segments[0].replace(b"\xff\x00", b"\xff"))
+        predictors = [0] * len(self.components)
+        count, mcu = self._mcus()
+        for mcu_index in range(count):
+            if self.restart_interval and mcu_index and mcu_index % self.restart_interval == 0:
+                segment += 1
+                if segment >= len(segments):
+                    raise ValueError("Truncated JPEG scan")
+                reader = _BitReader(segments[segment].replace(b"\xff\x00", b"\xff"))
+                predictors = [0] * len(self.components)
+            for component, dc_table, ac_table in mcu:
+                coefficients = [0] * 64
+                size, length = dc_table[reader.peek16()]
+                if not length:
+                    raise ValueError("Corrupt JPEG scan")
+                reader.skip(length)
+                predictors[component] += reader.receive(size)
+                coefficients[0] = predictors[component]
+                k = 1
+                while k < 64:
+                    symbol, length = ac_table[reader.peek16()]
+                    if not length:
+                        raise ValueError("Corrupt JPEG scan")
+                    reader.skip(length)
+                    run, size = symbol >> 4, symbol & 15
+                    if size == 0:
+                        if run != 15:
+                            break
+                        k += 16
+                        continue
+                    k += run
+                    if k > 63:
+                        raise ValueError("Corrupt JPEG scan")
+                    coefficients[k] = reader.receive(size)
+                    k += 1
+                if reader.exhausted:
+                    raise ValueError("Truncated JPEG scan")
+                yield component, coefficients
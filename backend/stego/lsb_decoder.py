@@ -2,88 +2,313 @@
 LSB (Least Significant Bit) Decoder Module
 Extracts hidden messages from stego images
 """
+from typing import Callable, Optional, Tuple
 from PIL import Image
+import numpy as np
+from .compression import PayloadCompressor
+from .container import PayloadContainer
+from .dct_decoder import DCTDecoder
+from .embed_modes import payload_offset, seed_channels
+from .image_io import ImageSource, has_alpha, load_rgb, open_image, open_stream
+from .jpeg_codec import is_jpeg
+from .row_reader import open_row_reader
+from .scatter import SEED_SIZE, scatter_key, scatter_positions
+from .timing import stage
+from .wav_carrier import WavCarrier, is_wav
+
+
+class PasswordRequiredError(ValueError):
+    """Raised when an encrypted or scattered payload is opened without a password"""
 
 
 class LSBDecoder:
     """Decode messages from images using LSB steganography"""
     
+    # Delimiter that marked the end of a message in the legacy format
     DELIMITER = "1111111111111110"
+    DELIMITER_BYTES = b"\xff\xfe"
+    
+    # Number of channel LSBs unpacked per search step (multiple of 8)
+    CHUNK_BITS = 1 << 20
+    
+    @staticmethod
+    def bytes_to_text(data: bytes) -> str:
+        """Convert extracted bytes to text"""
+        try:
+            return data.decode('utf-8')
+        except UnicodeDecodeError:
+            # Images from the original encoder stored one byte per character
+            return data.decode('latin-1')
+    
+    @staticmethod
+    def read_bytes(channels: np.ndarray, start_bit: int, count: int) -> bytes:
+        """Pack `count` bytes from the LSBs starting at channel `start_bit`"""
+        return np.packbits(channels[start_bit:start_bit + count * 8] & 1).tobytes()
     
     @staticmethod
-    def binary_to_text(binary: str) -> str:
-        """Convert binary string to text"""
-        text = ''
-        # Only process complete bytes
-        complete_bytes = (len(binary) // 8) * 8
-        for i in range(0, complete_bytes, 8):
-            byte = binary[i:i+8]
-            try:
-                char_code = int(byte, 2)
-                # Only include printable characters and common whitespace
-                # ASCII printable: 32-126, plus tab(9), newline(10), carriage return(13)
-                if (32 <= char_code <= 126) or char_code in (9, 10, 13):
-                    text += chr(char_code)
-            except (ValueError, OverflowError):
-                # Skip invalid bytes
-                continue
-        return text
+    def read_kbits(channels: np.ndarray, count: int, bits: int) -> bytes:
+        """Pack `count` bytes from the low `bits` bits of each channel (see embed_kbits)"""
+        used = -(-count * 8 // bits)
+        values = channels[:used] & ((1 << bits) - 1)
+        stream = np.unpackbits(values[:, np.newaxis], axis=1)[:, 8 - bits:].reshape(-1)
+        return np.packbits(stream[:count * 8]).tobytes()
     
     @staticmethod
-    def decode(image_path: str) -> str:
+    def find_delimiter(channels: np.ndarray) -> Optional[bytes]:
         """
-        Decode hidden message from image
+        Collect message bytes up to the delimiter
+        
+        LSBs are packed into bytes chunk by chunk, and each chunk is searched
+        for the delimiter so that extraction stops at the first match.
         
         Args:
-            image_path: Path to stego image
+            channels: Flat uint8 array of channel values (R, G, B, R, ...)
             
         Returns:
-            Extracted hidden message
+            Bytes preceding the delimiter, or None if there is no delimiter
         """
-        try:
-            # Load image
-            img = Image.open(image_path)
-            
-            # Convert to RGB if needed
-            if img.mode != 'RGB':
-                img = img.convert('RGB')
+        total_bits = channels.size - channels.size % 8
+        first, second = LSBDecoder.DELIMITER_BYTES
+        pieces = []
+        carry = np.empty(0, dtype=np.uint8)
+        
+        for start in range(0, total_bits, LSBDecoder.CHUNK_BITS):
+            stop = min(start + LSBDecoder.CHUNK_BITS, total_bits)
+            chunk = np.packbits(channels[start:stop] & 1)
             
-            # Load pixel data
-            pixels = list(img.getdata())
+            # Keep the previous chunk's last byte so a split delimiter matches
+            window = np.concatenate((carry, chunk))
+            hits = np.flatnonzero((window[:-1] == first) & (window[1:] == second))
+            if hits.size:
+                pieces.append(window[:hits[0]])
+                return b''.join(piece.tobytes() for piece in pieces)
             
-            # Extract binary data
-            binary_data = ''
+            pieces.append(window[:-1])
+            carry = window[-1:]
+        
+        return None
+    
+    @staticmethod
+    def extract(image: ImageSource, password: Optional[str] = None) -> Tuple[dict, bytes]:
+        """
+        Extract the raw payload from image
+        
+        Images with a container header are read by length; anything else
+        is treated as the legacy delimiter format. 8-bit RGB PNGs and 24-bit
+        BMPs are decoded row by row, stopping as soon as the payload is
+        complete; other images are decoded whole. JPEG files are handed to
+        DCTDecoder. WAV files are memory-mapped and only the samples the
+        payload occupies are read.
+        
+        Args:
+            image: Path, bytes, file-like object or PIL image (or WAV file)
+            password: Needed only for payloads embedded in scatter order
             
-            for pixel in pixels:
-                r, g, b = pixel
+        Returns:
+            Tuple of (header dictionary, payload bytes)
+        """
+        try:
+            with stage("extract"):
+                if isinstance(image, Image.Image):
+                    return LSBDecoder._extract_whole(image, password)
                 
-                # Extract LSB from each channel
-                binary_data += str(r & 1)
-                binary_data += str(g & 1)
-                binary_data += str(b & 1)
+                stream, owned = open_stream(image)
+                try:
+                    start = stream.tell()
+                    signature = stream.read(12)
+                    stream.seek(start)
+                    if is_jpeg(signature):
+                        return DCTDecoder.read_payload(stream)
+                    if is_wav(signature):
+                        return LSBDecoder._extract_wav(
+                            image if isinstance(image, (bytes, bytearray, memoryview)) else stream,
+                            password
+                        )
+                    
+                    reader = open_row_reader(stream)
+                    if reader is None:
+                        return LSBDecoder._extract_whole(open_image(stream), password)
+                    try:
+                        row_channels = reader.width * 3
+                        return LSBDecoder.extract_channels(
+                            lambda bits: reader.read(-(-bits // row_channels)).reshape(-1),
+                            reader.height * row_channels,
+                            password=password
+                        )
+                    finally:
+                        reader.close()
+                finally:
+                    if owned:
+                        stream.close()
+                        
+        except PasswordRequiredError:
+            raise
+        except Exception as e:
+            if "No hidden message" in str(e):
+                raise
+            raise ValueError(f"Decoding failed: {str(e)}")
+    
+    @staticmethod
+    def _extract_wav(audio, password: Optional[str] = None) -> Tuple[dict, bytes]:
+        """Extract from the sample low bits of a WAV file (container payloads only)"""
+        with WavCarrier(audio) as carrier:
+            samples = carrier.low_bytes
+            return LSBDecoder.extract_channels(
+                lambda count: samples, samples.size, password=password, legacy=False
+            )
+    
+    @staticmethod
+    def _extract_whole(img: Image.Image, password: Optional[str] = None) -> Tuple[dict, bytes]:
+        """Extract from an image decoded whole"""
+        if not has_alpha(img):
+            # Flat view of the channel values
+            channels = np.asarray(load_rgb(img), dtype=np.uint8).reshape(-1)
+            return LSBDecoder.extract_channels(
+                lambda count: channels, channels.size, password=password
+            )
+        
+        rgba = np.asarray(img if img.mode == 'RGBA' else img.convert('RGBA'), dtype=np.uint8)
+        channels = rgba[..., :3].reshape(-1)
+        return LSBDecoder.extract_channels(
+            lambda count: channels, channels.size, lambda count: rgba.reshape(-1), password
+        )
+    
+    @staticmethod
+    def extract_channels(
+        read: Callable[[int], np.ndarray],
+        total: int,
+        read_rgba: Optional[Callable[[int], np.ndarray]] = None,
+        password: Optional[str] = None,
+        legacy: bool = True
+    ) -> Tuple[dict, bytes]:
+        """
+        Extract the payload from channel values that are decoded on demand
+        
+        Args:
+            read: Returns a flat RGB channel array covering at least the
+                first n channels (or all of them, if there are fewer)
+            total: Number of RGB channels in the image
+            read_rgba: Like read, over RGBA channels; None for images
+                without alpha
+            password: Password of scattered payloads
+            legacy: Fall back to the delimiter format when there is no
+                container header (it was only ever written into images)
                 
-                # Check for delimiter
-                if binary_data.endswith(LSBDecoder.DELIMITER):
-                    # Remove delimiter
-                    binary_data = binary_data[:-len(LSBDecoder.DELIMITER)]
-                    break
-            
-            # Check if delimiter was found
-            if not binary_data or len(binary_data) < 8:
-                raise ValueError("No hidden message found in image")
-            
-            # Convert binary to text
-            message = LSBDecoder.binary_to_text(binary_data)
-            
-            if not message:
+        Returns:
+            Tuple of (header dictionary, payload bytes)
+        """
+        # Read the fixed-size header from the first pixels
+        channels = read(PayloadContainer.HEADER_BITS)
+        header = PayloadContainer.read_header(
+            LSBDecoder.read_bytes(channels, 0, PayloadContainer.HEADER_SIZE)
+        )
+        if header is not None:
+            data = LSBDecoder._read_payload(header, read, total, read_rgba, password)
+            if data is not None:
+                return header, data
+        if not legacy:
+            raise ValueError("No hidden message found in audio")
+        
+        # Fall back to the legacy format: bytes up to the delimiter, reading
+        # twice as far each time it is not found
+        while True:
+            data = LSBDecoder.find_delimiter(channels)
+            if data is not None:
+                return {"version": 1, "flags": 0, "length": len(data)}, data
+            if channels.size >= total:
                 raise ValueError("No hidden message found in image")
+            channels = read(min(max(channels.size * 2, LSBDecoder.CHUNK_BITS), total))
+    
+    @staticmethod
+    def _read_payload(
+        header: dict,
+        read: Callable[[int], np.ndarray],
+        total: int,
+        read_rgba: Optional[Callable[[int], np.ndarray]],
+        password: Optional[str]
+    ) -> Optional[bytes]:
+        """Read the payload a header describes, or None if it cannot fit"""
+        flags = header["flags"]
+        length = header["length"]
+        bits, alpha = PayloadContainer.get_mode(flags)
+        scatter = flags & PayloadContainer.FLAG_SCATTER
+        if bits == 1 and not alpha and not scatter:
+            end_bit = PayloadContainer.HEADER_BITS + length * 8
+            if end_bit > total:
+                return None
+            return LSBDecoder.read_bytes(read(end_bit), PayloadContainer.HEADER_BITS, length)
+        
+        if alpha and read_rgba is None:
+            raise ValueError("Message was hidden using an alpha channel this image lacks")
+        if scatter and not password:
+            raise PasswordRequiredError(
+                "This message is scattered with a password. Please provide the password"
+            )
+        source = read_rgba if alpha else read
+        available = total // 3 * 4 if alpha else total
+        start = payload_offset(bits, alpha)
+        used = -(-length * 8 // bits)
+        
+        if not scatter:
+            if start + used > available:
+                return None
+            return LSBDecoder.read_kbits(source(start + used)[start:], length, bits)
+        
+        skip = seed_channels(bits)
+        if start + skip + used > available:
+            return None
+        body = source(available)[start:available]
+        seed = LSBDecoder.read_kbits(body, SEED_SIZE, bits)
+        domain = body[skip:]
+        values = np.empty(used, dtype=np.uint8)
+        for offset, positions in scatter_positions(scatter_key(password, seed), domain.size, used):
+            values[offset:offset + positions.size] = domain[positions]
+        return LSBDecoder.read_kbits(values, length, bits)
+    
+    @staticmethod
+    def payload_to_text(header: dict, data: bytes) -> str:
+        """
+        Convert an extracted payload to the hidden message text
+        
+        Args:
+            header: Header dictionary returned by extract()
+            data: Payload bytes returned by extract()
             
+        Returns:
+            Hidden message
+        """
+        if header["flags"] & PayloadContainer.FLAG_ENCRYPTED:
+            raise ValueError("Hidden message is encrypted; a password is required")
+        
+        # Check if a message was found
+        if not data:
+            raise ValueError("No hidden message found in image")
+        
+        # Undo compression applied before embedding
+        data = PayloadCompressor.decompress(PayloadContainer.get_codec(header["flags"]), data)
+        
+        # Convert bytes to text
+        message = LSBDecoder.bytes_to_text(data)
+        
+        if header["version"] == 1:
             # Remove any trailing null bytes or control characters
             message = message.rstrip('\x00\x01\x02\x03\x04\x05\x06\x07\x08\x0b\x0c\x0e\x0f').rstrip()
+        
+        if not message:
+            raise ValueError("No hidden message found in image")
+        
+        return message
+    
+    @staticmethod
+    def decode(image: ImageSource) -> str:
+        """
+        Decode hidden message from image
+        
+        Args:
+            image: Path, bytes, file-like object or PIL image
             
-            return message
-            
-        except Exception as e:
-            if "No hidden message" in str(e):
-                raise
-            raise ValueError(f"Decoding failed: {str(e)}")
+        Returns:
+            Extracted hidden message
+        """
+        header, data = LSBDecoder.extract(image)
+        return LSBDecoder.payload_to_text(header, data)
@@ -2,15 +2,34 @@
 LSB (Least Significant Bit) Encoder Module
 Embeds secret messages into images using LSB steganography
 """
+from typing import Optional, Union
 from PIL import Image
+import numpy as np
 import io
+import os
+import shutil
+from .container import PayloadContainer
+from .dct_encoder import DCTEncoder
+from .embed_modes import (
+    DEFAULT_EMBED_MODE, HEADER_PIXELS, channel_capacity, channels_needed, get_embed_mode,
+    payload_capacity, payload_offset, seed_channels
+)
+from .image_io import ImageSource, load_rgb, load_rgba, open_stream
+from .output_formats import get_output_format, resolve_output_format
+from .scatter import SEED_SIZE, scatter_key, scatter_positions
+from .timing import stage
+from .wav_carrier import AudioSource, WavCarrier, sniff_wav
 
 
 class LSBEncoder:
     """Encode messages into images using LSB steganography"""
     
-    # Delimiter to mark end of message (16 bits)
+    # Delimiter that marked the end of a message in the legacy format (16 bits)
     DELIMITER = "1111111111111110"
+    DELIMITER_BYTES = b"\xff\xfe"
+    
+    # Bytes per read when copying WAV files for encode_wav
+    COPY_CHUNK = 1 << 20
     
     @staticmethod
     def text_to_binary(text: str) -> str:
@@ -19,83 +38,324 @@ class LSBEncoder:
         return binary
     
     @staticmethod
-    def encode(image_path: str, message: str) -> bytes:
+    def payload_to_bits(payload: bytes) -> np.ndarray:
+        """Convert payload bytes to an array of bits (MSB first)"""
+        return np.unpackbits(np.frombuffer(payload, dtype=np.uint8))
+    
+    @staticmethod
+    def embed_bits(channels: np.ndarray, bits: np.ndarray) -> None:
+        """
+        Write bits into the LSBs of a flat channel buffer, in place
+        
+        Args:
+            channels: Flat uint8 array of channel values (R, G, B, R, ...)
+            bits: Array of 0/1 values, one per channel
+        """
+        target = channels[:bits.size]
+        np.bitwise_and(target, 0xFE, out=target)
+        np.bitwise_or(target, bits, out=target)
+    
+    @staticmethod
+    def kbit_values(payload: bytes, bits: int) -> np.ndarray:
+        """Split payload into `bits`-wide values (MSB first), one per channel"""
+        stream = LSBEncoder.payload_to_bits(payload)
+        if stream.size % bits:
+            stream = np.concatenate((stream, np.zeros(bits - stream.size % bits, dtype=np.uint8)))
+        return np.packbits(stream.reshape(-1, bits), axis=1)[:, 0] >> (8 - bits)
+    
+    @staticmethod
+    def embed_kbits(channels: np.ndarray, payload: bytes, bits: int) -> None:
+        """
+        Write payload into the low `bits` bits of each channel, in place
+        
+        Args:
+            channels: Flat uint8 array of channel values
+            payload: Bytes to store, most significant bits first
+            bits: Bits per channel (1-4)
+        """
+        values = LSBEncoder.kbit_values(payload, bits)
+        target = channels[:values.size]
+        np.bitwise_and(target, (0xFF << bits) & 0xFF, out=target)
+        np.bitwise_or(target, values, out=target)
+    
+    @staticmethod
+    def embed_scattered(channels: np.ndarray, payload: bytes, bits: int, password: str) -> None:
+        """
+        Write payload at password-keyed pseudorandom channels, in place
+        
+        A random seed is written sequentially first; the payload values go
+        to the positions the seed and password select among the channels
+        after it. Only as many positions as the payload needs are generated.
+        
+        Args:
+            channels: Flat uint8 array of the channels available to the payload
+            payload: Bytes to store
+            bits: Bits per channel (1-4)
+            password: Password keying the scatter order
+        """
+        values = LSBEncoder.kbit_values(payload, bits)
+        if seed_channels(bits) + values.size > channels.size:
+            raise ValueError(
+                f"Message too large. "
+                f"Max capacity: {max(channels.size - seed_channels(bits), 0) * bits // 8} bytes, "
+                f"Message size: {len(payload)} bytes"
+            )
+        seed = os.urandom(SEED_SIZE)
+        LSBEncoder.embed_kbits(channels, seed, bits)
+        domain = channels[seed_channels(bits):]
+        keep = (0xFF << bits) & 0xFF
+        for start, positions in scatter_positions(scatter_key(password, seed), domain.size, values.size):
+            domain[positions] = (domain[positions] & keep) | values[start:start + positions.size]
+    
+    @staticmethod
+    def embed_payload(
+        pixels: np.ndarray,
+        message: bytes,
+        flags: int,
+        password: Optional[str] = None
+    ) -> None:
+        """
+        Frame message and write it into an image array, in place
+        
+        rgb1 writes header and payload as one stream of channel LSBs. Other
+        modes write the header the same way into the first HEADER_PIXELS
+        pixels, then the payload from the next pixel on at the mode's bits
+        per channel, across RGB or RGBA channels. With FLAG_SCATTER the
+        payload is spread over those channels in a password-keyed order.
+        
+        Args:
+            pixels: (height, width, 3) RGB or (height, width, 4) RGBA array
+            message: Payload bytes
+            flags: Container flags, including the embedding mode
+            password: Scatter password, required with FLAG_SCATTER
+        """
+        per_pixel = pixels.shape[-1]
+        if per_pixel == 3:
+            LSBEncoder.embed_channels(pixels.reshape(-1), message, flags, password)
+            return
+        
+        bits, alpha = PayloadContainer.get_mode(flags)
+        packed = PayloadContainer.pack(message, flags)
+        header_bits = LSBEncoder.payload_to_bits(packed[:PayloadContainer.HEADER_SIZE])
+        # Header goes in the RGB channels only, skipping alpha
+        rgb = pixels.reshape(-1, per_pixel)[:HEADER_PIXELS, :3]
+        header_channels = rgb.reshape(-1)
+        LSBEncoder.embed_bits(header_channels, header_bits)
+        rgb[...] = header_channels.reshape(-1, 3)
+        
+        LSBEncoder._embed_body(pixels.reshape(-1)[payload_offset(bits, alpha):], message, flags, password)
+    
+    @staticmethod
+    def embed_channels(
+        channels: np.ndarray,
+        message: bytes,
+        flags: int,
+        password: Optional[str] = None
+    ) -> None:
+        """
+        Frame message and write it into a flat channel array without alpha, in place
+        
+        This is the layout of RGB images, and of WAV samples. channels may
+        be a strided or memory-mapped view; only the channels the payload
+        needs are read and written.
+        
+        Args:
+            channels: Flat uint8 array of channel values
+            message: Payload bytes
+            flags: Container flags, including the embedding mode
+            password: Scatter password, required with FLAG_SCATTER
+        """
+        bits, _ = PayloadContainer.get_mode(flags)
+        packed = PayloadContainer.pack(message, flags)
+        if bits == 1 and not flags & PayloadContainer.FLAG_SCATTER:
+            LSBEncoder.embed_bits(channels, LSBEncoder.payload_to_bits(packed))
+            return
+        
+        header_bits = LSBEncoder.payload_to_bits(packed[:PayloadContainer.HEADER_SIZE])
+        LSBEncoder.embed_bits(channels, header_bits)
+        LSBEncoder._embed_body(channels[payload_offset(bits, False):], message, flags, password)
+    
+    @staticmethod
+    def _embed_body(body: np.ndarray, message: bytes, flags: int, password: Optional[str]) -> None:
+        """Write the payload after the header, sequentially or scattered"""
+        bits, _ = PayloadContainer.get_mode(flags)
+        if flags & PayloadContainer.FLAG_SCATTER:
+            if not password:
+                raise ValueError("Scattered embedding needs a password")
+            LSBEncoder.embed_scattered(body, message, bits, password)
+        else:
+            LSBEncoder.embed_kbits(body, message, bits)
+    
+    @staticmethod
+    def encode(
+        image: ImageSource,
+        message: Union[str, bytes],
+        flags: int = 0,
+        output_format: Optional[str] = None,
+        mode: str = "rgb1",
+        scatter_password: Optional[str] = None
+    ) -> bytes:
         """
         Encode message into image using LSB
         
         Args:
-            image_path: Path to source image
-            message: Message to hide
-            
+            image: Path, bytes, file-like object or PIL image; WAV files
+                are handed to encode_wav
+            message: Message to hide (text is stored as UTF-8)
+            flags: Container flags describing the payload
+            output_format: Name of a format in OUTPUT_FORMATS (default png,
+                or wav for WAV files); formats of the dct engine (jpeg) are
+                written by DCTEncoder
+            mode: Name of an embedding mode in EMBED_MODES; it is recorded
+                in the header, so decoding needs no mode
+            scatter_password: Scatter the payload in an order keyed by this
+                password (decoding then needs it too); None writes it
+                sequentially
+                
         Returns:
             Bytes of the stego image
         """
         try:
-            # Load image
-            img = Image.open(image_path)
+            wav = sniff_wav(image)
+            output_format = resolve_output_format(output_format, wav)
+            if wav:
+                return LSBEncoder.encode_wav(image, message, flags, mode, scatter_password)
+            output = get_output_format(output_format)
+            embed = get_embed_mode(mode)
+            if output["engine"] == "dct":
+                if embed is not get_embed_mode(DEFAULT_EMBED_MODE) or scatter_password:
+                    raise ValueError(
+                        f"{output_format} output supports only the {DEFAULT_EMBED_MODE} mode, without scatter"
+                    )
+                return DCTEncoder.encode(image, message, flags, output["params"]["quality"])
+            if embed["alpha"] and not output["alpha"]:
+                raise ValueError(f"{output_format} output cannot keep the alpha channel")
+            flags = PayloadContainer.set_mode(flags, embed["bits"], embed["alpha"])
+            if scatter_password:
+                flags |= PayloadContainer.FLAG_SCATTER
+            else:
+                flags &= ~PayloadContainer.FLAG_SCATTER
             
-            # Convert to RGB if needed
-            if img.mode != 'RGB':
-                img = img.convert('RGB')
+            # Load image as RGB (RGBA for alpha modes)
+            with stage("decode"):
+                img = load_rgba(image) if embed["alpha"] else load_rgb(image)
+                img.load()
             
             # Get image dimensions
             width, height = img.size
             
-            # Convert message to binary
-            binary_message = LSBEncoder.text_to_binary(message)
-            binary_message += LSBEncoder.DELIMITER
-            
             # Check if message fits
-            max_bits = width * height * 3
-            if len(binary_message) > max_bits:
+            if isinstance(message, str):
+                message = message.encode('utf-8')
+            capacity = payload_capacity(
+                width, height, embed["bits"], embed["alpha"], bool(scatter_password)
+            )
+            # Capacity stops at 0, so also check the header and seed fit
+            needed = channels_needed(len(message), embed["bits"], embed["alpha"], bool(scatter_password))
+            if needed > width * height * (4 if embed["alpha"] else 3):
                 raise ValueError(
-                    f"Message too large. Max capacity: {max_bits // 8} bytes, "
-                    f"Message size: {len(binary_message) // 8} bytes"
+                    f"Message too large. "
+                    f"Max capacity: {capacity} bytes, "
+                    f"Message size: {len(message)} bytes"
                 )
             
-            # Load pixel data
-            pixels = list(img.getdata())
-            new_pixels = []
-            
-            binary_index = 0
-            message_length = len(binary_message)
-            
-            for pixel in pixels:
-                r, g, b = pixel
-                
-                # Encode in red channel
-                if binary_index < message_length:
-                    r = (r & 0xFE) | int(binary_message[binary_index])
-                    binary_index += 1
-                
-                # Encode in green channel
-                if binary_index < message_length:
-                    g = (g & 0xFE) | int(binary_message[binary_index])
-                    binary_index += 1
+            with stage("embed"):
+                # Load pixel data as a writable (height, width, channels) array
+                pixels = np.array(img, dtype=np.uint8)
                 
-                # Encode in blue channel
-                if binary_index < message_length:
-                    b = (b & 0xFE) | int(binary_message[binary_index])
-                    binary_index += 1
+                # Embed header and payload over the flattened channel buffer
+                LSBEncoder.embed_payload(pixels, message, flags, scatter_password)
                 
-                new_pixels.append((r, g, b))
-                
-                # Break if message fully encoded
-                if binary_index >= message_length:
-                    # Add remaining pixels unchanged
-                    new_pixels.extend(pixels[len(new_pixels):])
-                    break
-            
-            # Create new image with modified pixels
-            stego_img = Image.new('RGB', (width, height))
-            stego_img.putdata(new_pixels)
+                # Create new image from the modified array
+                stego_img = Image.fromarray(pixels)
             
             # Save to bytes
             img_byte_arr = io.BytesIO()
-            stego_img.save(img_byte_arr, format='PNG')
+            with stage("save"):
+                stego_img.save(img_byte_arr, format=output["format"], **output["params"])
             img_byte_arr.seek(0)
             
             return img_byte_arr.getvalue()
             
         except Exception as e:
+            if str(e).startswith("Encoding failed"):
+                raise
+            raise ValueError(f"Encoding failed: {str(e)}")
+    
+    @staticmethod
+    def encode_wav(
+        audio: AudioSource,
+        message: Union[str, bytes],
+        flags: int = 0,
+        mode: str = "rgb1",
+        scatter_password: Optional[str] = None,
+        output_path: Optional[str] = None
+    ) -> Optional[bytes]:
+        """
+        Encode message into the sample low bits of a PCM WAV file
+        
+        Samples take the place of an image's channels, in the same layout
+        as RGB modes (alpha modes are refused). Everything but the sample
+        bits the payload uses is copied unchanged.
+        
+        Args:
+            audio: Path, bytes or file-like object of a PCM WAV file
+            message: Message to hide (text is stored as UTF-8)
+            flags: Container flags describing the payload
+            mode: Name of an rgb embedding mode; its bits per channel are
+                used per sample
+            scatter_password: Scatter the payload in an order keyed by this
+                password; None writes it sequentially
+            output_path: Write the stego file here instead of returning it.
+                The source is copied in chunks and the copy's samples are
+                memory-mapped, so recordings of any size are encoded in
+                bounded memory
+                
+        Returns:
+            Bytes of the stego WAV file, or None when output_path is given
+        """
+        try:
+            embed = get_embed_mode(mode)
+            if embed["alpha"]:
+                raise ValueError(f"Mode {mode} needs an alpha channel, which WAV files lack")
+            flags = PayloadContainer.set_mode(flags, embed["bits"], False)
+            if scatter_password:
+                flags |= PayloadContainer.FLAG_SCATTER
+            else:
+                flags &= ~PayloadContainer.FLAG_SCATTER
+            
+            if isinstance(message, str):
+                message = message.encode('utf-8')
+            with WavCarrier(audio) as carrier:
+                samples = carrier.samples
+            capacity = channel_capacity(samples, embed["bits"], False, bool(scatter_password))
+            if channels_needed(len(message), embed["bits"], False, bool(scatter_password)) > samples:
+                raise ValueError(
+                    f"Message too large. "
+                    f"Max capacity: {capacity} bytes, "
+                    f"Message size: {len(message)} bytes"
+                )
+            
+            with stage("decode"):
+                stream, owned = open_stream(audio)
+                try:
+                    if output_path is None:
+                        target = bytearray(stream.read())
+                    else:
+                        with open(output_path, 'wb') as out:
+                            shutil.copyfileobj(stream, out, LSBEncoder.COPY_CHUNK)
+                        target = output_path
+                finally:
+                    if owned:
+                        stream.close()
+            
+            with stage("embed"):
+                with WavCarrier(target, writable=True) as carrier:
+                    LSBEncoder.embed_channels(carrier.low_bytes, message, flags, scatter_password)
+            
+            return bytes(target) if output_path is None else None
+            
+        except Exception as e:
+            if str(e).startswith("Encoding failed"):
+                raise
             raise ValueError(f"Encoding failed: {str(e)}")
@@ -0,0 +1,138 @@
+"""
+Output Formats Module
+Codecs the encoders can write stego images (and WAV audio) with
+"""
+import zlib
+from typing import Optional
+
+
+# Save settings per output format. The "lsb" engine (LSBEncoder) writes
+# through Pillow, so every option is lossless; the "dct" engine (DCTEncoder)
+# hides the payload in JPEG coefficients and writes the file itself; the
+# "wav" engine writes WAV carriers back as WAV, changing only sample bits
+OUTPUT_FORMATS = {
+    # Pillow defaults (zlib level 6)
+    "png": {
+        "format": "PNG",
+        "media_type": "image/png",
+        "extension": ".png",
+        "alpha": True,
+        "engine": "lsb",
+        "params": {}
+    },
+    # Lowest zlib effort with run-length matching only: several times
+    # faster than the default, with output of about the same size
+    "png-fast": {
+        "format": "PNG",
+        "media_type": "image/png",
+        "extension": ".png",
+        "alpha": True,
+        "engine": "lsb",
+        "params": {"compress_level": 1, "compress_type": zlib.Z_RLE}
+    },
+    # Smallest PNG, slowest to write
+    "png-max": {
+        "format": "PNG",
+        "media_type": "image/png",
+        "extension": ".png",
+        "alpha": True,
+        "engine": "lsb",
+        "params": {"compress_level": 9, "optimize": True}
+    },
+    # exact keeps the colour of fully transparent pixels, which may hold
+    # payload bits
+    "webp": {
+        "format": "WEBP",
+        "media_type": "image/webp",
+        "extension": ".webp",
+        "alpha": True,
+        "engine": "lsb",
+        "params": {"lossless": True, "exact": True, "method": 1, "quality": 25}
+    },
+    # Uncompressed: no encode cost, largest files. Pillow reads 32-bit BMPs
+    # back without alpha, so alpha modes cannot use it
+    "bmp": {
+        "format": "BMP",
+        "media_type": "image/bmp",
+        "extension": ".bmp",
+        "alpha": False,
+        "engine": "lsb",
+        "params": {}
+    },
+    "tiff": {
+        "format": "TIFF",
+        "media_type": "image/tiff",
+        "extension": ".tiff",
+        "alpha": True,
+        "engine": "lsb",
+        "params": {}
+    },
+    # Lossy and much smaller than PNG for photos; only the default embedding
+    # mode, without scatter, and capacity depends on the image content
+    "jpeg": {
+        "format": "JPEG",
+        "media_type": "image/jpeg",
+        "extension": ".jpg",
+        "alpha": False,
+        "engine": "dct",
+        "params": {"quality": 90}
+    },
+    # The only format for WAV carriers, and only for them
+    "wav": {
+        "format": "WAV",
+        "media_type": "audio/wav",
+        "extension": ".wav",
+        "alpha": False,
+        "engine": "wav",
+        "params": {}
+    },
+}
+
+DEFAULT_OUTPUT_FORMAT = "png"
+
+
+def get_output_format(name: Optional[str]) -> dict:
+    """
+    Look up an output format by name
+    
+    Args:
+        name: Key of OUTPUT_FORMATS, or None for the default
+        
+    Returns:
+        Format settings (format, media_type, extension, alpha, engine, params)
+    """
+    key = (name or DEFAULT_OUTPUT_FORMAT).lower()
+    if key not in OUTPUT_FORMATS:
+        raise ValueError(
+            f"Unknown output format '{name}'. Choose from: {', '.join(OUTPUT_FORMATS)}"
+        )
+    return OUTPUT_FORMATS[key]
+
+
+def resolve_output_format(name: Optional[str], wav: bool = False) -> str:
+    """
+    Name of the format to write a carrier in, checked against the carrier
+    
+    Args:
+        name: Key of OUTPUT_FORMATS, or None for the carrier's default
+            (png for images, wav for WAV files)
+        wav: Whether the carrier is a WAV file
+        
+    Returns:
+        Lower-case format name
+    """
+    key = (name or ("wav" if wav else DEFAULT_OUTPUT_FORMAT)).lower()
+    is_wav_format = get_output_format(key)["engine"] == "wav"
+    if wav and not is_wav_format:
+        raise ValueError("WAV carriers can only be written as wav")
+    if is_wav_format and not wav:
+        raise ValueError(f"Output format {key} needs a WAV carrier")
+    return key
+
+
+def format_for_media_type(media_type: str) -> Optional[str]:
+    """Name of the default output format for a media type, if any"""
+    for name, spec in OUTPUT_FORMATS.items():
+        if spec["media_type"] == media_type:
+            return name
+    return None
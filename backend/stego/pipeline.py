@@ -0,0 +1,93 @@
+"""
+Payload Pipeline Module
+Turns messages into embeddable payloads and back: compress, then encrypt
+"""
+from typing import Optional, Tuple, Union
+from .compression import PayloadCompressor
+from .container import PayloadContainer
+from .crypto import AESCrypto
+from .lsb_decoder import LSBDecoder, PasswordRequiredError
+
+
+class DecryptionError(ValueError):
+    """Raised when a payload cannot be decrypted with the given password"""
+
+
+def prepare_payload(
+    message: Union[str, bytes],
+    password: Optional[str] = None,
+    compress: bool = True,
+    salted_key: Optional[Tuple[bytes, bytes]] = None
+) -> Tuple[bytes, int]:
+    """
+    Build the payload and container flags for a message
+    
+    Compression runs before encryption, since ciphertext does not compress.
+    
+    Args:
+        message: Message to hide (text is stored as UTF-8)
+        password: Optional password for AES-GCM encryption
+        compress: Try compressing the message first
+        salted_key: (salt, key) from AESCrypto.new_gcm_key, used instead of
+            password to skip PBKDF2
+            
+    Returns:
+        Tuple of (payload bytes, container flags)
+    """
+    payload = message.encode('utf-8') if isinstance(message, str) else message
+    flags = 0
+    
+    if compress:
+        codec, payload = PayloadCompressor.compress(payload)
+        flags = PayloadContainer.set_codec(flags, codec)
+    
+    if password or salted_key is not None:
+        payload = AESCrypto.encrypt_bytes(payload, password, salted_key)
+        flags |= PayloadContainer.FLAG_ENCRYPTED
+    
+    return payload, flags
+
+
+def recover_message(
+    header: dict,
+    data: bytes,
+    password: Optional[str] = None,
+    key: Optional[bytes] = None
+) -> Tuple[str, bool]:
+    """
+    Recover the message text from an extracted payload
+    
+    Args:
+        header: Header dictionary returned by LSBDecoder.extract()
+        data: Payload bytes returned by LSBDecoder.extract()
+        password: Password, if the message was encrypted
+        key: AES-GCM key already derived for this payload's salt
+        
+    Returns:
+        Tuple of (message, whether decryption was used)
+    """
+    if header["flags"] & PayloadContainer.FLAG_SHARD:
+        raise ValueError(
+            "This image holds one part of a multi-image message. "
+            "Decode all of its images together"
+        )
+    
+    if header["flags"] & PayloadContainer.FLAG_ENCRYPTED:
+        if not password and key is None:
+            raise PasswordRequiredError("This message is encrypted. Please provide the password")
+        try:
+            data = AESCrypto.decrypt_bytes(data, password, key)
+        except ValueError:
+            raise DecryptionError("Wrong password")
+        header = dict(header, flags=header["flags"] & ~PayloadContainer.FLAG_ENCRYPTED)
+        return LSBDecoder.payload_to_text(header, data), True
+    
+    message = LSBDecoder.payload_to_text(header, data)
+    if not password:
+        return message, False
+    
+    # Text payload, possibly base64 AES-CBC from older images
+    try:
+        return AESCrypto.decrypt(message, password), True
+    except ValueError:
+        raise DecryptionError("Wrong password or message was not encrypted with a password")
@@ -0,0 +1,259 @@
+"""
+PNG Streaming Module
+Reads and writes PNG scanlines in strips, without holding the whole image
+"""
+import struct
+import zlib
+from typing import BinaryIO, Iterator, Optional
+import numpy as np
+
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# IHDR color type and bit depth of the only layout the streaming paths handle
+COLOR_TYPE_RGB = 2
+BIT_DEPTH_8 = 8
+
+# Bytes read from the source, or inflated, per step
+READ_SIZE = 1 << 16
+
+
+def read_png_header(stream: BinaryIO) -> Optional[dict]:
+    """
+    Read the PNG signature and IHDR chunk
+    
+    Leaves the stream positioned at the chunk after IHDR.
+    
+    Returns:
+        Dictionary with width, height, bit_depth, color_type and interlace,
+        or None if the stream is not a PNG
+    """
+    if stream.read(8) != PNG_SIGNATURE:
+        return None
+    length, ctype = struct.unpack(">I4s", stream.read(8))
+    if ctype != b"IHDR" or length != 13:
+        return None
+    width, height, bit_depth, color_type, _, _, interlace = struct.unpack(
+        ">IIBBBBB", stream.read(13)
+    )
+    stream.read(4)  # CRC
+    return {
+        "width": width,
+        "height": height,
+        "bit_depth": bit_depth,
+        "color_type": color_type,
+        "interlace": interlace
+    }
+
+
+def png_chunk(ctype: bytes, data: bytes) -> bytes:
+    """A PNG chunk: length, type, data and CRC"""
+    return struct.pack(">I", len(data)) + ctype + data + struct.pack(
+        ">I", zlib.crc32(data, zlib.crc32(ctype))
+    )
+
+
+def is_streamable(header: Optional[dict]) -> bool:
+    """Whether the scanlines are plain 8-bit RGB rows (no palette, alpha or interlace)"""
+    return (
+        header is not None
+        and header["bit_depth"] == BIT_DEPTH_8
+        and header["color_type"] == COLOR_TYPE_RGB
+        and header["interlace"] == 0
+    )
+
+
+def iter_idat(stream: BinaryIO, read_size: int = READ_SIZE) -> Iterator[bytes]:
+    """
+    Yield the compressed image data of a PNG in pieces of at most read_size
+    
+    The stream must be positioned just after IHDR (see read_png_header).
+    Chunks other than IDAT are skipped; iteration ends at the first chunk
+    after the IDAT run.
+    """
+    seen_idat = False
+    while True:
+        head = stream.read(8)
+        if len(head) < 8:
+            raise ValueError("PNG is truncated")
+        length, ctype = struct.unpack(">I4s", head)
+        if ctype != b"IDAT":
+            if seen_idat or ctype == b"IEND":
+                return
+            stream.seek(length + 4, 1)
+            continue
+        
+        seen_idat = True
+        remaining = length
+        while remaining:
+            piece = stream.read(min(remaining, read_size))
+            if not piece:
+                raise ValueError("PNG is truncated")
+            remaining -= len(piece)
+            yield piece
+        stream.read(4)  # CRC; zlib's own checksum covers the data
+
+
+def iter_inflated(pieces: Iterator[bytes], read_size: int = READ_SIZE) -> Iterator[bytes]:
+    """Inflate a zlib stream piece by piece, never producing more than read_size at once"""
+    inflater = zlib.decompressobj()
+    for piece in pieces:
+        data = piece
+        while data:
+            out = inflater.decompress(data, read_size)
+            if out:
+                yield out
+            data = inflater.unconsumed_tail
+        if inflater.eof:
+            return
+    tail = inflater.flush()
+    if tail:
+        yield tail
+
+
+def filter_rows(rows: np.ndarray, prior: Optional[np.ndarray], bpp: int = 3) -> np.ndarray:
+    """
+    Apply PNG filtering to a block of rows, choosing the filter per row
+    
+    Every filter is computed for the whole block at once and the one with
+    the smallest sum of absolute (signed) values is kept, the same heuristic
+    libpng and Pillow use.
+    
+    Args:
+        rows: (n, row_bytes) uint8 array of raw scanlines
+        prior: Raw scanline above the block, or None for the first row
+        bpp: Bytes per pixel
+        
+    Returns:
+        (n, row_bytes + 1) uint8 array of filter-type-prefixed scanlines
+    """
+    x = rows.astype(np.int16)
+    up = np.empty_like(x)
+    up[0] = 0 if prior is None else prior
+    up[1:] = x[:-1]
+    left = np.zeros_like(x)
+    left[:, bpp:] = x[:, :-bpp]
+    upleft = np.zeros_like(x)
+    upleft[:, bpp:] = up[:, :-bpp]
+    
+    p = left + up - upleft
+    pa = np.abs(p - left)
+    pb = np.abs(p - up)
+    pc = np.abs(p - upleft)
+    paeth = np.where((pa <= pb) & (pa <= pc), left, np.where(pb <= pc, up, upleft))
+    del p, pa, pb, pc
+    
+    # None, Sub, Up, Average, Paeth
+    candidates = np.stack([x, x - left, x - up, x - ((left + up) >> 1), x - paeth])
+    np.bitwise_and(candidates, 0xFF, out=candidates)
+    del x, up, left, upleft, paeth
+    
+    signed = np.where(candidates > 127, 256 - candidates, candidates)
+    best = np.argmin(signed.sum(axis=2, dtype=np.int64), axis=0)
+    del signed
+    
+    out = np.empty((rows.shape[0], rows.shape[1] + 1), dtype=np.uint8)
+    out[:, 0] = best
+    out[:, 1:] = candidates[best, np.arange(rows.shape[0])]
+    return out
+
+
+class PNGStripWriter:
+    """Write an 8-bit RGB PNG a few scanlines at a time"""
+    
+    # Scratch bytes used by filter_rows per raw byte of a strip
+    FILTER_COST = 48
+    
+    def __init__(
+        self,
+        out: BinaryIO,
+        width: int,
+        height: int,
+        compress_level: int = 6,
+        compress_type: int = zlib.Z_DEFAULT_STRATEGY,
+        chunk_size: int = READ_SIZE
+    ):
+        """
+        Args:
+            out: Writable binary stream
+            width: Image width in pixels
+            height: Image height in pixels
+            compress_level: zlib level (0-9)
+            compress_type: zlib strategy, e.g. zlib.Z_RLE
+            chunk_size: Compressed bytes per IDAT chunk
+        """
+        self.out = out
+        self.width = width
+        self.height = height
+        self.row_bytes = width * 3
+        self.chunk_size = chunk_size
+        self.rows_written = 0
+        self._deflater = zlib.compressobj(compress_level, strategy=compress_type)
+        self._pending = []
+        self._pending_size = 0
+        self._prior = None
+        self._raw_allowed = True
+        
+        out.write(PNG_SIGNATURE)
+        self._write_chunk(b"IHDR", struct.pack(
+            ">IIBBBBB", width, height, BIT_DEPTH_8, COLOR_TYPE_RGB, 0, 0, 0
+        ))
+    
+    def strip_rows(self, memory_budget: int) -> int:
+        """Rows per write_rows call that keep filtering within memory_budget bytes"""
+        return max(1, memory_budget // (self.row_bytes * self.FILTER_COST))
+    
+    def write_rows(self, rows: np.ndarray) -> None:
+        """
+        Filter and compress raw scanlines
+        
+        Args:
+            rows: (n, width * 3) or (n, width, 3) uint8 array of raw pixels
+        """
+        if not self._raw_allowed:
+            raise ValueError("Raw rows cannot follow pre-filtered rows")
+        rows = rows.reshape(rows.shape[0], self.row_bytes)
+        self._compress(filter_rows(rows, self._prior).tobytes(), rows.shape[0])
+        self._prior = rows[-1].astype(np.int16)
+    
+    def write_filtered(self, data: bytes) -> None:
+        """
+        Compress scanlines that are already filtered (filter byte + row)
+        
+        The filters must be valid against the rows written before, so this
+        is for copying unchanged rows that follow the last write_rows call.
+        """
+        if len(data) % (self.row_bytes + 1):
+            raise ValueError("Filtered data is not a whole number of scanlines")
+        self._raw_allowed = False
+        self._compress(data, len(data) // (self.row_bytes + 1))
+    
+    def close(self) -> None:
+        """Finish the zlib stream and write the closing chunks"""
+        if self.rows_written != self.height:
+            raise ValueError(f"Wrote {self.rows_written} of {self.height} rows")
+        self._queue(self._deflater.flush())
+        self._flush_idat()
+        self._write_chunk(b"IEND", b"")
+    
+    def _compress(self, data: bytes, rows: int) -> None:
+        self.rows_written += rows
+        if self.rows_written > self.height:
+            raise ValueError("More rows written than the image height")
+        self._queue(self._deflater.compress(data))
+        if self._pending_size >= self.chunk_size:
+            self._flush_idat()
+    
+    def _queue(self, data: bytes) -> None:
+        if data:
+            self._pending.append(data)
+            self._pending_size += len(data)
+    
+    def _flush_idat(self) -> None:
+        if self._pending:
+            self._write_chunk(b"IDAT", b"".join(self._pending))
+            self._pending = []
+            self._pending_size = 0
+    
+    def _write_chunk(self, ctype: bytes, data: bytes) -> None:
+        self.out.write(png_chunk(ctype, data))
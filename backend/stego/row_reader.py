@@ -0,0 +1,186 @@
+"""
+Row Reader Module
+Decodes the top rows of PNG and BMP images on demand, leaving the rest untouched
+"""
+import io
+import struct
+import zlib
+from typing import BinaryIO, Optional, Union
+from PIL import Image
+import numpy as np
+from .png_stream import (
+    BIT_DEPTH_8, COLOR_TYPE_RGB, PNG_SIGNATURE, is_streamable, iter_idat, iter_inflated,
+    png_chunk, read_png_header
+)
+
+
+class PNGRowReader:
+    """
+    Inflate and unfilter an 8-bit RGB PNG only as far as rows are requested
+    
+    The image data is inflated once, here, so the rows decoded so far are
+    counted exactly. Pillow only unfilters them: each batch of complete
+    scanlines is wrapped in a small PNG, stored without compression,
+    behind the last row already decoded (written unfiltered, as the
+    filters' prior row), and read back through the public Image API.
+    """
+    
+    def __init__(self, stream: BinaryIO, header: dict):
+        """
+        Args:
+            stream: PNG stream positioned just after IHDR
+            header: Dictionary from read_png_header
+        """
+        self.width = header["width"]
+        self.height = header["height"]
+        self.rows = 0
+        # Where the image data starts, for callers that re-read it
+        self.data_start = stream.tell()
+        self._scanline = self.width * 3 + 1
+        self._inflated = iter_inflated(iter_idat(stream))
+        self._buffer = bytearray()
+        self._strips = []
+    
+    def read(self, rows: int) -> np.ndarray:
+        """
+        Return the first rows of the image, decoding more of it if needed
+        
+        Args:
+            rows: Number of rows wanted (clamped to the image height)
+            
+        Returns:
+            (rows, width * 3) uint8 array of RGB values
+        """
+        rows = min(rows, self.height)
+        while self.rows < rows:
+            piece = next(self._inflated, None)
+            if piece is None:
+                raise ValueError("PNG image data is truncated")
+            self._buffer += piece
+            count = min(len(self._buffer) // self._scanline, self.height - self.rows)
+            if count:
+                self._unfilter(count)
+        
+        if len(self._strips) > 1:
+            self._strips = [np.concatenate(self._strips)]
+        if not self._strips:
+            return np.empty((0, self.width * 3), dtype=np.uint8)
+        return self._strips[0][:rows]
+    
+    def _unfilter(self, count: int) -> None:
+        """Decode the next count scanlines from the inflated buffer"""
+        size = count * self._scanline
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        
+        prior = b""
+        if self._strips:
+            prior = b"\x00" + self._strips[-1][-1].tobytes()
+        height = count + (1 if prior else 0)
+        png = (
+            PNG_SIGNATURE
+            + png_chunk(b"IHDR", struct.pack(
+                ">IIBBBBB", self.width, height, BIT_DEPTH_8, COLOR_TYPE_RGB, 0, 0, 0
+            ))
+            + png_chunk(b"IDAT", zlib.compress(prior + data, 0))
+            + png_chunk(b"IEND", b"")
+        )
+        with Image.open(io.BytesIO(png)) as img:
+            strip = np.asarray(img, dtype=np.uint8).reshape(height, self.width * 3)
+        self._strips.append(strip[height - count:])
+        self.rows += count
+    
+    def close(self) -> None:
+        """Drop the decoded rows"""
+        self._strips = []
+
+
+class BMPRowReader:
+    """Read the top rows of an uncompressed 24-bit BMP straight from the file"""
+    
+    def __init__(self, stream: BinaryIO, start: int, header: dict):
+        """
+        Args:
+            stream: Seekable BMP stream
+            start: Stream offset of the BMP file header
+            header: Dictionary from read_bmp_header
+        """
+        self.width = header["width"]
+        self.height = header["height"]
+        self._stream = stream
+        self._start = start
+        self._header = header
+    
+    def read_strip(self, y: int, count: int) -> np.ndarray:
+        """
+        Return count rows starting at row y (counted from the top)
+        
+        Returns:
+            (count, width * 3) uint8 array of RGB values
+        """
+        stride = self._header["stride"]
+        first = self.height - y - count if self._header["bottom_up"] else y
+        self._stream.seek(self._start + self._header["offset"] + first * stride)
+        data = self._stream.read(count * stride)
+        if len(data) != count * stride:
+            raise ValueError("BMP pixel data is truncated")
+        
+        strip = np.frombuffer(data, dtype=np.uint8).reshape(count, stride)
+        if self._header["bottom_up"]:
+            strip = strip[::-1]
+        # BGR to RGB, dropping row padding
+        return np.ascontiguousarray(
+            strip[:, :self.width * 3].reshape(count, self.width, 3)[:, :, ::-1]
+        ).reshape(count, self.width * 3)
+    
+    def read(self, rows: int) -> np.ndarray:
+        """Return the first rows of the image as a (rows, width * 3) array"""
+        return self.read_strip(0, min(rows, self.height))
+    
+    def close(self) -> None:
+        """Nothing to release; the stream belongs to the caller"""
+
+
+def read_bmp_header(stream: BinaryIO) -> Optional[dict]:
+    """
+    Parse the header of an uncompressed 24-bit BMP
+    
+    Returns:
+        Dictionary with offset, width, height, bottom_up and stride,
+        or None for any other kind of file
+    """
+    head = stream.read(54)
+    if len(head) < 54 or head[:2] != b"BM":
+        return None
+    offset, dib_size = struct.unpack("<II", head[10:18])
+    width, height, _, bpp, compression = struct.unpack("<iiHHI", head[18:34])
+    if dib_size < 40 or bpp != 24 or compression != 0 or width <= 0 or height == 0:
+        return None
+    return {
+        "offset": offset,
+        "width": width,
+        "height": abs(height),
+        "bottom_up": height > 0,
+        "stride": (width * 3 + 3) & ~3
+    }
+
+
+def open_row_reader(stream: BinaryIO) -> Optional[Union[PNGRowReader, BMPRowReader]]:
+    """
+    Return a row reader for 8-bit RGB PNGs and 24-bit BMPs
+    
+    Returns:
+        A reader, or None (with the stream rewound) for other images
+    """
+    start = stream.tell()
+    header = read_png_header(stream)
+    if is_streamable(header):
+        return PNGRowReader(stream, header)
+    
+    stream.seek(start)
+    header = read_bmp_header(stream)
+    if header is not None:
+        return BMPRowReader(stream, start, header)
+    
+    stream.seek(start)
+    return None
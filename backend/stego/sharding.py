@@ -0,0 +1,163 @@
+"""
+Sharding Module
+Splits one payload across several carrier images and reassembles it
+"""
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Iterable, List, Optional, Sequence, Tuple
+from .capacity import CapacityAnalyzer
+from .container import PayloadContainer
+from .image_io import ImageSource
+from .lsb_decoder import LSBDecoder
+from .lsb_encoder import LSBEncoder
+
+
+def split_payload(payload: bytes, sizes: Sequence[int]) -> List[bytes]:
+    """
+    Cut a payload into shards of the given data sizes
+    
+    Args:
+        payload: Prepared payload (already compressed and/or encrypted)
+        sizes: Data bytes for each shard, summing to len(payload)
+        
+    Returns:
+        List of shards, each with its shard header
+    """
+    if sum(sizes) != len(payload):
+        raise ValueError("Shard sizes do not add up to the payload size")
+    if not 0 < len(sizes) <= PayloadContainer.MAX_SHARDS:
+        raise ValueError(f"Shard count must be between 1 and {PayloadContainer.MAX_SHARDS}")
+    
+    payload_id = os.urandom(8)
+    shards = []
+    offset = 0
+    for index, size in enumerate(sizes):
+        shards.append(PayloadContainer.pack_shard(
+            payload_id, index, len(sizes), payload[offset:offset + size]
+        ))
+        offset += size
+    return shards
+
+
+def join_shards(shards: Iterable[bytes]) -> bytes:
+    """
+    Reassemble a payload from its shards, given in any order
+    
+    Args:
+        shards: Shards produced by split_payload
+        
+    Returns:
+        The original payload
+    """
+    parsed = [PayloadContainer.read_shard(shard) for shard in shards]
+    if not parsed:
+        raise ValueError("No shards given")
+    
+    payload_id = parsed[0]["payload_id"]
+    count = parsed[0]["count"]
+    if any(s["payload_id"] != payload_id or s["count"] != count for s in parsed):
+        raise ValueError("Images hold shards of different messages")
+    
+    by_index = {}
+    for shard in parsed:
+        if shard["index"] in by_index:
+            raise ValueError(f"Shard {shard['index'] + 1} of {count} was given twice")
+        by_index[shard["index"]] = shard["data"]
+    
+    missing = [str(i + 1) for i in range(count) if i not in by_index]
+    if missing:
+        raise ValueError(f"Missing shards {', '.join(missing)} of {count}")
+    
+    return b"".join(by_index[i] for i in range(count))
+
+
+def _map(executor: Optional[Executor], func, *iterables) -> list:
+    """Run func over the iterables, one process per item unless an executor is given"""
+    jobs = list(zip(*iterables))
+    if executor is not None:
+        return list(executor.map(func, *zip(*jobs)))
+    if len(jobs) < 2:
+        return [func(*job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=min(len(jobs), os.cpu_count() or 1)) as pool:
+        return list(pool.map(func, *zip(*jobs)))
+
+
+def encode_shards(
+    images: Sequence[ImageSource],
+    payload: bytes,
+    flags: int = 0,
+    executor: Optional[Executor] = None
+) -> List[Tuple[int, bytes]]:
+    """
+    Split a payload over several carriers and encode them in parallel
+    
+    Args:
+        images: Carrier images; paths or bytes when using a process pool
+        payload: Prepared payload (see prepare_payload)
+        flags: Container flags of the payload
+        executor: Executor to run the encoders on; defaults to a process
+            pool with one worker per carrier
+            
+    Returns:
+        List of (image index, stego image bytes) for the carriers used
+    """
+    plan = CapacityAnalyzer.plan_shards(images, len(payload))
+    if not plan["fits"]:
+        raise ValueError(
+            f"Message too large for these images. "
+            f"Total capacity: {plan['total_capacity']} bytes, "
+            f"Message size: {len(payload)} bytes"
+        )
+    
+    used = [entry["image"] for entry in plan["shards"]]
+    shards = split_payload(payload, [entry["bytes"] for entry in plan["shards"]])
+    shard_flags = [flags | PayloadContainer.FLAG_SHARD] * len(shards)
+    encoded = _map(executor, LSBEncoder.encode, [images[i] for i in used], shards, shard_flags)
+    return list(zip(used, encoded))
+
+
+def decode_shards(
+    images: Sequence[ImageSource],
+    executor: Optional[Executor] = None
+) -> Tuple[dict, bytes]:
+    """
+    Extract shards from several images in parallel and reassemble the payload
+    
+    Args:
+        images: Stego images holding every shard of one message, in any order
+        executor: Executor to run the extractors on; defaults to a process
+            pool with one worker per image
+            
+    Returns:
+        Tuple of (header, payload) ready for recover_message()
+    """
+    return assemble_shards(_map(executor, LSBDecoder.extract, images))
+
+
+def assemble_shards(extracted: Iterable[Tuple[dict, bytes]]) -> Tuple[dict, bytes]:
+    """
+    Reassemble a payload from already extracted shards
+    
+    Args:
+        extracted: (header, data) pairs from LSBDecoder.extract(), in any order
+        
+    Returns:
+        Tuple of (header, payload) ready for recover_message()
+    """
+    flags = None
+    datas = []
+    for number, (header, data) in enumerate(extracted, 1):
+        if not header["flags"] & PayloadContainer.FLAG_SHARD:
+            raise ValueError(f"Image {number} does not hold a shard of a multi-image message")
+        if flags is not None and header["flags"] != flags:
+            raise ValueError("Images hold shards of different messages")
+        flags = header["flags"]
+        datas.append(data)
+    
+    payload = join_shards(datas)
+    header = {
+        "version": PayloadContainer.VERSION,
+        "flags": flags & ~PayloadContainer.FLAG_SHARD,
+        "length": len(payload)
+    }
+    return header, payload
@@ -0,0 +1,222 @@
+"""
+Strip Encoder Module
+LSB embedding for very large images within a fixed memory budget
+"""
+import io
+from typing import BinaryIO, Optional, Union
+from PIL import Image
+import numpy as np
+from .container import PayloadContainer
+from .image_io import ImageSource, load_rgb, open_stream
+from .lsb_encoder import LSBEncoder
+from .output_formats import get_output_format
+from .png_stream import PNGStripWriter, iter_idat, iter_inflated
+from .row_reader import BMPRowReader, PNGRowReader, open_row_reader
+from .timing import stage
+
+
+class StripEncoder:
+    """Encode messages into large images a strip of rows at a time"""
+    
+    # Default cap on working memory, in bytes. Half of it may hold decoded
+    # pixels, the other half is scratch space for PNG filtering
+    MEMORY_BUDGET = 64 * 1024 * 1024
+    
+    @staticmethod
+    def encode(
+        image: ImageSource,
+        message: Union[str, bytes],
+        flags: int = 0,
+        memory_budget: Optional[int] = None,
+        out: Optional[BinaryIO] = None,
+        output_format: str = "png"
+    ) -> Optional[bytes]:
+        """
+        Encode message into image, writing the PNG strip by strip
+        
+        8-bit RGB PNGs are spliced: only the rows the payload touches are
+        decoded and re-filtered, the remaining scanlines are copied through
+        (inflated and deflated, never unfiltered). Uncompressed 24-bit BMPs
+        are read a strip at a time. Other images are decoded whole, which is
+        refused when that would exceed the memory budget.
+        
+        Args:
+            image: Path, bytes, file-like object or PIL image
+            message: Message to hide (text is stored as UTF-8)
+            flags: Container flags describing the payload
+            memory_budget: Working memory cap in bytes (default MEMORY_BUDGET)
+            out: Writable stream for the PNG; when omitted the bytes are returned
+            output_format: One of the PNG entries of OUTPUT_FORMATS
+            
+        Returns:
+            Bytes of the stego image, or None when written to out
+        """
+        budget = memory_budget or StripEncoder.MEMORY_BUDGET
+        target = out if out is not None else io.BytesIO()
+        
+        try:
+            output = get_output_format(output_format)
+            if output["format"] != "PNG":
+                raise ValueError(f"Strip encoding writes PNG only, not {output_format}")
+            png = {key: value for key, value in output["params"].items()
+                   if key in ("compress_level", "compress_type")}
+            
+            if isinstance(message, str):
+                message = message.encode('utf-8')
+            bits = LSBEncoder.payload_to_bits(PayloadContainer.pack(message, flags))
+            
+            with stage("strip_encode"):
+                if isinstance(image, Image.Image):
+                    StripEncoder._encode_decoded(image, bits, len(message), budget,
+                                                 target, png)
+                else:
+                    stream, owned = open_stream(image)
+                    try:
+                        StripEncoder._encode_stream(stream, bits, len(message), budget,
+                                                    target, png)
+                    finally:
+                        if owned:
+                            stream.close()
+                            
+        except Exception as e:
+            raise ValueError(f"Encoding failed: {str(e)}")
+        
+        return target.getvalue() if out is None else None
+    
+    @staticmethod
+    def streamable(image: ImageSource) -> bool:
+        """
+        Whether image can be read strip by strip (8-bit RGB PNG or 24-bit BMP)
+        
+        Only these stay within the memory budget at any size; callers should
+        hand other large images to LSBEncoder instead, which decodes them whole.
+        
+        Args:
+            image: Path, bytes, file-like object or PIL image (never streamable)
+        """
+        if isinstance(image, Image.Image):
+            return False
+        stream, owned = open_stream(image)
+        start = stream.tell()
+        try:
+            reader = open_row_reader(stream)
+            if reader is None:
+                return False
+            reader.close()
+            return True
+        finally:
+            if owned:
+                stream.close()
+            else:
+                stream.seek(start)
+    
+    @staticmethod
+    def _check_fits(bits: np.ndarray, width: int, height: int, message_size: int) -> None:
+        max_bits = width * height * 3
+        if bits.size > max_bits:
+            raise ValueError(
+                f"Message too large. "
+                f"Max capacity: {(max_bits - PayloadContainer.HEADER_BITS) // 8} bytes, "
+                f"Message size: {message_size} bytes"
+            )
+    
+    @staticmethod
+    def _encode_stream(stream, bits, message_size, budget, out, png):
+        """Pick the PNG splice, BMP strip or full-decode path for a stream"""
+        reader = open_row_reader(stream)
+        if isinstance(reader, PNGRowReader):
+            StripEncoder._splice_png(stream, reader, bits, message_size, budget,
+                                     out, png)
+        elif isinstance(reader, BMPRowReader):
+            StripEncoder._write_bmp(reader, bits, message_size, budget, out, png)
+        else:
+            StripEncoder._encode_decoded(Image.open(stream), bits, message_size, budget,
+                                         out, png)
+    
+    @staticmethod
+    def _splice_png(stream, reader, bits, message_size, budget, out, png):
+        """Re-encode the rows the payload touches and copy the rest through"""
+        width, height = reader.width, reader.height
+        StripEncoder._check_fits(bits, width, height, message_size)
+        row_bytes = width * 3
+        
+        # Rows holding payload bits, plus the next one: its filter refers to
+        # the row above, so it is re-filtered against the modified pixels
+        touched = -(-bits.size // row_bytes)
+        decoded_rows = min(touched + 1, height)
+        if decoded_rows * row_bytes * 2 > budget // 2:
+            raise ValueError(
+                f"Payload spans {decoded_rows} rows, which needs more than the "
+                f"{budget // (1024 * 1024)} MB memory budget"
+            )
+        
+        pixels = reader.read(decoded_rows).copy()
+        idat_start = reader.data_start
+        reader.close()
+        del reader
+        LSBEncoder.embed_bits(pixels.reshape(-1), bits)
+        
+        writer = PNGStripWriter(out, width, height, **png)
+        step = writer.strip_rows(budget // 2)
+        for y in range(0, decoded_rows, step):
+            writer.write_rows(pixels[y:y + step])
+        del pixels
+        
+        # Copy the remaining scanlines through without unfiltering them
+        stream.seek(idat_start)
+        skip = decoded_rows * (row_bytes + 1)
+        scanline = row_bytes + 1
+        carry = b""
+        for data in iter_inflated(iter_idat(stream)):
+            if skip:
+                cut = min(skip, len(data))
+                skip -= cut
+                data = data[cut:]
+            data = carry + data
+            whole = len(data) - len(data) % scanline
+            if whole:
+                writer.write_filtered(data[:whole])
+            carry = data[whole:]
+        if carry:
+            raise ValueError("PNG image data is truncated")
+        writer.close()
+    
+    @staticmethod
+    def _write_bmp(reader, bits, message_size, budget, out, png):
+        """Stream BMP rows through the PNG writer, embedding as they pass"""
+        width, height = reader.width, reader.height
+        StripEncoder._check_fits(bits, width, height, message_size)
+        row_bytes = width * 3
+        
+        writer = PNGStripWriter(out, width, height, **png)
+        step = writer.strip_rows(budget // 2)
+        for y in range(0, height, step):
+            end = min(y + step, height)
+            pixels = reader.read_strip(y, end - y)
+            
+            first_bit = y * row_bytes
+            if first_bit < bits.size:
+                LSBEncoder.embed_bits(pixels.reshape(-1), bits[first_bit:end * row_bytes])
+            writer.write_rows(pixels)
+        writer.close()
+    
+    @staticmethod
+    def _encode_decoded(img, bits, message_size, budget, out, png):
+        """Decode the whole image, then write it out in strips"""
+        width, height = img.size
+        StripEncoder._check_fits(bits, width, height, message_size)
+        if width * height * 3 * 2 > budget // 2:
+            raise ValueError(
+                f"{img.format or 'This'} image must be decoded whole, which needs more "
+                f"than the {budget // (1024 * 1024)} MB memory budget; "
+                f"use an 8-bit RGB PNG or 24-bit BMP"
+            )
+        
+        pixels = np.array(load_rgb(img), dtype=np.uint8)
+        LSBEncoder.embed_bits(pixels.reshape(-1), bits)
+        
+        writer = PNGStripWriter(out, width, height, **png)
+        step = writer.strip_rows(budget // 2)
+        for y in range(0, height, step):
+            writer.write_rows(pixels[y:y + step])
+        writer.close()
@@ -0,0 +1,137 @@
+"""
+Stage Timing Module
+Lightweight per-stage timers for the stego pipeline
+
+Timers only record while a StageTimings collector is active in the current
+context (see record_stages); otherwise stage() returns a shared no-op
+context manager, so the instrumentation costs one context-variable lookup.
+"""
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class StageTimings:
+    """Collects (stage, seconds) events for one request or call"""
+    
+    def __init__(self):
+        self.events: List[Tuple[str, float]] = []
+    
+    def add(self, stage: str, seconds: float) -> None:
+        """Record one timed stage"""
+        self.events.append((stage, seconds))
+    
+    def extend(self, events: List[Tuple[str, float]]) -> None:
+        """Record events collected elsewhere (e.g. in a worker process)"""
+        self.events.extend(events)
+    
+    def totals(self) -> Dict[str, float]:
+        """Total seconds per stage, in first-seen order"""
+        totals: Dict[str, float] = {}
+        for stage, seconds in self.events:
+            totals[stage] = totals.get(stage, 0.0) + seconds
+        return totals
+    
+    def server_timing(self, **extra: float) -> str:
+        """
+        Format the totals as a Server-Timing header value
+        
+        Args:
+            extra: Additional stage totals in seconds (e.g. total=...)
+            
+        Returns:
+            Header value such as "kdf;dur=92.4, embed;dur=3.1"
+        """
+        totals = self.totals()
+        totals.update(extra)
+        return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in totals.items())
+
+
+_current: ContextVar[Optional[StageTimings]] = ContextVar("stego_stage_timings", default=None)
+
+
+class _Stage:
+    """Context manager that adds its duration to a collector"""
+    
+    __slots__ = ("name", "timings", "start")
+    
+    def __init__(self, name: str, timings: StageTimings):
+        self.name = name
+        self.timings = timings
+    
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.timings.add(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class _NoStage:
+    """Shared do-nothing context manager used while timing is off"""
+    
+    __slots__ = ()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NO_STAGE = _NoStage()
+
+
+def stage(name: str):
+    """
+    Time a block as the named stage
+    
+    Usage:
+        with stage("embed"):
+            ...
+    """
+    timings = _current.get()
+    if timings is None:
+        return _NO_STAGE
+    return _Stage(name, timings)
+
+
+def current_timings() -> Optional[StageTimings]:
+    """The collector active in this context, if any"""
+    return _current.get()
+
+
+def record_stages(timings: Optional[StageTimings]):
+    """
+    Make timings the active collector for this context
+    
+    Returns:
+        Token for reset_stages()
+    """
+    return _current.set(timings)
+
+
+def reset_stages(token) -> None:
+    """Restore the collector that was active before record_stages()"""
+    _current.reset(token)
+
+
+def timed_call(func: Callable, *args: Any) -> Tuple[Any, List[Tuple[str, float]], float]:
+    """
+    Call func(*args) with a fresh collector, for use on a worker
+    
+    Module-level so it can be sent to a process pool; the events come back
+    with the result instead of through shared state.
+    
+    Returns:
+        Tuple of (result, stage events, seconds spent in the call)
+    """
+    timings = StageTimings()
+    token = _current.set(timings)
+    start = time.perf_counter()
+    try:
+        result = func(*args)
+    finally:
+        _current.reset(token)
+    return result, timings.events, time.perf_counter() - start
@@ -0,0 +1,192 @@
+"""
+WAV Carrier Module
+PCM WAV files as carriers: their samples stand in for an image's channels
+
+Only the low byte of each sample is ever touched, so the samples are
+mapped rather than read: numpy.memmap over the data chunk of a file on
+disk (or a view of an in-memory buffer), strided to one byte per sample.
+The encoders and decoders index that view like a flat channel array, and
+the OS pages in only the ranges the payload uses.
+"""
+import io
+import struct
+from typing import BinaryIO, Callable, Union
+import numpy as np
+from PIL import Image
+
+
+# Anything WavCarrier accepts: a path, raw bytes or a file-like object
+AudioSource = Union[str, bytes, bytearray, memoryview, BinaryIO]
+
+# WAVE_FORMAT_PCM, and the tag of WAVE_FORMAT_EXTENSIBLE files (whose
+# sub-format GUID then starts with the real tag)
+PCM_FORMAT = 0x0001
+EXTENSIBLE_FORMAT = 0xFFFE
+
+# Sample sizes with a byte-aligned little-endian layout
+SAMPLE_BITS = (8, 16, 24, 32)
+
+
+def is_wav(data: bytes) -> bool:
+    """Whether data starts with a RIFF/WAVE header"""
+    return len(data) >= 12 and data[:4] == b"RIFF" and data[8:12] == b"WAVE"
+
+
+def sniff_wav(source) -> bool:
+    """
+    Whether a carrier source is a WAV file, reading only its first bytes
+    
+    Args:
+        source: Path, bytes, file-like object or PIL image (never WAV)
+        
+    Returns:
+        True for RIFF/WAVE data; streams are left where they were
+    """
+    if isinstance(source, Image.Image):
+        return False
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return is_wav(bytes(source[:12]))
+    if isinstance(source, str):
+        with open(source, 'rb') as f:
+            return is_wav(f.read(12))
+    start = source.tell()
+    try:
+        return is_wav(source.read(12))
+    finally:
+        source.seek(start)
+
+
+class WavCarrier:
+    """
+    Low bytes of the samples of a PCM WAV file, as a flat uint8 array
+    
+    PCM samples are little-endian, so the low byte of a sample of any width
+    is its first byte; 8-bit samples are unsigned and their only byte is
+    used. The order is the file's: frame by frame, channel by channel.
+    """
+    
+    def __init__(self, source: AudioSource, writable: bool = False):
+        """
+        Args:
+            source: Path, bytes, bytearray or file-like object. Paths and
+                real files are memory-mapped; writable needs a path, a
+                bytearray or a BytesIO
+            writable: Map the samples for writing (changes go to the source)
+            
+        Streams are left where they were.
+        """
+        if isinstance(source, str):
+            base = 0
+            with open(source, 'rb') as f:
+                self._parse(self._stream_reader(f, 0), f.seek(0, io.SEEK_END))
+        elif isinstance(source, (bytes, bytearray, memoryview)):
+            base = 0
+            view = memoryview(source)
+            self._parse(lambda pos, count: bytes(view[pos:pos + count]), len(view))
+        else:
+            base = source.tell()
+            total = source.seek(0, io.SEEK_END) - base
+            self._parse(self._stream_reader(source, base), total)
+        
+        length = self.samples * self.sample_width
+        self._raw = self._map(source, base + self.data_offset, length, writable)
+        if not isinstance(source, (str, bytes, bytearray, memoryview)):
+            source.seek(base)
+        self.writable = writable
+        self.low_bytes = self._raw.reshape(-1, self.sample_width)[:, 0]
+    
+    @staticmethod
+    def _stream_reader(stream: BinaryIO, base: int) -> Callable[[int, int], bytes]:
+        """Read count bytes at pos, counted from base"""
+        def read(pos: int, count: int) -> bytes:
+            stream.seek(base + pos)
+            return stream.read(count)
+        return read
+    
+    def _parse(self, read: Callable[[int, int], bytes], total: int) -> None:
+        """Find the fmt and data chunks and check the samples are PCM"""
+        if not is_wav(read(0, 12)):
+            raise ValueError("Not a WAV file")
+        pos = 12
+        fmt = None
+        while pos + 8 <= total:
+            ident, size = struct.unpack('<4sI', read(pos, 8))
+            if ident == b'fmt ':
+                fmt = read(pos + 8, size)
+            elif ident == b'data':
+                if fmt is None:
+                    raise ValueError("WAV data chunk comes before its format")
+                self._read_format(fmt)
+                self.data_offset = pos + 8
+                # A truncated file keeps the frames it still has
+                size = min(size, total - self.data_offset)
+                self.frames = size // (self.channels * self.sample_width)
+                self.samples = self.frames * self.channels
+                if self.samples == 0:
+                    raise ValueError("WAV file has no samples")
+                return
+            # Chunks are padded to an even length
+            pos += 8 + size + (size & 1)
+        raise ValueError("WAV file has no data chunk")
+    
+    def _read_format(self, fmt: bytes) -> None:
+        """Sample layout from the fmt chunk"""
+        if len(fmt) < 16:
+            raise ValueError("WAV format chunk is too short")
+        tag, self.channels, self.sample_rate, _, _, self.bits_per_sample = struct.unpack_from(
+            '<HHIIHH', fmt
+        )
+        if tag == EXTENSIBLE_FORMAT and len(fmt) >= 26:
+            tag = struct.unpack_from('<H', fmt, 24)[0]
+        if tag != PCM_FORMAT:
+            raise ValueError("Only PCM WAV files are supported")
+        if self.bits_per_sample not in SAMPLE_BITS or self.channels == 0:
+            raise ValueError(f"Unsupported WAV sample size: {self.bits_per_sample} bits")
+        self.sample_width = self.bits_per_sample // 8
+    
+    @staticmethod
+    def _map(source: AudioSource, offset: int, length: int, writable: bool) -> np.ndarray:
+        """uint8 array over length bytes of source from offset, without copying files"""
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            return np.frombuffer(source, dtype=np.uint8, count=length, offset=offset)
+        if isinstance(source, io.BytesIO):
+            return np.frombuffer(source.getbuffer(), dtype=np.uint8, count=length, offset=offset)
+        try:
+            if not isinstance(source, str):
+                source.fileno()
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            if writable:
+                raise ValueError("Writable WAV carriers need a path, bytearray or BytesIO")
+            source.seek(offset)
+            return np.frombuffer(source.read(length), dtype=np.uint8)
+        return np.memmap(
+            source, dtype=np.uint8, mode='r+' if writable else 'r', offset=offset, shape=(length,)
+        )
+    
+    @property
+    def duration(self) -> float:
+        """Length of the recording in seconds"""
+        return self.frames / self.sample_rate if self.sample_rate else 0.0
+    
+    def info(self) -> dict:
+        """Sample layout of the file"""
+        return {
+            "samples": self.samples,
+            "channels": self.channels,
+            "sample_rate": self.sample_rate,
+            "bits_per_sample": self.bits_per_sample,
+            "duration": round(self.duration, 3)
+        }
+    
+    def close(self) -> None:
+        """Write back changes to a mapped file and release the mapping"""
+        if isinstance(self._raw, np.memmap) and self.writable:
+            self._raw.flush()
+        self._raw = None
+        self.low_bytes = None
+    
+    def __enter__(self) -> "WavCarrier":
+        return self
+    
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -2,9 +2,36 @@
 Test Script for StegoCrypt Backend
 Tests all core steganography and encryption functions
 """
-from stego import AESCrypto, LSBEncoder, LSBDecoder, CapacityAnalyzer
+from stego import (
+    AESCrypto, LSBEncoder, StripEncoder, LSBDecoder, CapacityAnalyzer, PayloadContainer, PayloadCompressor,
+    prepare_payload, recover_message, encode_shards, decode_shards, OUTPUT_FORMATS, EMBED_MODES,
+    PasswordRequiredError, WavCarrier, detect, scan_directory
+)
+from stego.cache import DiskCache, PayloadCache
+from stego.jpeg_codec import JpegReader, forward, write_jpeg
+from stego.row_reader import open_row_reader
+from stego.scatter import FeistelPermutation, scatter_positions
+from stego import cli
+from jobs import ResultStore, encode_to_file
+from limits import BodyTooLargeError, UploadLimitMiddleware
+from workers import PoolSaturatedError
+from stego.timing import stage, timed_call
 from PIL import Image
+import numpy as np
+import asyncio
 import io
+import json
+import os
+import tempfile
+import time
+import wave
+import zipfile
+
+# Keep the API tests' job results out of a running server's store
+os.environ.setdefault("STEGO_JOB_STORE", os.path.join(tempfile.gettempdir(), "stegocrypt-test-jobs"))
+from fastapi.testclient import TestClient
+import config
+import main as api
 
 
 def create_test_image(width=800, height=600):
@@ -36,6 +63,15 @@ def test_capacity_analyzer():
     print(f"✓ Total pixels: {capacity['total_pixels']:,}")
     print(f"✓ Max bytes: {capacity['max_bytes']:,}")
     
+    # Repeated checks on the same upload bytes hit the cache
+    with open(image_path, 'rb') as f:
+        image_bytes = f.read()
+    hits_before = CapacityAnalyzer.cache_stats()["hits"]
+    assert CapacityAnalyzer.calculate_capacity(image_bytes) == capacity
+    assert CapacityAnalyzer.calculate_capacity(image_bytes) == capacity
+    assert CapacityAnalyzer.cache_stats()["hits"] == hits_before + 1
+    print(f"✓ Capacity cache: {CapacityAnalyzer.cache_stats()}")
+    
     return image_path
 
 
@@ -68,6 +104,45 @@ def test_encryption():
     except ValueError as e:
         print(f"✓ Wrong password correctly rejected: {str(e)[:50]}...")
     
+    # Binary AES-GCM mode
+    blob = AESCrypto.encrypt_bytes(message.encode('utf-8'), password)
+    assert AESCrypto.decrypt_bytes(blob, password).decode('utf-8') == message
+    print(f"✓ AES-GCM binary: {len(blob)} bytes (CBC/base64: {len(encrypted)} bytes)")
+    try:
+        AESCrypto.decrypt_bytes(blob, "WrongPassword")
+        print("✗ Wrong password should fail!")
+    except ValueError as e:
+        print(f"✓ GCM tag rejected wrong password: {str(e)[:50]}...")
+    
+    # Derived-key cache
+    AESCrypto.enable_key_cache(max_entries=4, ttl=60)
+    try:
+        assert AESCrypto.decrypt(encrypted, password) == message
+        assert AESCrypto.decrypt(encrypted, password) == message
+        stats = AESCrypto.key_cache_stats()
+        assert stats["hits"] == 1 and stats["misses"] == 1, stats
+        print(f"✓ Key cache hit on repeated decrypt: {stats}")
+    finally:
+        AESCrypto.disable_key_cache()
+    
+    # Expired keys are wiped without another lookup of the same key
+    AESCrypto.enable_key_cache(max_entries=4, ttl=0.05)
+    try:
+        AESCrypto.decrypt(encrypted, password)
+        (_, key), = AESCrypto._key_cache._data.values()
+        assert any(key)
+        time.sleep(0.1)
+        assert AESCrypto.key_cache_stats()["entries"] == 0
+        assert not any(key), "Expired key left in memory"
+        AESCrypto.decrypt(encrypted, password)
+        (_, key), = AESCrypto._key_cache._data.values()
+        time.sleep(0.1)
+        AESCrypto.encrypt_bytes(b"other", "OtherPassword")
+        assert not any(key), "Expired key left in memory"
+        print("✓ Expired derived keys are zeroed on the next cache access")
+    finally:
+        AESCrypto.disable_key_cache()
+    
     return encrypted
 
 
@@ -134,6 +209,859 @@ def test_full_pipeline(image_path):
     print("✓ Full pipeline successful! 🎉")
 
 
+def test_container_format(image_path):
+    """Test length-prefixed container and legacy fallback"""
+    print("\n=== Testing Container Format ===")
+    
+    # Binary payload containing the legacy delimiter bytes
+    payload = b"before\xff\xfeafter\x00\x01"
+    stego = LSBEncoder.encode(image_path, payload, flags=PayloadContainer.FLAG_ENCRYPTED)
+    header, data = LSBDecoder.extract(io.BytesIO(stego))
+    assert data == payload, "Binary payload doesn't match!"
+    assert header["version"] == PayloadContainer.VERSION
+    assert header["flags"] == PayloadContainer.FLAG_ENCRYPTED
+    print(f"✓ Binary payload with delimiter bytes recovered ({header['length']} bytes)")
+    
+    # Image written in the legacy delimiter format
+    legacy_message = "Legacy delimiter message"
+    pixels = np.array(Image.open(image_path).convert('RGB'))
+    legacy_payload = legacy_message.encode('utf-8') + LSBEncoder.DELIMITER_BYTES
+    LSBEncoder.embed_bits(pixels.reshape(-1), LSBEncoder.payload_to_bits(legacy_payload))
+    legacy_bytes = io.BytesIO()
+    Image.fromarray(pixels).save(legacy_bytes, format='PNG')
+    legacy_bytes.seek(0)
+    decoded = LSBDecoder.decode(legacy_bytes)
+    assert decoded == legacy_message, "Legacy fallback failed!"
+    print("✓ Legacy delimiter image decoded")
+
+
+def test_compression(image_path):
+    """Test compression stage ahead of encryption and embedding"""
+    print("\n=== Testing Payload Compression ===")
+    
+    message = '{"event": "login", "user": "alice", "ok": true}\n' * 200
+    password = "CompressMe789"
+    
+    payload, flags = prepare_payload(message, password)
+    codec = PayloadContainer.get_codec(flags)
+    assert codec != PayloadCompressor.CODEC_NONE, "JSON payload should compress"
+    print(f"✓ {len(message)} bytes -> {len(payload)} bytes "
+          f"({PayloadCompressor.CODEC_NAMES[codec]} + AES-GCM)")
+    
+    stego = LSBEncoder.encode(image_path, payload, flags)
+    header, data = LSBDecoder.extract(stego)
+    decoded, decrypted = recover_message(header, data, password)
+    assert decoded == message and decrypted, "Compressed round trip failed!"
+    print("✓ Compressed + encrypted message recovered")
+    
+    # Incompressible input is stored as-is
+    codec, stored = PayloadCompressor.compress(b"xy")
+    assert codec == PayloadCompressor.CODEC_NONE and stored == b"xy"
+    print("✓ Short payload left uncompressed")
+    
+    effective = CapacityAnalyzer.effective_capacity(image_path, message, encrypted=True)
+    print(f"✓ Effective capacity for sample: {effective['effective_max_kb']} KB "
+          f"(ratio {effective['compression_ratio']})")
+
+
+def test_output_formats(image_path):
+    """Test that every output format keeps the hidden bits intact"""
+    print("\n=== Testing Output Formats ===")
+    
+    message = "Same message, different codec"
+    for name, spec in OUTPUT_FORMATS.items():
+        if spec["engine"] == "wav":
+            # Needs a WAV carrier (see test_wav_carrier)
+            continue
+        stego = LSBEncoder.encode(image_path, message, output_format=name)
+        assert Image.open(io.BytesIO(stego)).format == spec["format"], f"{name} wrote wrong format"
+        assert LSBDecoder.decode(stego) == message, f"{name} round trip failed!"
+        print(f"✓ {name}: {len(stego)} bytes")
+    
+    try:
+        LSBEncoder.encode(image_path, message, output_format="gif")
+        assert False, "Unknown output format should be rejected"
+    except ValueError:
+        print("✓ Unknown output format rejected")
+
+
+def test_strip_encoder(image_path):
+    """Test bounded-memory strip encoding against the whole-image encoder"""
+    print("\n=== Testing Strip Encoder ===")
+    
+    message = "Strip by strip. " * 2000
+    budget = 2 * 1024 * 1024
+    expected = np.array(Image.open(io.BytesIO(LSBEncoder.encode(image_path, message))))
+    
+    # PNG cover: payload rows re-encoded, the rest copied through
+    stego = StripEncoder.encode(image_path, message, memory_budget=budget)
+    assert np.array_equal(np.array(Image.open(io.BytesIO(stego))), expected), "PNG splice differs!"
+    assert LSBDecoder.decode(stego) == message
+    print(f"✓ PNG cover spliced ({len(stego)} bytes), pixels match the whole-image encoder")
+    
+    # BMP cover: rows read a strip at a time
+    bmp = io.BytesIO()
+    Image.open(image_path).save(bmp, format='BMP')
+    stego = StripEncoder.encode(bmp.getvalue(), message, memory_budget=budget)
+    assert np.array_equal(np.array(Image.open(io.BytesIO(stego))), expected), "BMP strips differ!"
+    print("✓ BMP cover encoded strip by strip")
+    
+    # Formats that must be decoded whole are held to the budget
+    jpeg = io.BytesIO()
+    Image.open(image_path).save(jpeg, format='JPEG')
+    try:
+        StripEncoder.encode(jpeg.getvalue(), message, memory_budget=budget)
+        assert False, "Over-budget decode should be refused"
+    except ValueError as e:
+        print(f"✓ Over-budget JPEG refused: {str(e)[:60]}...")
+    
+    # /encode strip-encodes only covers that can be read a strip at a time;
+    # large JPEG, RGBA and palette covers are decoded whole instead
+    rgba = io.BytesIO()
+    Image.open(image_path).convert('RGBA').save(rgba, format='PNG')
+    palette = io.BytesIO()
+    Image.open(image_path).convert('P').save(palette, format='PNG')
+    assert StripEncoder.streamable(image_path) and StripEncoder.streamable(bmp.getvalue())
+    for cover in (jpeg, rgba, palette):
+        assert not StripEncoder.streamable(cover.getvalue())
+    limits = config.STRIP_ENCODE_PIXELS, config.ENCODE_MEMORY_BUDGET
+    config.STRIP_ENCODE_PIXELS, config.ENCODE_MEMORY_BUDGET = 1, budget
+    try:
+        with TestClient(api.app) as client:
+            for name, cover, media_type in (("cover.jpg", jpeg, "image/jpeg"),
+                                            ("cover.png", rgba, "image/png"),
+                                            ("cover.png", palette, "image/png")):
+                response = client.post("/encode", files={"image": (name, cover.getvalue(), media_type)},
+                                       data={"message": message})
+                assert response.status_code == 200, response.text
+                assert LSBDecoder.decode(response.content) == message
+    finally:
+        config.STRIP_ENCODE_PIXELS, config.ENCODE_MEMORY_BUDGET = limits
+    print("✓ Large covers that cannot be streamed are encoded whole by /encode")
+
+
+def test_streaming_decoder():
+    """Test that extraction only decodes the rows the payload occupies"""
+    print("\n=== Testing Row-Streaming Decoder ===")
+    
+    rng = np.random.default_rng(7)
+    cover = io.BytesIO()
+    Image.fromarray(rng.integers(0, 256, size=(3000, 400, 3), dtype=np.uint8)).save(
+        cover, format='PNG'
+    )
+    message = "Only the top rows matter. " * 20
+    stego = LSBEncoder.encode(cover.getvalue(), message)
+    
+    reader = open_row_reader(io.BytesIO(stego))
+    row_channels = reader.width * 3
+    _, data = LSBDecoder.extract_channels(
+        lambda bits: reader.read(-(-bits // row_channels)).reshape(-1),
+        reader.height * row_channels
+    )
+    reader.close()
+    assert data.decode('utf-8') == message, "Streamed payload doesn't match!"
+    assert reader.rows < reader.height // 10, f"Decoded {reader.rows} rows for a short message"
+    print(f"✓ Message read after decoding {reader.rows} of {reader.height} rows")
+    
+    # BMP rows are read straight from the file
+    bmp = io.BytesIO()
+    Image.open(io.BytesIO(stego)).save(bmp, format='BMP')
+    assert LSBDecoder.decode(bmp.getvalue()) == message, "BMP streaming failed!"
+    print("✓ BMP stego image decoded row by row")
+
+
+def test_sharding():
+    """Test splitting one message across several carrier images"""
+    print("\n=== Testing Multi-Image Sharding ===")
+    
+    covers = []
+    for i, size in enumerate([(120, 90), (200, 150), (80, 60)]):
+        rng = np.random.default_rng(i)
+        buf = io.BytesIO()
+        Image.fromarray(rng.integers(0, 256, size=(size[1], size[0], 3), dtype=np.uint8)).save(
+            buf, format='PNG'
+        )
+        covers.append(buf.getvalue())
+    
+    message = "".join(f"line {i}: shard me across carriers\n" for i in range(400))
+    password = "ShardPass321"
+    payload, flags = prepare_payload(message, password, compress=False)
+    
+    plan = CapacityAnalyzer.plan_shards(covers, len(payload))
+    single = CapacityAnalyzer.calculate_capacity(covers[1])["max_bytes"]
+    assert plan["fits"] and len(payload) > single, "Payload should need several carriers"
+    assert sum(entry["bytes"] for entry in plan["shards"]) == len(payload)
+    print(f"✓ {len(payload)} bytes planned over {plan['shard_count']} images "
+          f"(largest single image holds {single})")
+    
+    encoded = encode_shards(covers, payload, flags)
+    assert len(encoded) == plan["shard_count"]
+    
+    # Shards can be decoded in any order
+    stego_images = [stego for _, stego in reversed(encoded)]
+    header, data = decode_shards(stego_images)
+    decoded, decrypted = recover_message(header, data, password)
+    assert decoded == message and decrypted, "Sharded round trip failed!"
+    print("✓ Message reassembled from shards in reverse order")
+    
+    try:
+        decode_shards(stego_images[:-1])
+        assert False, "Missing shard should be detected"
+    except ValueError as e:
+        print(f"✓ Missing shard detected: {e}")
+    
+    try:
+        recover_message(*LSBDecoder.extract(stego_images[0]), password)
+        assert False, "Single shard should not decode on its own"
+    except ValueError:
+        print("✓ Single shard refused by the single-image decoder")
+    
+    assert not CapacityAnalyzer.plan_shards(covers, 10 ** 6)["fits"]
+    print("✓ Oversized payload rejected by the planner")
+
+
+def test_embed_modes():
+    """Test multi-bit and alpha-channel embedding modes"""
+    print("\n=== Testing Embedding Modes ===")
+    
+    rng = np.random.default_rng(7)
+    covers = {}
+    for kind, channels in (("RGB", 3), ("RGBA", 4)):
+        buf = io.BytesIO()
+        Image.fromarray(rng.integers(0, 256, size=(90, 120, channels), dtype=np.uint8)).save(
+            buf, format='PNG'
+        )
+        covers[kind] = buf.getvalue()
+    
+    rgba_capacity = CapacityAnalyzer.calculate_capacity(covers["RGBA"], "rgba4")
+    assert set(rgba_capacity["modes"]) == set(EMBED_MODES)
+    assert set(CapacityAnalyzer.calculate_capacity(covers["RGB"])["modes"]) == {
+        name for name, spec in EMBED_MODES.items() if not spec["alpha"]
+    }, "Alpha modes need an alpha channel"
+    modes = rgba_capacity["modes"]
+    assert modes["rgb4"] > 3 * modes["rgb1"] and modes["rgba4"] > modes["rgb4"]
+    print(f"✓ Capacity per mode: {modes}")
+    
+    for name, spec in EMBED_MODES.items():
+        cover = covers["RGBA" if spec["alpha"] else "RGB"]
+        message = rng.integers(0, 256, size=modes[name], dtype=np.uint8).tobytes()
+        stego = LSBEncoder.encode(cover, message, mode=name)
+        header, data = LSBDecoder.extract(stego)
+        assert data == message, f"Mode {name} round trip failed!"
+        assert PayloadContainer.get_mode(header["flags"]) == (spec["bits"], spec["alpha"])
+        try:
+            LSBEncoder.encode(cover, message + b"!", mode=name)
+            assert False, f"Mode {name} should reject a payload over capacity"
+        except ValueError:
+            pass
+    print("✓ Every mode round trips a full-capacity payload, detected from the header")
+    
+    # Alpha modes keep the image's alpha plane (with payload in its low bits)
+    stego = LSBEncoder.encode(covers["RGBA"], "alpha", mode="rgba1")
+    assert Image.open(io.BytesIO(stego)).mode == 'RGBA'
+    try:
+        LSBEncoder.encode(covers["RGB"], "no alpha", mode="rgba1")
+        assert False, "Alpha mode needs an alpha channel"
+    except ValueError:
+        print("✓ Alpha mode refused for an RGB cover")
+
+
+def test_scatter():
+    """Test password-keyed scatter embedding"""
+    print("\n=== Testing Scatter Embedding ===")
+    
+    # The permutation maps range(size) onto itself, for sizes around a square
+    for size in (1, 2, 10, 99, 100, 101, 4097):
+        mapped = FeistelPermutation(b"key", size).map(np.arange(size, dtype=np.uint32))
+        assert sorted(mapped.tolist()) == list(range(size)), f"Not a permutation of {size}"
+    first = np.concatenate([p for _, p in scatter_positions(b"key", 1_000_000, 1000)])
+    assert len(set(first.tolist())) == 1000 and first.max() > 900_000
+    print("✓ Feistel permutation covers its range; positions spread over the image")
+    
+    rng = np.random.default_rng(11)
+    buf = io.BytesIO()
+    Image.fromarray(rng.integers(0, 256, size=(120, 160, 3), dtype=np.uint8)).save(buf, format='PNG')
+    cover = buf.getvalue()
+    
+    for mode in ("rgb1", "rgb3"):
+        capacity = CapacityAnalyzer.calculate_capacity(cover, mode, scatter=True)["max_bytes"]
+        message = rng.integers(0, 256, size=capacity, dtype=np.uint8).tobytes()
+        stego = LSBEncoder.encode(cover, message, mode=mode, scatter_password="hunter2")
+        header, data = LSBDecoder.extract(stego, "hunter2")
+        assert data == message, f"Scattered {mode} round trip failed!"
+        assert header["flags"] & PayloadContainer.FLAG_SCATTER
+    print("✓ Scattered payloads round trip at full capacity")
+    
+    message = b"scattered secret" * 10
+    stego = LSBEncoder.encode(cover, message, mode="rgb2", scatter_password="hunter2")
+    try:
+        LSBDecoder.extract(stego)
+        assert False, "Scattered payload should need a password"
+    except PasswordRequiredError:
+        print("✓ Missing password rejected")
+    _, wrong = LSBDecoder.extract(stego, "wrong password")
+    assert wrong != message, "Wrong password should not find the payload"
+    print("✓ Wrong password reads unrelated bits")
+    
+    # Sequential and scattered embeds of one payload touch different channels
+    sequential = np.asarray(Image.open(io.BytesIO(LSBEncoder.encode(cover, message, mode="rgb2"))))
+    scattered = np.asarray(Image.open(io.BytesIO(stego)))
+    original = np.asarray(Image.open(io.BytesIO(cover)))
+    rows = lambda img: set(np.nonzero((img != original).any(axis=(1, 2)))[0].tolist())
+    assert max(rows(sequential)) < 10 and max(rows(scattered)) > 100
+    print("✓ Scattered changes span the image, sequential ones stay at the top")
+    
+    # Covers too small for the header and seed refuse even an empty message
+    for size, mode in (((7, 5), "rgb1"), ((7, 5), "rgb2"), ((7, 5), "rgba1"), ((1, 40), "rgba1")):
+        tiny = Image.new('RGBA' if mode.startswith("rgba") else 'RGB', size)
+        try:
+            LSBEncoder.encode(tiny, b"", mode=mode, scatter_password="hunter2")
+            assert False, f"{size} {mode} cover should be too small to scatter into"
+        except ValueError as e:
+            assert "Message too large" in str(e), str(e)
+    print("✓ Covers without room for the scatter seed rejected")
+
+
+def test_dct_engine():
+    """Test JPEG output through the DCT coefficient engine"""
+    print("\n=== Testing DCT (JPEG) Engine ===")
+    
+    rng = np.random.default_rng(5)
+    pixels = rng.integers(0, 256, size=(120, 160, 3), dtype=np.uint8)
+    buf = io.BytesIO()
+    Image.fromarray(pixels).save(buf, format='PNG')
+    cover = buf.getvalue()
+    
+    # Our coefficients survive a write and read, and Pillow decodes the file
+    blocks = forward(pixels, 90)
+    jpeg = write_jpeg(blocks, 160, 120, 90)
+    reader = JpegReader(jpeg)
+    assert reader.block_count() == len(blocks)
+    assert np.array_equal(np.array([b for _, b in reader.blocks()]), blocks)
+    buf = io.BytesIO()
+    Image.fromarray(pixels).save(buf, format='JPEG', quality=90, subsampling=2)
+    error = lambda data: np.abs(np.asarray(Image.open(io.BytesIO(data)), dtype=np.int16) - pixels).mean()
+    assert error(jpeg) <= error(buf.getvalue()) + 1, "Coded image should match Pillow's quality"
+    print(f"✓ Baseline JPEG written and read back exactly ({len(jpeg)} bytes)")
+    
+    capacity = CapacityAnalyzer.output_capacity(cover, "jpeg")
+    assert capacity["mode"] == "dct" and capacity["max_bytes"] > 0
+    message = rng.integers(0, 256, size=capacity["max_bytes"], dtype=np.uint8).tobytes()
+    stego = LSBEncoder.encode(cover, message, output_format="jpeg")
+    assert Image.open(io.BytesIO(stego)).format == "JPEG"
+    header, data = LSBDecoder.extract(stego)
+    assert data == message and header["flags"] & PayloadContainer.FLAG_DCT
+    print(f"✓ Full-capacity payload round trips: {capacity['max_bytes']} bytes")
+    
+    payload, flags = prepare_payload("Hidden in the coefficients", "JpegPass1")
+    stego = LSBEncoder.encode(cover, payload, flags, "jpeg")
+    result = detect(stego)
+    assert result["found"] and result["mode"] == "dct" and result["encrypted"]
+    header, data = LSBDecoder.extract(stego)
+    assert recover_message(header, data, "JpegPass1") == ("Hidden in the coefficients", True)
+    print("✓ Encrypted message detected and recovered from the JPEG")
+    
+    for options in ({"mode": "rgb2"}, {"scatter_password": "pw"}):
+        try:
+            LSBEncoder.encode(cover, b"x", output_format="jpeg", **options)
+            assert False, f"jpeg output should refuse {options}"
+        except ValueError:
+            pass
+    try:
+        LSBEncoder.encode(cover, message + b"x", output_format="jpeg")
+        assert False, "Oversized payload should be rejected"
+    except ValueError as e:
+        assert "Message too large" in str(e)
+    # Too few carriers for the header: even an empty message is too large
+    flat = Image.new('RGB', (17, 9), (120, 80, 40))
+    assert CapacityAnalyzer.output_capacity(flat, "jpeg")["max_bytes"] == 0
+    try:
+        LSBEncoder.encode(flat, b"", output_format="jpeg")
+        assert False, "Cover without room for the header should be rejected"
+    except ValueError as e:
+        assert "Message too large" in str(e), str(e)
+    print("✓ Other modes, scatter and oversized payloads rejected")
+    
+    # Plain and progressive JPEGs hold no payload
+    for progressive in (False, True):
+        buf = io.BytesIO()
+        Image.fromarray(pixels).save(buf, format='JPEG', progressive=progressive)
+        assert not detect(buf.getvalue())["found"]
+        try:
+            LSBDecoder.extract(buf.getvalue())
+            assert False, "Plain JPEG should hold no message"
+        except ValueError as e:
+            assert "No hidden message" in str(e)
+    print("✓ Pillow JPEGs (baseline and progressive) report no message")
+
+
+def make_wav(sample_width=2, channels=2, frames=8000, seed=7):
+    """PCM WAV bytes of random samples"""
+    rng = np.random.default_rng(seed)
+    buf = io.BytesIO()
+    with wave.open(buf, 'wb') as w:
+        w.setnchannels(channels)
+        w.setsampwidth(sample_width)
+        w.setframerate(8000)
+        w.writeframes(rng.integers(0, 256, size=frames * channels * sample_width, dtype=np.uint8).tobytes())
+    return buf.getvalue()
+
+
+def test_wav_carrier():
+    """Test hiding payloads in the samples of PCM WAV files"""
+    print("\n=== Testing WAV Carrier ===")
+    
+    for width in (1, 2, 3):
+        cover = make_wav(width)
+        with WavCarrier(cover) as carrier:
+            assert carrier.samples == 16000 and carrier.bits_per_sample == width * 8
+            data_offset = carrier.data_offset
+        for mode, scatter in (("rgb1", None), ("rgb2", None), ("rgb4", "WavPass1")):
+            capacity = CapacityAnalyzer.calculate_capacity(cover, mode, bool(scatter))
+            assert capacity["carrier"] == "wav"
+            message = os.urandom(capacity["max_bytes"])
+            stego = LSBEncoder.encode(cover, message, mode=mode, scatter_password=scatter)
+            header, data = LSBDecoder.extract(stego, scatter)
+            assert data == message, f"{width * 8}-bit {mode} round trip failed!"
+            
+            # Only the low byte of each sample may change
+            before = np.frombuffer(cover, dtype=np.uint8)
+            after = np.frombuffer(stego, dtype=np.uint8)
+            changed = np.flatnonzero(before != after)
+            assert len(stego) == len(cover) and changed.min() >= data_offset
+            assert ((changed - data_offset) % width == 0).all(), "High sample bytes changed"
+        print(f"✓ {width * 8}-bit samples: full-capacity rgb1, rgb2 and scattered rgb4 round trips")
+    
+    # Files are memory-mapped: encoded into a copy, read back from the path
+    cover = make_wav()
+    payload, flags = prepare_payload("Hidden in the samples", "WavPass1")
+    with tempfile.TemporaryDirectory() as root:
+        source = os.path.join(root, "cover.wav")
+        output = os.path.join(root, "stego.wav")
+        with open(source, 'wb') as f:
+            f.write(cover)
+        assert LSBEncoder.encode_wav(source, payload, flags, output_path=output) is None
+        with open(source, 'rb') as f:
+            assert f.read() == cover, "Source file should be left untouched"
+        header, data = LSBDecoder.extract(output)
+        assert recover_message(header, data, "WavPass1") == ("Hidden in the samples", True)
+        result = detect(output)
+        assert result["found"] and result["encrypted"] and result["carrier"] == "wav"
+        with wave.open(output, 'rb') as w:
+            assert w.getnframes() == 8000, "Output should stay a valid WAV file"
+    print("✓ Encrypted message written through a memory map and detected")
+    
+    assert not detect(cover)["found"]
+    try:
+        LSBDecoder.extract(cover)
+        assert False, "Plain WAV should hold no message"
+    except ValueError as e:
+        assert "No hidden message" in str(e)
+    for options in ({"mode": "rgba1"}, {"output_format": "png"}):
+        try:
+            LSBEncoder.encode(cover, b"x", **options)
+            assert False, f"WAV carrier should refuse {options}"
+        except ValueError:
+            pass
+    try:
+        LSBEncoder.encode(Image.new('RGB', (8, 8)), b"x", output_format="wav")
+        assert False, "wav output should need a WAV carrier"
+    except ValueError as e:
+        assert "needs a WAV carrier" in str(e)
+    print("✓ Plain audio reports no message; alpha modes and image formats rejected")
+
+
+def test_detect():
+    """Test header-only payload detection and directory scanning"""
+    print("\n=== Testing Payload Detection ===")
+    
+    rng = np.random.default_rng(5)
+    pixels = rng.integers(0, 256, size=(200, 300, 3), dtype=np.uint8)
+    buf = io.BytesIO()
+    Image.fromarray(pixels).save(buf, format='PNG')
+    cover = buf.getvalue()
+    
+    result = detect(cover)
+    assert not result["found"], "Random cover should not be flagged"
+    print(f"✓ Clean image: {result['reason']}")
+    
+    payload, flags = prepare_payload("Detect me " * 20, "secret")
+    stego = LSBEncoder.encode(cover, payload, flags, "bmp", "rgb3")
+    result = detect(stego)
+    assert result["found"] and result["format"] == "container"
+    assert result["length"] == len(payload) and result["mode"] == "rgb3" and result["encrypted"]
+    print(f"✓ Carrier found: {result['length']} bytes, {result['mode']}, encrypted")
+    
+    legacy = pixels.copy()
+    LSBEncoder.embed_bits(
+        legacy.reshape(-1),
+        LSBEncoder.payload_to_bits(b"Old message" + LSBEncoder.DELIMITER_BYTES)
+    )
+    result = detect(Image.fromarray(legacy))
+    assert result["found"] and result["format"] == "legacy" and result["length"] == 11
+    print("✓ Legacy delimiter message found")
+    
+    jpeg = io.BytesIO()
+    Image.fromarray(pixels).save(jpeg, format='JPEG')
+    assert not detect(jpeg.getvalue())["found"]
+    print("✓ JPEG skipped without decoding")
+    
+    with tempfile.TemporaryDirectory() as root:
+        os.makedirs(os.path.join(root, "nested"))
+        for name, data in (("clean.png", cover), ("nested/stego.bmp", stego),
+                           ("notes.txt", b"not an image"), ("broken.png", b"not a png")):
+            with open(os.path.join(root, name), 'wb') as f:
+                f.write(data)
+        results = list(scan_directory(root))
+        assert [os.path.basename(r["path"]) for r in results] == ["broken.png", "clean.png", "stego.bmp"]
+        assert "error" in results[0]
+        carriers = list(scan_directory(root, carriers_only=True))
+        assert [os.path.basename(r["path"]) for r in carriers] == ["stego.bmp"]
+        assert not list(scan_directory(root, recursive=False, carriers_only=True))
+    print("✓ Directory scan finds carriers and skips other files")
+
+
+def test_cli():
+    """Test the bulk command-line tool"""
+    print("\n=== Testing Command-Line Tool ===")
+    
+    rng = np.random.default_rng(3)
+    with tempfile.TemporaryDirectory() as root:
+        covers = os.path.join(root, "covers")
+        os.makedirs(os.path.join(covers, "nested"))
+        for i, name in enumerate(("a.png", "b.bmp", "nested/c.png")):
+            Image.fromarray(rng.integers(0, 256, size=(60 + i, 80, 3), dtype=np.uint8)).save(
+                os.path.join(covers, name)
+            )
+        out_dir = os.path.join(root, "stego")
+        log = os.path.join(root, "encode.jsonl")
+        
+        read_log = lambda path: [json.loads(line) for line in open(path)]
+        status = cli.main(["encode", covers, "-m", "Bulk secret", "--password", "pw",
+                           "--out-dir", out_dir, "-o", log, "-w", "2"])
+        records = read_log(log)
+        assert status == 0 and len(records) == 3 and all(r["ok"] for r in records)
+        assert os.path.exists(os.path.join(out_dir, "nested", "c.png"))
+        print("✓ Encoded a directory tree on a process pool")
+        
+        # Resume after an interrupted run: the last line was cut short
+        with open(log, 'w') as f:
+            f.write(json.dumps(records[0]) + "\n" + json.dumps(records[1])[:20])
+        cli.main(["encode", covers, "-m", "Bulk secret", "--password", "pw",
+                  "--out-dir", out_dir, "-o", log, "--resume", "-w", "0"])
+        lines = open(log).read().splitlines()
+        assert len(lines) == 4 and sorted(json.loads(l)["path"] for l in lines[2:]) == sorted(
+            r["path"] for r in records[1:]
+        ), "Resume should redo only the unfinished files"
+        print("✓ Resumed run skipped finished files")
+        
+        log = os.path.join(root, "decode.jsonl")
+        status = cli.main(["decode", out_dir, os.path.join(covers, "a.png"),
+                           "--password", "pw", "-o", log, "-w", "0"])
+        records = {os.path.relpath(r["path"], root): r for r in read_log(log)}
+        assert status == 1, "A cover without a message should fail"
+        assert not records[os.path.join("covers", "a.png")]["ok"]
+        assert all(r["message"] == "Bulk secret" for path, r in records.items() if path.startswith("stego"))
+        print("✓ Decoded the stego images; the plain cover was reported")
+        
+        summary = cli.run("scan", {}, cli.iter_inputs([root]), io.StringIO(), 0,
+                          keep=lambda record: record["found"])
+        assert summary["ok"] == 6 and summary["megapixels"] > 0
+        print(f"✓ Scan summary: {summary['files_per_second']} files/s")
+
+
+def test_job_store(image_path):
+    """Test size and age eviction of the job result store, and job result files"""
+    print("\n=== Testing Job Result Store ===")
+    
+    with tempfile.TemporaryDirectory() as root:
+        store = ResultStore(root, max_bytes=250, ttl=60)
+        for name in ("first", "second", "third"):
+            store.put(name, b"x" * 100, {"kind": "decode", "media_type": "application/json"})
+        assert store.get("first") is None, "Oldest result should be evicted past max_bytes"
+        path, meta = store.get("third")
+        assert open(path, 'rb').read() == b"x" * 100 and meta["kind"] == "decode"
+        assert not os.path.exists(store.result_path("first"))
+        print(f"✓ Size limit kept {store.stats()['results']} of 3 results")
+        
+        # A new process picks up what is on disk; leftover uploads, partial
+        # results and results without metadata are dropped
+        leftovers = [store.input_path("orphan"), store.result_path("orphan"),
+                     store.partial_path(store.result_path("dead"))]
+        for path in leftovers:
+            open(path, 'wb').close()
+        reloaded = ResultStore(root, max_bytes=250, ttl=60)
+        assert reloaded.get("second") is not None and reloaded.get("third") is not None
+        assert not any(os.path.exists(path) for path in leftovers)
+        print("✓ Results survive a restart; orphaned files swept")
+        
+        expiring = ResultStore(root, max_bytes=250, ttl=0.05)
+        time.sleep(0.1)
+        assert expiring.get("third") is None and not os.listdir(root)
+        print("✓ Expired results removed")
+    
+    # Job encodes: large non-streamable covers are decoded whole, and a
+    # failed encode leaves no result file
+    with tempfile.TemporaryDirectory() as root:
+        cover = os.path.join(root, "cover.jpg")
+        Image.open(image_path).save(cover, format='JPEG')
+        output = os.path.join(root, "job.result")
+        size = encode_to_file(cover, output, b"job payload", 0, "png", "rgb1", None, 1, 1024 * 1024)
+        assert size == os.path.getsize(output) and LSBDecoder.extract(output)[1] == b"job payload"
+        os.remove(output)
+        try:
+            encode_to_file(cover, output, b"x" * 10 ** 6, 0, "png", "rgb1", None, 1, 1024 * 1024)
+            assert False, "Oversized job payload should fail"
+        except ValueError:
+            pass
+        assert os.listdir(root) == ["cover.jpg"], os.listdir(root)
+    print("✓ Job encodes JPEG covers whole; failures leave no partial result")
+
+
+def test_payload_cache():
+    """Test the byte-bounded decode cache and its disk tier"""
+    print("\n=== Testing Decode Payload Cache ===")
+    
+    header = {"version": 2, "flags": 1, "length": 1000}
+    entry_size = 1000 + PayloadCache.ENTRY_OVERHEAD
+    cache = PayloadCache(max_bytes=2 * entry_size)
+    for key in ("aa", "bb", "cc"):
+        cache.put(key, header, key.encode() * 500)
+    assert cache.get("aa") is None, "Oldest payload should be evicted past max_bytes"
+    assert cache.get("cc") == (header, b"cc" * 500)
+    stats = cache.stats()["memory"]
+    assert stats["bytes"] == 2 * entry_size and stats["entries"] == 2, stats
+    print(f"✓ Memory tier bounded by bytes: {stats['bytes']} of {stats['max_bytes']}")
+    
+    with tempfile.TemporaryDirectory() as root:
+        cache = PayloadCache(max_bytes=entry_size, directory=root, disk_max_bytes=2500)
+        cache.put("aa", header, b"a" * 1000)
+        cache.put("bb", header, b"b" * 1000)
+        assert cache.get("aa") == (header, b"a" * 1000), "Disk tier should serve evicted payloads"
+        print("✓ Payload evicted from memory served from disk")
+        
+        # Another process sharing the directory sees the same payloads
+        other = PayloadCache(max_bytes=entry_size, directory=root, disk_max_bytes=2500)
+        assert other.get("bb") == (header, b"b" * 1000)
+        other.put("cc", header, b"c" * 1000)
+        assert len(os.listdir(root)) == 2, "Disk tier should stay within disk_max_bytes"
+        assert other.get("cc") is not None
+        print(f"✓ Disk tier shared and bounded: {other.stats()['disk']}")
+    
+    # Rewriting a key replaces its file, so the tracked size stays put
+    with tempfile.TemporaryDirectory() as root:
+        disk = DiskCache(root, max_bytes=1000)
+        for _ in range(5):
+            disk.put("aa", b"x" * 150)
+        assert disk.stats()["bytes"] == 150, disk.stats()
+        disk.put("aa", b"x" * 100)
+        assert disk.stats()["bytes"] == 100 == os.path.getsize(os.path.join(root, "aa.bin"))
+        print("✓ Disk tier size unchanged by overwriting a key")
+
+
+def test_upload_limits():
+    """Test that request bodies are cut off at the size limit"""
+    print("\n=== Testing Upload Limits ===")
+    
+    async def consume(scope, receive, send):
+        # Read the whole body, as the multipart parser would
+        while (await receive()).get("more_body"):
+            pass
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+    
+    limited = UploadLimitMiddleware(consume, limits={}, default=1000)
+    
+    def request(chunks, headers=()):
+        messages = [{"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1}
+                    for i, chunk in enumerate(chunks)]
+        sent = []
+        
+        async def receive():
+            return messages.pop(0)
+        
+        async def send(message):
+            sent.append(message)
+        
+        scope = {"type": "http", "method": "POST", "path": "/decode", "headers": list(headers)}
+        asyncio.run(limited(scope, receive, send))
+        return sent[0]["status"], len(messages)
+    
+    assert request([b"x" * 400, b"x" * 400]) == (200, 0)
+    print("✓ Bodies within the limit pass")
+    
+    status, unread = request([b"x" * 400] * 3, [(b"content-length", b"1200")])
+    assert status == 413 and unread == 3, "Declared oversize bodies should not be read"
+    print("✓ Oversized Content-Length refused without reading the body")
+    
+    try:
+        request([b"x" * 400] * 5)
+        assert False, "Should have stopped the body"
+    except BodyTooLargeError as e:
+        assert e.status_code == 413
+    print("✓ Streamed bodies stopped once past the limit")
+
+
+def wait_for_job(client, job_id):
+    """Poll a job until it is done or failed"""
+    for _ in range(200):
+        status = client.get(f"/jobs/{job_id}").json()
+        if status["state"] in ("done", "failed"):
+            return status
+        time.sleep(0.05)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+
+def test_api(image_path):
+    """Test the HTTP endpoints and their error statuses through the FastAPI app"""
+    print("\n=== Testing API Endpoints ===")
+    
+    cover = open(image_path, 'rb').read()
+    png = lambda name, data=cover: (name, data, "image/png")
+    
+    with TestClient(api.app) as client:
+        # Batch encode: a ZIP of stego images and a manifest with per-item errors
+        response = client.post(
+            "/encode/batch",
+            files=[("images", png("a.png")), ("images", png("bad.png", b"not an image")),
+                   ("images", png("b.png"))],
+            data={"messages": ["first", "second", "third"], "password": "BatchPass1"}
+        )
+        assert response.status_code == 200 and response.headers["content-type"] == "application/zip"
+        archive = zipfile.ZipFile(io.BytesIO(response.content))
+        manifest = [json.loads(line) for line in archive.read("manifest.ndjson").decode().splitlines()]
+        assert [entry["success"] for entry in manifest] == [True, False, True]
+        assert sorted(archive.namelist()) == ["manifest.ndjson", "stego_a.png", "stego_b.png"]
+        stego_a, stego_b = archive.read("stego_a.png"), archive.read("stego_b.png")
+        response = client.post(
+            "/encode/batch",
+            files=[("images", png("a_2.png")), ("images", png("a.png")), ("images", png("a.png"))],
+            data={"messages": ["one", "two", "three"]}
+        )
+        names = zipfile.ZipFile(io.BytesIO(response.content)).namelist()
+        assert len(names) == len(set(names)) == 4, names
+        response = client.post("/encode/batch", files=[("images", png("a.png"))],
+                               data={"messages": ["one", "two"]})
+        assert response.status_code == 400
+        print("✓ /encode/batch streams a ZIP; clashing names, bad items and message counts handled")
+        
+        # Batch decode: one NDJSON line per image
+        response = client.post(
+            "/decode/batch",
+            files=[("images", png("a.png", stego_a)), ("images", png("plain.png")),
+                   ("images", png("b.png", stego_b))],
+            data={"password": "BatchPass1"}
+        )
+        results = sorted((json.loads(line) for line in response.text.splitlines()),
+                         key=lambda item: item["index"])
+        assert [item.get("message") for item in results] == ["first", None, "third"]
+        assert not results[1]["success"]
+        print("✓ /decode/batch reports each image, including the one without a message")
+        
+        # Multi-image: every shard is needed
+        message = "Split across two carriers. " * 20
+        response = client.post("/encode/multi", files=[("images", png("a.png")), ("images", png("b.png"))],
+                               data={"message": message, "password": "MultiPass1"})
+        assert response.status_code == 200
+        shards = [zipfile.ZipFile(io.BytesIO(response.content)).read(name)
+                  for name in zipfile.ZipFile(io.BytesIO(response.content)).namelist()
+                  if name.endswith(".png")]
+        assert len(shards) == 2
+        files = [("images", png(f"{i}.png", shard)) for i, shard in enumerate(shards)]
+        response = client.post("/decode/multi", files=files[::-1], data={"password": "MultiPass1"})
+        assert response.status_code == 200 and response.json()["message"] == message
+        assert client.post("/decode/multi", files=files[:1], data={"password": "MultiPass1"}).status_code == 404
+        assert client.post("/decode/multi", files=files).status_code == 401
+        print("✓ /encode/multi and /decode/multi round trip; missing shard 404, no password 401")
+        
+        # Detection from the header only
+        detection = client.post("/detect", files={"image": png("a.png", stego_a)}).json()["detection"]
+        assert detection["found"] and detection["encrypted"]
+        assert not client.post("/detect", files={"image": png("plain.png")}).json()["detection"]["found"]
+        print("✓ /detect finds the payload header and reports plain covers")
+        
+        # Background jobs
+        response = client.post("/jobs/encode", files={"image": png("a.png")},
+                               data={"message": "job secret", "password": "JobPass1"})
+        assert response.status_code == 202
+        job_id = response.json()["job_id"]
+        assert wait_for_job(client, job_id)["state"] == "done"
+        result = client.get(f"/jobs/{job_id}/result")
+        assert result.status_code == 200 and result.headers["content-type"] == "image/png"
+        stego = result.content
+        
+        job_id = client.post("/jobs/decode", files={"image": png("a.png", stego)},
+                             data={"password": "JobPass1"}).json()["job_id"]
+        assert wait_for_job(client, job_id)["state"] == "done"
+        assert client.get(f"/jobs/{job_id}/result").json()["message"] == "job secret"
+        
+        job_id = client.post("/jobs/decode", files={"image": png("a.png", stego)}).json()["job_id"]
+        status = wait_for_job(client, job_id)
+        assert status["state"] == "failed" and status["error"]["status"] == 401
+        assert client.get(f"/jobs/{job_id}/result").status_code == 401
+        assert client.get("/jobs/no-such-job").status_code == 404
+        assert client.get("/jobs/no-such-job/result").status_code == 404
+        print("✓ Jobs run in the background; missing password 401, unknown job 404")
+        
+        # Oversized uploads: the file limit while reading, the body limit
+        # before the endpoint runs
+        big = b"\0" * (config.MAX_UPLOAD_BYTES + 1)
+        response = client.post("/decode", files={"image": png("big.png", big)})
+        assert response.status_code == 413, response.status_code
+        big = b"\0" * (config.MAX_UPLOAD_BYTES + api.FORM_FIELDS_ALLOWANCE + 1)
+        response = client.post("/detect", files={"image": png("big.png", big)})
+        assert response.status_code == 413 and "Request too large" in response.json()["detail"]
+        print("✓ Oversized file and request body refused with 413")
+        
+        # A saturated worker pool or job queue asks the client to retry
+        run, max_jobs = api.worker_pool.run, api.job_manager.max_jobs
+        
+        async def saturated(*args):
+            raise PoolSaturatedError()
+        
+        api.worker_pool.run, api.job_manager.max_jobs = saturated, 0
+        try:
+            response = client.post("/decode", files={"image": png("a.png", stego_a)})
+            assert response.status_code == 503 and response.headers["retry-after"]
+            response = client.post("/jobs/encode", files={"image": png("a.png")}, data={"message": "x"})
+            assert response.status_code == 503 and response.headers["retry-after"]
+        finally:
+            api.worker_pool.run, api.job_manager.max_jobs = run, max_jobs
+        print("✓ Busy pool and full job queue answer 503 with Retry-After")
+        
+        # Everything above is counted
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert 'stegocrypt_request_duration_seconds_count{endpoint="/encode/batch"' in response.text
+        assert 'stegocrypt_rejected_uploads_total{endpoint="/detect",reason="body_size"}' in response.text
+        print("✓ /metrics reports the requests and rejections")
+
+
+def test_stage_timing(image_path):
+    """Test per-stage timers"""
+    print("\n=== Testing Stage Timing ===")
+    
+    # Without a collector, stage() is a shared no-op
+    with stage("embed") as timer:
+        pass
+    assert stage("embed") is timer, "Disabled timers should not allocate"
+    print("✓ Timers are no-ops outside a timed call")
+    
+    stego, events, seconds = timed_call(LSBEncoder.encode, image_path, "Timed message")
+    names = [name for name, _ in events]
+    assert names == ["decode", "embed", "save"], f"Unexpected stages: {names}"
+    assert sum(duration for _, duration in events) <= seconds
+    print(f"✓ Encode stages: {', '.join(f'{n} {d * 1000:.1f} ms' for n, d in events)}")
+    
+    _, events, _ = timed_call(prepare_payload, "Timed message " * 50, "TimingPass")
+    assert [name for name, _ in events] == ["compress", "kdf", "encrypt"]
+    print("✓ Payload stages: compress, kdf, encrypt")
+    
+    header, data = LSBDecoder.extract(stego)
+    assert data == b"Timed message", "Timed encode should round trip"
+    print("✓ Timed encode round trips")
+
+
 def test_edge_cases(image_path):
     """Test edge cases"""
     print("\n=== Testing Edge Cases ===")
@@ -162,6 +1090,13 @@ def test_edge_cases(image_path):
     decoded = LSBDecoder.decode('test_special.png')
     assert special_msg == decoded, "Special characters failed!"
     print("✓ Special characters handled correctly")
+    
+    # Image without a hidden message
+    try:
+        LSBDecoder.decode(image_path)
+        print("✗ Cover image should not contain a message!")
+    except ValueError as e:
+        print(f"✓ Clean image reported: {str(e)[:50]}")
 
 
 def main():
@@ -183,6 +1118,57 @@ def main():
         # Test full pipeline
         test_full_pipeline(image_path)
         
+        # Test container format
+        test_container_format(image_path)
+        
+        # Test compression
+        test_compression(image_path)
+        
+        # Test output formats
+        test_output_formats(image_path)
+        
+        # Test strip encoder
+        test_strip_encoder(image_path)
+        
+        # Test row-streaming decoder
+        test_streaming_decoder()
+        
+        # Test multi-image sharding
+        test_sharding()
+        
+        # Test embedding modes
+        test_embed_modes()
+        
+        # Test scatter embedding
+        test_scatter()
+        
+        # Test DCT (JPEG) engine
+        test_dct_engine()
+        
+        # Test WAV carrier
+        test_wav_carrier()
+        
+        # Test payload detection
+        test_detect()
+        
+        # Test command-line tool
+        test_cli()
+        
+        # Test job result store
+        test_job_store(image_path)
+        
+        # Test decode payload cache
+        test_payload_cache()
+        
+        # Test upload limits
+        test_upload_limits()
+        
+        # Test HTTP endpoints
+        test_api(image_path)
+        
+        # Test stage timing
+        test_stage_timing(image_path)
+        
         # Test edge cases
         test_edge_cases(image_path)
         
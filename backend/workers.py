@@ -0,0 +1,85 @@
+"""
+Worker Pool for StegoCrypt
+Runs CPU-bound stego and key-derivation calls off the event loop
+"""
+import asyncio
+import functools
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+
+class PoolSaturatedError(RuntimeError):
+    """Raised when every worker is busy and the wait queue is full"""
+
+
+class WorkerPool:
+    """Bounded executor front-end for async request handlers"""
+    
+    def __init__(
+        self,
+        workers: int,
+        kind: str = "thread",
+        queue_size: int = 0,
+        initializer: Optional[Callable[[], None]] = None
+    ):
+        """
+        Args:
+            workers: Number of worker threads/processes (0 runs calls inline)
+            kind: "thread" or "process"
+            queue_size: Calls allowed to wait when all workers are busy
+            initializer: Called once in each worker process on start-up
+        """
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown worker pool kind: {kind}")
+        
+        self.workers = workers
+        self.kind = kind
+        self.capacity = workers + queue_size
+        self.pending = 0
+        self._executor: Optional[Executor] = None
+        
+        if workers > 0:
+            if kind == "process":
+                self._executor = ProcessPoolExecutor(
+                    max_workers=workers, initializer=initializer
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=workers, thread_name_prefix="stego-worker"
+                )
+    
+    async def run(self, func: Callable, *args: Any) -> Any:
+        """
+        Run func(*args) on the pool and await its result
+        
+        Raises:
+            PoolSaturatedError: If running and queued calls are at capacity
+        """
+        if self._executor is None:
+            return func(*args)
+        
+        # Only the event loop thread touches the counter, so no lock is needed
+        if self.pending >= self.capacity:
+            raise PoolSaturatedError("All workers are busy")
+        
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, functools.partial(func, *args))
+        finally:
+            self.pending -= 1
+    
+    def stats(self) -> dict:
+        """Return pool size and current load"""
+        return {
+            "kind": self.kind,
+            "workers": self.workers,
+            "pending": self.pending,
+            "capacity": self.capacity
+        }
+    
+    def shutdown(self) -> None:
+        """Stop the workers, waiting for running calls to finish"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None